@@ -0,0 +1,224 @@
+"""
+Columnar export of the ledger for analytics.
+
+Transactions, balances and categories are written as Parquet, or as an Arrow
+IPC stream, with their real types: amounts as decimal128(15, 2), dates as
+date32, transaction ids as UUID and low-cardinality text (transaction kind,
+currency, category name) dictionary-encoded. Rows are read in chunks of
+`EXPORT_BATCH_SIZE` with `values_list` and written as one record batch (one
+Parquet row group) per chunk, so memory stays flat however large the ledger.
+
+`export_dataset()` writes a directory partitioned Hive-style by user and, for
+transactions, by month (`transactions/user_id=7/month=2024-01/part-0.parquet`),
+so readers such as pyarrow.dataset, DuckDB or Spark only open what they need.
+
+`export_user()` writes one user's dataset to an anonymous temporary file,
+which the API then streams back, so the whole file is never held in memory.
+
+pyarrow is imported on first use, which keeps it out of the API workers until
+someone exports.
+"""
+import tempfile
+from pathlib import Path
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+
+from balances.models import Balance
+from categories.models import Category
+from sharding.directory import ledger_databases, lookup
+from transactions.models import BaseTransaction
+
+EXPORT_BATCH_SIZE = 10000
+FORMATS = {
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImproperlyConfigured('The analytics export needs pyarrow, install it from requirements.txt.')
+    return pyarrow
+
+
+class Dataset:
+    """One exported table: the rows of a queryset, as (column, lookup, Arrow type) triples."""
+
+    def __init__(self, name, queryset, columns, by_month=False):
+        self.name = name
+        self._queryset = queryset
+        self._columns = columns
+        self.by_month = by_month
+
+    def schema(self):
+        pa = _pyarrow()
+        return pa.schema([pa.field(column, arrow_type(pa)) for column, _, arrow_type in self._columns])
+
+    def rows(self, user_ids=None, using=None, **filters):
+        """Iterate over the rows as tuples in schema order, by user and then by date."""
+        queryset = self._queryset()
+        if using is not None:
+            queryset = queryset.using(using)
+        if user_ids is not None:
+            queryset = queryset.filter(user_id__in=user_ids)
+        queryset = queryset.filter(**filters)
+        order = ['user_id', 'date', 'pk'] if self.by_month else ['user_id', 'pk']
+        lookups = [lookup for _, lookup, _ in self._columns]
+        return queryset.order_by(*order).values_list(*lookups).iterator(chunk_size=EXPORT_BATCH_SIZE)
+
+    def batch(self, rows, schema):
+        """Turn a list of row tuples into an Arrow record batch."""
+        pa = _pyarrow()
+        columns = list(zip(*rows)) if rows else [()] * len(schema)
+        arrays = []
+        for field, values in zip(schema, columns):
+            if isinstance(field.type, pa.UuidType):
+                values = [value.bytes if value is not None else None for value in values]
+            arrays.append(pa.array(values, type=field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    def partition(self, row):
+        """The partition directory of a row, relative to the dataset's."""
+        user_id = row[self._position('user_id')]
+        if not self.by_month:
+            return Path(f'user_id={user_id}')
+        return Path(f'user_id={user_id}') / f"month={row[self._position('date')]:%Y-%m}"
+
+    def _position(self, column):
+        return next(position for position, (name, _, _) in enumerate(self._columns) if name == column)
+
+
+def _timestamp(pa):
+    return pa.timestamp('us', tz='UTC')
+
+
+def _categorical(pa):
+    return pa.dictionary(pa.int32(), pa.string())
+
+
+DATASETS = {
+    dataset.name: dataset for dataset in (
+        Dataset('transactions', lambda: BaseTransaction.objects.annotate(
+            kind=Coalesce(F('incomeoutcometransaction__transaction_type'), Value('transfer')),
+        ), [
+            ('id', 'id', lambda pa: pa.uuid()),
+            ('user_id', 'user_id', lambda pa: pa.int64()),
+            ('date', 'date', lambda pa: pa.date32()),
+            ('kind', 'kind', lambda pa: pa.dictionary(pa.int8(), pa.string())),
+            ('amount', 'amount', lambda pa: pa.decimal128(15, 2)),
+            ('currency', 'currency', lambda pa: pa.dictionary(pa.int8(), pa.string())),
+            ('category_id', 'category_id', lambda pa: pa.int64()),
+            ('category', 'category__name', _categorical),
+            ('balance_id', 'incomeoutcometransaction__balance_id', lambda pa: pa.int64()),
+            ('balance_from_id', 'transfertransaction__balance_from_id', lambda pa: pa.int64()),
+            ('balance_to_id', 'transfertransaction__balance_to_id', lambda pa: pa.int64()),
+            ('note', 'note', lambda pa: pa.string()),
+            ('created_at', 'created_at', _timestamp),
+        ], by_month=True),
+        Dataset('balances', Balance.objects.all, [
+            ('id', 'id', lambda pa: pa.int64()),
+            ('user_id', 'user_id', lambda pa: pa.int64()),
+            ('name', 'name', lambda pa: pa.string()),
+            ('description', 'description', lambda pa: pa.string()),
+            ('amount', 'amount', lambda pa: pa.decimal128(15, 2)),
+            ('currency', 'currency', lambda pa: pa.dictionary(pa.int8(), pa.string())),
+            ('is_active', 'is_active', lambda pa: pa.bool_()),
+            ('created_at', 'created_at', _timestamp),
+            ('updated_at', 'updated_at', _timestamp),
+        ]),
+        Dataset('categories', Category.objects.all, [
+            ('id', 'id', lambda pa: pa.int64()),
+            ('user_id', 'user_id', lambda pa: pa.int64()),
+            ('name', 'name', lambda pa: pa.string()),
+            ('created_at', 'created_at', _timestamp),
+        ]),
+    )
+}
+
+
+def _batches(dataset, rows, schema, batch_size):
+    """Group `rows` into record batches of at most `batch_size` rows that don't span partitions."""
+    pending, partition = [], None
+    for row in rows:
+        row_partition = dataset.partition(row)
+        if pending and (row_partition != partition or len(pending) >= batch_size):
+            yield partition, dataset.batch(pending, schema)
+            pending = []
+        partition = row_partition
+        pending.append(row)
+    if pending:
+        yield partition, dataset.batch(pending, schema)
+
+
+def export_dataset(name, root, user_ids=None, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Write a dataset of `user_ids` (or of every user) under `root`/`name`, partitioned.
+    Returns the number of rows and files written.
+    """
+    pa = _pyarrow()
+    dataset = DATASETS[name]
+    schema = dataset.schema()
+    # Partition columns live in the directory names, not in the files (Hive convention)
+    columns = [field.name for field in schema if field.name != 'user_id']
+    file_schema = pa.schema([schema.field(column) for column in columns])
+    databases = ledger_databases() if user_ids is None else sorted({lookup(user_id)[0] for user_id in user_ids})
+
+    rows = files = 0
+    writer, current, parts = None, None, {}
+    try:
+        for using in databases:
+            for partition, batch in _batches(dataset, dataset.rows(user_ids, using=using), schema, batch_size):
+                if partition != current:
+                    if writer is not None:
+                        writer.close()
+                    directory = Path(root) / name / partition
+                    directory.mkdir(parents=True, exist_ok=True)
+                    # A user caught mid-move may show up on two databases; never overwrite a part
+                    part = parts[partition] = parts.get(partition, -1) + 1
+                    writer = pa.parquet.ParquetWriter(directory / f'part-{part}.parquet', file_schema)
+                    current, files = partition, files + 1
+                writer.write_batch(batch.select(columns))
+                rows += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return {'rows': rows, 'files': files}
+
+
+def export_user(name, user_id, format='parquet', batch_size=EXPORT_BATCH_SIZE, **filters):
+    """
+    Write one dataset of one user as a single Parquet file or Arrow IPC stream to a temporary file.
+    Returns the file, rewound; it is deleted when closed.
+    """
+    pa = _pyarrow()
+    dataset = DATASETS[name]
+    schema = dataset.schema()
+    output = tempfile.TemporaryFile()
+    try:
+        _write_user(pa, dataset, schema, output, user_id, format, batch_size, filters)
+    except BaseException:
+        output.close()
+        raise
+    output.seek(0)
+    return output
+
+
+def _write_user(pa, dataset, schema, output, user_id, format, batch_size, filters):
+    sink = pa.PythonFile(output, mode='w')
+    writer = pa.parquet.ParquetWriter(sink, schema) if format == 'parquet' else pa.ipc.new_stream(sink, schema)
+    with writer:
+        pending = []
+        for row in dataset.rows([user_id], **filters):
+            pending.append(row)
+            if len(pending) >= batch_size:
+                writer.write_batch(dataset.batch(pending, schema))
+                pending = []
+        if pending:
+            writer.write_batch(dataset.batch(pending, schema))
+    sink.flush()
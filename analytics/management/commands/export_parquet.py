@@ -0,0 +1,30 @@
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.export import DATASETS, EXPORT_BATCH_SIZE, export_dataset
+
+
+class Command(BaseCommand):
+    help = "Export the ledger to Parquet, partitioned by user (and month, for transactions)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Directory to write the datasets to.")
+        parser.add_argument('--dataset', action='append', dest='datasets', choices=sorted(DATASETS),
+                            help="Dataset to export (repeatable, default all).")
+        parser.add_argument('--user', type=int, action='append', dest='users', help="Limit to these user ids.")
+        parser.add_argument('--batch-size', type=int, default=EXPORT_BATCH_SIZE,
+                            help="Rows per database chunk and Parquet row group.")
+
+    def handle(self, *args, **options):
+        for name in options['datasets'] or sorted(DATASETS):
+            started = time.monotonic()
+            try:
+                result = export_dataset(name, options['output'], options['users'], options['batch_size'])
+            except ImproperlyConfigured as error:
+                raise CommandError(str(error))
+            self.stdout.write(self.style.SUCCESS(
+                f"Exported {result['rows']} {name} to {result['files']} files "
+                f"in {time.monotonic() - started:.3f}s."
+            ))
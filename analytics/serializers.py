@@ -0,0 +1,18 @@
+from rest_framework import serializers
+
+from .export import DATASETS, FORMATS
+
+
+class ExportQuerySerializer(serializers.Serializer):
+    dataset = serializers.ChoiceField(choices=sorted(DATASETS), default='transactions')
+    # Not `format`, which DRF reserves for choosing a renderer
+    output = serializers.ChoiceField(choices=sorted(FORMATS), default='parquet')
+    date_after = serializers.DateField(required=False)
+    date_before = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if data['dataset'] != 'transactions' and ('date_after' in data or 'date_before' in data):
+            raise serializers.ValidationError("Only transactions can be filtered by date.")
+        if 'date_after' in data and 'date_before' in data and data['date_after'] > data['date_before']:
+            raise serializers.ValidationError("date_after must not be later than date_before.")
+        return data
@@ -0,0 +1,101 @@
+import importlib.util
+import io
+import tempfile
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from balances.models import Balance
+from categories.models import Category
+from transactions.models import IncomeOutcomeTransaction, TransferTransaction
+
+User = get_user_model()
+
+
+@skipUnless(importlib.util.find_spec('pyarrow'), 'needs pyarrow')
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='analyst', password='testpassword')
+        self.other_user = User.objects.create_user(username='other', password='testpassword')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        self.cash = Balance.objects.create(user=self.user, name='Cash', currency='EUR')
+        self.bank = Balance.objects.create(user=self.user, name='Bank', currency='EUR')
+        self.food = Category.objects.create(user=self.user, name='Food')
+        self.income = IncomeOutcomeTransaction.objects.create(
+            user=self.user, balance=self.cash, category=self.food, transaction_type='income',
+            amount=Decimal('100.50'), date=date(2024, 1, 15),
+        )
+        self.transfer = TransferTransaction.objects.create(
+            user=self.user, balance_from=self.cash, balance_to=self.bank, category=self.food,
+            amount=Decimal('20.25'), date=date(2024, 2, 1),
+        )
+        other_balance = Balance.objects.create(user=self.other_user, name='Other', currency='USD')
+        IncomeOutcomeTransaction.objects.create(
+            user=self.other_user, balance=other_balance,
+            category=Category.objects.create(user=self.other_user, name='Rent'),
+            amount=Decimal('5.00'), date=date(2024, 1, 3),
+        )
+
+    def test_endpoint_parquet_types(self):
+        """Test that the endpoint exports the user's transactions with decimal, date, UUID and categorical types."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        response = self.client.get(reverse('analytics-export'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.apache.parquet')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="transactions.parquet"')
+        table = pq.read_table(io.BytesIO(b''.join(response.streaming_content)))
+
+        self.assertEqual(table.schema.field('amount').type, pa.decimal128(15, 2))
+        self.assertEqual(table.schema.field('date').type, pa.date32())
+        self.assertEqual(table.schema.field('id').type, pa.uuid())
+        self.assertTrue(pa.types.is_dictionary(table.schema.field('kind').type))
+        rows = table.to_pylist()
+        self.assertEqual([row['amount'] for row in rows], [Decimal('100.50'), Decimal('20.25')])
+        self.assertEqual([row['kind'] for row in rows], ['income', 'transfer'])
+        self.assertEqual(rows[0]['balance_id'], self.cash.pk)
+        self.assertEqual((rows[1]['balance_from_id'], rows[1]['balance_to_id']), (self.cash.pk, self.bank.pk))
+
+    def test_endpoint_arrow_stream_with_dates(self):
+        """Test that the endpoint can stream Arrow IPC and filter transactions by date."""
+        import pyarrow as pa
+
+        response = self.client.get(reverse('analytics-export'), {'output': 'arrow', 'date_after': '2024-02-01'})
+        self.assertEqual(response.status_code, 200)
+        table = pa.ipc.open_stream(b''.join(response.streaming_content)).read_all()
+        self.assertEqual(table.column('amount').to_pylist(), [Decimal('20.25')])
+
+        response = self.client.get(reverse('analytics-export'), {'dataset': 'balances', 'date_after': '2024-02-01'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_command_partitions_by_user_and_month(self):
+        """Test that the command writes every user's datasets partitioned by user and month."""
+        import pyarrow.dataset as ds
+
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('export_parquet', directory, batch_size=1, stdout=io.StringIO())
+            root = Path(directory)
+            self.assertEqual(sorted(
+                str(path.relative_to(root / 'transactions')) for path in (root / 'transactions').rglob('*.parquet')
+            ), [
+                f'user_id={self.user.pk}/month=2024-01/part-0.parquet',
+                f'user_id={self.user.pk}/month=2024-02/part-0.parquet',
+                f'user_id={self.other_user.pk}/month=2024-01/part-0.parquet',
+            ])
+
+            dataset = ds.dataset(root / 'transactions', format='parquet', partitioning='hive')
+            table = dataset.to_table(filter=ds.field('user_id') == self.user.pk)
+            self.assertEqual(table.num_rows, 2)
+            self.assertEqual(ds.dataset(root / 'balances', partitioning='hive').count_rows(), 3)
+            self.assertEqual(ds.dataset(root / 'categories', partitioning='hive').count_rows(), 2)
@@ -0,0 +1,30 @@
+from django.http import FileResponse
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+
+from utils.routing import ReplicaReadMixin
+from .export import FORMATS, export_user
+from .serializers import ExportQuerySerializer
+
+
+class ExportView(ReplicaReadMixin, APIView):
+    """The user's transactions, balances or categories as a Parquet file or an Arrow IPC stream."""
+    permission_classes = [IsAuthenticated]
+    replica_actions = ('get',)
+
+    def get(self, request):
+        query = ExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        options = query.validated_data
+        filters = {}
+        if 'date_after' in options:
+            filters['date__gte'] = options['date_after']
+        if 'date_before' in options:
+            filters['date__lte'] = options['date_before']
+
+        # Written out in full before streaming, while the request's replica routing still applies
+        output = export_user(options['dataset'], request.user.pk, options['output'], **filters)
+        content_type, extension = FORMATS[options['output']]
+        return FileResponse(
+            output, as_attachment=True, filename=f'{options["dataset"]}.{extension}', content_type=content_type,
+        )
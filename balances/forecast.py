@@ -0,0 +1,120 @@
+"""
+Cash-flow forecast of a balance.
+
+A balance's history is loaded as one array of daily net flows (one aggregate
+query per ledger leg, grouped by day) and projected with NumPy alone, never
+looping over transactions in Python:
+
+* trend: a least-squares line through the daily flows of the fit window;
+* recurring patterns: the mean detrended flow per day of month (salary, rent)
+  and then per day of week (weekend spending);
+* confidence band: the spread of what is left, widening with the square root
+  of the days ahead, as for a random walk.
+
+Each horizon is cached under its own key, of the balance, its `version`, the
+day and the number of days, so concurrent misses never overwrite each other's
+entries. Every ledger write bumps the version (`ledger.invalidate_checkpoints`),
+moving a transaction to another day included, which retires the old entries;
+they expire with `FORECAST_CACHE_TTL`.
+"""
+import numpy as np
+from django.core.cache import cache
+from django.utils import timezone
+
+from .ledger import daily_net_flows
+
+FIT_WINDOW_DAYS = 730
+# Fit day-of-month and day-of-week patterns only once they have been seen a few times
+MIN_DAYS_FOR_MONTHLY = 90
+MIN_DAYS_FOR_WEEKLY = 28
+CONFIDENCE_Z = 1.96
+FORECAST_CACHE_TTL = 3600
+
+
+def forecast_cache_key(balance, today, days):
+    return f'balances:forecast:{balance.pk}:{balance.version}:{today.isoformat()}:{days}'
+
+
+def daily_flow_array(balance_id, until):
+    """Return (first day, array of the daily net flows from that day to `until`) of a balance."""
+    rows = daily_net_flows(balance_id, until=until)
+    if not rows:
+        return until, np.zeros(1)
+
+    days = np.array([day for day, _ in rows], dtype='datetime64[D]')
+    first = days.min()
+    flows = np.bincount(
+        (days - first).astype(np.int64),
+        weights=np.array([total for _, total in rows], dtype=np.float64),
+        minlength=(np.datetime64(until) - first).astype(np.int64) + 1,
+    )
+    return first.item(), flows
+
+
+def _calendar(dates):
+    """Day of month (0-30) and day of week (0 = Monday) of datetime64[D] `dates`."""
+    day_of_month = (dates - dates.astype('datetime64[M]')).astype(np.int64)
+    # 1970-01-01 was a Thursday
+    day_of_week = (dates.astype(np.int64) + 3) % 7
+    return day_of_month, day_of_week
+
+
+def _seasonal(values, groups, size):
+    """Mean of `values` per group, zero for groups never seen."""
+    counts = np.bincount(groups, minlength=size)
+    return np.bincount(groups, weights=values, minlength=size) / np.maximum(counts, 1)
+
+
+def project(flows, last_day, days, z=CONFIDENCE_Z):
+    """
+    Project the amount of a balance `days` ahead of `last_day` from its daily net `flows`
+    up to and including `last_day`. Returns (dates, expected, lower, upper, trend per day).
+    """
+    window = flows[-FIT_WINDOW_DAYS:]
+    n = len(window)
+    past = np.datetime64(last_day) - np.arange(n)[::-1]
+    future = np.datetime64(last_day) + np.arange(1, days + 1)
+    past_dom, past_dow = _calendar(past)
+    future_dom, future_dow = _calendar(future)
+
+    t = np.arange(n, dtype=np.float64)
+    slope, intercept = np.polyfit(t, window, 1) if n > 1 else (0.0, float(window.mean()))
+    residual = window - (intercept + slope * t)
+
+    monthly = _seasonal(residual, past_dom, 31) if n >= MIN_DAYS_FOR_MONTHLY else np.zeros(31)
+    residual = residual - monthly[past_dom]
+    weekly = _seasonal(residual, past_dow, 7) if n >= MIN_DAYS_FOR_WEEKLY else np.zeros(7)
+    residual = residual - weekly[past_dow]
+    sigma = residual.std(ddof=1) if n > 1 else 0.0
+
+    expected_flows = intercept + slope * (n + np.arange(days)) + monthly[future_dom] + weekly[future_dow]
+    expected = flows.sum() + np.cumsum(expected_flows)
+    band = z * sigma * np.sqrt(np.arange(1, days + 1))
+    return future, expected, expected - band, expected + band, slope
+
+
+def forecast(balance, days):
+    """Return the forecast of `balance` for the next `days` days, from the cache when it is current."""
+    today = timezone.localdate()
+    key = forecast_cache_key(balance, today, days)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    first_day, flows = daily_flow_array(balance.pk, until=today)
+    dates, expected, lower, upper, trend = project(flows, today, days)
+    result = {
+        'start': today,
+        'amount': round(float(flows.sum()), 2),
+        'trend_per_day': round(float(trend), 2),
+        'history_days': (today - first_day).days + 1,
+        'series': [
+            {'date': day, 'amount': amount, 'lower': low, 'upper': high}
+            for day, amount, low, high in zip(
+                dates.tolist(), np.round(expected, 2).tolist(), np.round(lower, 2).tolist(),
+                np.round(upper, 2).tolist(),
+            )
+        ],
+    }
+    cache.set(key, result, timeout=FORECAST_CACHE_TTL)
+    return result
@@ -0,0 +1,207 @@
+"""
+Ledger arithmetic on top of the income/outcome and transfer tables.
+
+`Balance.amount` is a cache of the full ledger; historical amounts are answered
+from month-end `BalanceCheckpoint` rows plus the transactions dated after the
+nearest checkpoint. Checkpoints always form a contiguous prefix per balance:
+a write dated D drops every checkpoint on or after D, and the next lookup
+rebuilds the missing month ends lazily.
+
+A lookup may aggregate the ledger before a concurrent write commits, so the
+checkpoints it computed can already be stale when it stores them. Every write
+bumps `Balance.version` under the balance row lock before dropping
+checkpoints, and a lookup only stores its checkpoints under that same lock,
+if the version is still the one it read before aggregating. Otherwise the
+write either saw them and dropped them, or the lookup skips storing them.
+Lookups served from a read replica never store checkpoints: the replica may
+lag behind writes whose invalidation already ran on the primary.
+
+Forecasts (`balances.forecast`) are cached per balance version, so the bump
+that drops a balance's checkpoints retires its forecasts too.
+
+Writes keep `Balance.amount` current by adding their delta under a row lock
+(`apply_deltas`) instead of re-summing the ledger, so concurrent writers to
+the same balance serialize on that lock and never overwrite each other.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import router, transaction
+from django.db.models import Case, DecimalField, F, Q, Sum, Value, When
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from transactions.models import IncomeOutcomeTransaction, TransferTransaction
+from utils.routing import reading_from_replica
+from .models import Balance, BalanceCheckpoint
+
+ZERO = Decimal('0.00')
+
+SIGNED_AMOUNT = Case(
+    When(transaction_type=IncomeOutcomeTransaction.TransactionType.INCOME, then=F('amount')),
+    When(transaction_type=IncomeOutcomeTransaction.TransactionType.OUTCOME, then=-F('amount')),
+    default=Value(ZERO),
+    output_field=DecimalField(max_digits=15, decimal_places=2),
+)
+
+
+def month_end(day):
+    """Return the last day of the month containing `day`."""
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+
+
+def _movements(balance_ids, after=None, until=None):
+    """Yield (queryset, balance field, signed amount) for each leg of the ledger."""
+    window = {}
+    if after is not None:
+        window['date__gt'] = after
+    if until is not None:
+        window['date__lte'] = until
+
+    yield (
+        IncomeOutcomeTransaction.objects.filter(balance__in=balance_ids, **window),
+        'balance',
+        SIGNED_AMOUNT,
+    )
+    yield TransferTransaction.objects.filter(balance_to__in=balance_ids, **window), 'balance_to', F('amount')
+    yield TransferTransaction.objects.filter(balance_from__in=balance_ids, **window), 'balance_from', -F('amount')
+
+
+def net_flows(balance_ids, after=None, until=None):
+    """Return {balance_id: net movement} for transactions dated in (after, until]."""
+    totals = defaultdict(lambda: ZERO)
+    for queryset, field, amount in _movements(balance_ids, after, until):
+        for row in queryset.values(field).annotate(total=Sum(amount)).order_by():
+            totals[row[field]] += row['total'] or 0
+    return totals
+
+
+def monthly_net_flows(balance_id, after=None, until=None):
+    """Return {first day of month: net movement} of one balance for dates in (after, until]."""
+    totals = defaultdict(lambda: ZERO)
+    for queryset, _, amount in _movements([balance_id], after, until):
+        rows = queryset.annotate(month=TruncMonth('date')).values('month').annotate(total=Sum(amount)).order_by()
+        for row in rows:
+            totals[row['month']] += row['total'] or 0
+    return totals
+
+
+def daily_net_flows(balance_id, after=None, until=None):
+    """Return [(date, net movement)] of one balance for dates in (after, until], per day and ledger leg."""
+    rows = []
+    for queryset, _, amount in _movements([balance_id], after, until):
+        rows.extend(queryset.values('date').annotate(total=Sum(amount)).order_by().values_list('date', 'total'))
+    return rows
+
+
+def amount_at(balance, on_date):
+    """
+    Return the ledger amount of `balance` at the end of `on_date`.
+
+    Only the transactions after the nearest checkpoint are aggregated, and any
+    closed month ends crossed on the way are stored as new checkpoints, unless
+    the ledger of the balance changed during the lookup or it was read from a
+    replica.
+    """
+    return _amount_and_month_ends(balance, on_date)[0]
+
+
+def _amount_and_month_ends(balance, on_date):
+    """Like `amount_at`, also returning the closed month ends crossed, as [(date, amount)], stored or not."""
+    version = Balance.objects.filter(pk=balance.pk).values_list('version', flat=True).first()
+    checkpoint = balance.checkpoints.filter(date__lte=on_date).order_by('-date').first()
+    after = checkpoint.date if checkpoint else None
+    amount = checkpoint.amount if checkpoint else ZERO
+
+    monthly = monthly_net_flows(balance.pk, after=after, until=on_date)
+    if not monthly:
+        return amount, []
+
+    today = timezone.localdate()
+    new_checkpoints = []
+    month = after + timedelta(days=1) if after else min(monthly)
+    while month <= on_date:
+        end = month_end(month)
+        amount += monthly.get(month, 0)
+        if end <= on_date and end < today:
+            new_checkpoints.append(BalanceCheckpoint(balance=balance, date=end, amount=amount))
+        month = end + timedelta(days=1)
+
+    if new_checkpoints and not reading_from_replica():
+        with transaction.atomic(using=router.db_for_write(BalanceCheckpoint)):
+            locked = lock_balances([balance.pk])
+            if locked and locked[0].version == version:
+                BalanceCheckpoint.objects.bulk_create(new_checkpoints, ignore_conflicts=True)
+    return amount, [(checkpoint.date, checkpoint.amount) for checkpoint in new_checkpoints]
+
+
+def amount_series(balance, start, end):
+    """Return [(date, amount)] for every month end in [start, end], closed by `end` itself."""
+    closing, crossed = _amount_and_month_ends(balance, end)
+    # The month ends walked by this lookup may not have been stored (see `amount_at`)
+    points = dict(balance.checkpoints.filter(date__range=(start, end)).values_list('date', 'amount'))
+    points.update((day, amount) for day, amount in crossed if day >= start)
+    points = sorted(points.items())
+    if not points or points[-1][0] != end:
+        points.append((end, closing))
+    return points
+
+
+def invalidate_checkpoints(positions):
+    """
+    Drop the checkpoints made stale by writes at the given (balance_id, date) positions.
+
+    The balances' versions are bumped first, under their row locks, so lookups
+    that aggregated the ledger before the write do not store their checkpoints.
+    """
+    earliest = {}
+    for balance_id, day in positions:
+        if isinstance(day, str):
+            # Dates assigned to an unsaved instance may still be ISO strings
+            day = date.fromisoformat(day)
+        earliest[balance_id] = min(day, earliest.get(balance_id, day))
+
+    if not earliest:
+        return
+    condition = Q()
+    for balance_id, day in earliest.items():
+        condition |= Q(balance_id=balance_id, date__gte=day)
+    with transaction.atomic(using=router.db_for_write(Balance)):
+        lock_balances(earliest)
+        Balance.objects.filter(pk__in=earliest).update(version=F('version') + 1)
+        BalanceCheckpoint.objects.filter(condition).delete()
+
+
+def lock_balances(balance_ids):
+    """
+    Lock the given balance rows until the end of the transaction and return them.
+
+    Rows are always locked in primary key order, so writers touching the same
+    balances queue up instead of deadlocking. FOR NO KEY UPDATE does not
+    conflict with the key share lock a transaction insert takes on the
+    balances it references.
+    """
+    return list(Balance.objects.select_for_update(no_key=True).filter(pk__in=balance_ids).order_by('pk'))
+
+
+def apply_deltas(deltas):
+    """Add `deltas` ({balance_id: amount}) to the stored balance amounts, atomically."""
+    deltas = {balance_id: delta for balance_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    with transaction.atomic(using=router.db_for_write(Balance)):
+        for balance in lock_balances(deltas):
+            if not balance.is_active:
+                # Inactive balances hold zero, see `Balance.update_amount`
+                balance.update_amount()
+                continue
+            balance.amount += deltas[balance.pk]
+            balance.save(update_fields=['amount', 'updated_at'])
+
+
+def recompute_balances(positions):
+    """Rebuild the amounts of the balances at `positions` from the ledger, once per balance."""
+    invalidate_checkpoints(positions)
+    for balance in Balance.objects.filter(pk__in={balance_id for balance_id, _ in positions}):
+        balance.update_amount()
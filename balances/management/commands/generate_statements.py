@@ -0,0 +1,57 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from balances.statements import read_progress, record_progress, write_statements
+from utils.parallel import map_chunks
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Write the monthly CSV and JSON statements of every user's balances (month-end job, resumable)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Directory to write the statements to.")
+        parser.add_argument('--month', help="Month as YYYY-MM (default the previous month).")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Number of worker processes (1 runs in-process).")
+        parser.add_argument('--chunk-size', type=int, default=100,
+                            help="Users per unit of work, and per progress checkpoint.")
+        parser.add_argument('--restart', action='store_true',
+                            help="Ignore the progress file and write every statement again.")
+        parser.add_argument('--user', type=int, action='append', dest='users', help="Limit to these user ids.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['month']:
+            try:
+                month = datetime.strptime(options['month'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError(f"Invalid month {options['month']!r}, expected YYYY-MM.")
+        else:
+            month = (timezone.localdate().replace(day=1) - timedelta(days=1)).replace(day=1)
+
+        users = User.objects.order_by('pk')
+        if options['users']:
+            users = users.filter(pk__in=options['users'])
+        done = set() if options['restart'] else read_progress(options['output'], month)
+        user_ids = [user_id for user_id in users.values_list('pk', flat=True) if user_id not in done]
+
+        summary = {'users': 0, 'statements': 0, 'transactions': 0}
+        for result in map_chunks(write_statements, user_ids, workers=options['workers'],
+                                 chunk_size=options['chunk_size'], month=month, root=options['output']):
+            record_progress(options['output'], month, result)
+            summary['users'] += len(result['users'])
+            summary['statements'] += result['statements']
+            summary['transactions'] += result['transactions']
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {summary['statements']} statements ({summary['transactions']} transactions) of "
+            f"{summary['users']} users for {month:%Y-%m} in {time.monotonic() - started:.3f}s, "
+            f"{len(done)} users already done."
+        ))
@@ -0,0 +1,55 @@
+import json
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from balances.reconciliation import reconcile_users
+from utils.parallel import map_chunks
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Recompute every active balance from the ledger and report (or repair) drift in Balance.amount."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Number of worker processes (1 runs in-process).")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Users per unit of work.")
+        parser.add_argument('--repair', action='store_true', help="Overwrite drifted amounts with the ledger value.")
+        parser.add_argument('--report', help="Write a JSON summary to this path.")
+        parser.add_argument('--user', type=int, action='append', dest='users', help="Limit to these user ids.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        users = User.objects.order_by('pk')
+        if options['users']:
+            users = users.filter(pk__in=options['users'])
+        user_ids = list(users.values_list('pk', flat=True))
+
+        summary = {'users': 0, 'balances': 0, 'mismatches': [], 'repaired': options['repair']}
+        for result in map_chunks(reconcile_users, user_ids, workers=options['workers'],
+                                 chunk_size=options['chunk_size'], repair=options['repair']):
+            summary['users'] += result['users']
+            summary['balances'] += result['balances']
+            summary['mismatches'].extend(result['mismatches'])
+        summary['mismatches'].sort(key=lambda mismatch: mismatch['balance_id'])
+        summary['seconds'] = round(time.monotonic() - started, 3)
+
+        if options['report']:
+            with open(options['report'], 'w') as report:
+                json.dump(summary, report, indent=2)
+
+        for mismatch in summary['mismatches']:
+            self.stdout.write(
+                f"balance {mismatch['balance_id']} (user {mismatch['user_id']}): "
+                f"stored {mismatch['stored']}, ledger {mismatch['ledger']}"
+            )
+        verb = 'repaired' if options['repair'] else 'found'
+        style = self.style.WARNING if summary['mismatches'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"Checked {summary['balances']} balances of {summary['users']} users in {summary['seconds']}s, "
+            f"{verb} {len(summary['mismatches'])} mismatches."
+        ))
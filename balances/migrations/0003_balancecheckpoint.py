@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-19 11:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('balances', '0002_balance_description_balance_is_active_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('balance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='balances.balance')),
+            ],
+            options={
+                'unique_together': {('balance', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('balances', '0004_historicalbalance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='balance',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='historicalbalance',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
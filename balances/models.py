@@ -2,14 +2,16 @@ from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
-from django.db import models
-from django.db.models import Sum
+from django.db import models, router, transaction
 import logging
 
+from utils.history import BufferedHistoricalRecords
+from utils.versioning import VersionedModel
+
 logger = logging.getLogger(__name__)
 
 
-class Balance(models.Model):
+class Balance(VersionedModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="balances")
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)  # New field
@@ -19,6 +21,8 @@ class Balance(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    history = BufferedHistoricalRecords()
+
     class Meta:
         indexes = [
             models.Index(fields=['user', 'currency', 'is_active'])
@@ -36,27 +40,26 @@ class Balance(models.Model):
 
     def update_amount(self):
         """Improved balance update method with error handling"""
+        from .ledger import lock_balances, net_flows
+
         try:
-            income = self.income_outcome_transactions.filter(
-                transaction_type='income',
-                balance__is_active=True
-            ).aggregate(Sum('amount'))['amount__sum'] or 0
-
-            outcome = self.income_outcome_transactions.filter(
-                transaction_type='outcome',
-                balance__is_active=True
-            ).aggregate(Sum('amount'))['amount__sum'] or 0
-
-            transfers_in = self.transfers_received.filter(
-                balance_to__is_active=True
-            ).aggregate(Sum('amount'))['amount__sum'] or 0
-
-            transfers_out = self.transfers_sent.filter(
-                balance_from__is_active=True
-            ).aggregate(Sum('amount'))['amount__sum'] or 0
-
-            self.amount = (income + transfers_in) - (outcome + transfers_out)
-            self.save(update_fields=['amount', 'updated_at'])
-        except Exception as e:
-            # Log the error
-            logger.error(f"Error updating balance {self.id}: {e}")
+            with transaction.atomic(using=router.db_for_write(Balance, instance=self)):
+                # Hold the row lock while summing so a concurrent delta is not overwritten,
+                # and save on top of the locked row whatever version this instance was read at
+                self.version = lock_balances([self.pk])[0].version
+                self.amount = net_flows([self.pk])[self.pk] if self.is_active else 0
+                self.save(update_fields=['amount', 'updated_at'])
+        except Exception:
+            # Log the error with its traceback; `reconcile_balances` repairs any drift left behind
+            logger.exception(f"Error updating balance {self.id}")
+
+
+class BalanceCheckpoint(models.Model):
+    """Cumulative ledger amount of a balance at the end of a month."""
+    balance = models.ForeignKey(Balance, on_delete=models.CASCADE, related_name="checkpoints")
+    date = models.DateField()
+    amount = models.DecimalField(max_digits=15, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('balance', 'date')
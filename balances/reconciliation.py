@@ -0,0 +1,56 @@
+"""
+Reconciliation of the cached `Balance.amount` against the ledger.
+
+Every chunk of users is checked with a handful of grouped queries and without
+locks. Only rows that look wrong are re-checked under a row lock, so a
+transaction committed between the two reads is never reported or "repaired".
+"""
+from django.db import router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .ledger import lock_balances, net_flows
+from .models import Balance
+
+
+def _mismatch(balance_id, user_id, stored, ledger):
+    return {
+        'balance_id': balance_id,
+        'user_id': user_id,
+        'stored': str(stored),
+        'ledger': str(ledger),
+        'difference': str(stored - ledger),
+    }
+
+
+def _confirm(balance_id, repair):
+    """Re-check one balance under its row lock; return (stored, ledger) if it still drifts."""
+    with transaction.atomic(using=router.db_for_write(Balance)):
+        locked = lock_balances([balance_id])
+        if not locked:
+            return None
+        balance = locked[0]
+        ledger = net_flows([balance_id])[balance_id]
+        if balance.amount == ledger:
+            return None
+        if repair:
+            Balance.objects.filter(pk=balance_id).update(
+                amount=ledger, version=F('version') + 1, updated_at=timezone.now()
+            )
+        return balance.amount, ledger
+
+
+def reconcile_users(user_ids, repair=False):
+    """Compare the active balances of `user_ids` with the ledger and optionally fix them."""
+    rows = list(Balance.objects.filter(user_id__in=user_ids, is_active=True).values_list('id', 'user_id', 'amount'))
+    flows = net_flows([balance_id for balance_id, _, _ in rows])
+
+    mismatches = []
+    for balance_id, user_id, stored in rows:
+        if stored == flows[balance_id]:
+            continue
+        confirmed = _confirm(balance_id, repair)
+        if confirmed:
+            mismatches.append(_mismatch(balance_id, user_id, *confirmed))
+
+    return {'users': len(user_ids), 'balances': len(rows), 'mismatches': mismatches}
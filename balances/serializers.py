@@ -1,9 +1,11 @@
 from rest_framework import serializers
 
+from utils.sparse_fields import SparseFieldsetSerializerMixin
+
 from .models import Balance
 
 
-class BalanceSerializer(serializers.ModelSerializer):
+class BalanceSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
 
     class Meta:
@@ -14,6 +16,47 @@ class BalanceSerializer(serializers.ModelSerializer):
             'name',
             'amount',
             'currency',
+            'version',
             'created_at',
         ]
-        read_only_fields = ['created_at', 'user']
+        read_only_fields = ['created_at', 'user', 'version']
+
+
+class BalanceAmountSerializer(serializers.Serializer):
+    """Ledger amount of a balance at the end of a given day."""
+    date = serializers.DateField()
+    amount = serializers.DecimalField(max_digits=15, decimal_places=2)
+
+
+class AmountAtQuerySerializer(serializers.Serializer):
+    date = serializers.DateField()
+
+
+class TimelineQuerySerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField()
+
+    def validate(self, data):
+        if data['start'] > data['end']:
+            raise serializers.ValidationError("Start date must not be after end date.")
+        return data
+
+
+class ForecastQuerySerializer(serializers.Serializer):
+    days = serializers.IntegerField(min_value=1, max_value=730, default=90)
+
+
+class ForecastPointSerializer(serializers.Serializer):
+    """Expected amount of a balance at the end of a day, with its confidence band."""
+    date = serializers.DateField()
+    amount = serializers.DecimalField(max_digits=15, decimal_places=2)
+    lower = serializers.DecimalField(max_digits=15, decimal_places=2)
+    upper = serializers.DecimalField(max_digits=15, decimal_places=2)
+
+
+class ForecastSerializer(serializers.Serializer):
+    start = serializers.DateField()
+    amount = serializers.DecimalField(max_digits=15, decimal_places=2)
+    trend_per_day = serializers.DecimalField(max_digits=15, decimal_places=2)
+    history_days = serializers.IntegerField()
+    series = ForecastPointSerializer(many=True)
@@ -0,0 +1,181 @@
+"""
+Monthly statements: one per user and balance, written to disk as CSV and JSON.
+
+A statement holds the opening and closing amounts of the balance, its
+movements by category and the month's transactions with a running amount.
+Each user's month is read with a few grouped queries (their balances, the
+income/outcome legs and the transfers of the month) plus `amount_at` for
+the opening amounts, which month-end checkpoints make cheap.
+
+Files are written to `<root>/<YYYY-MM>/user_id=<id>/balance_id=<id>.{csv,json}`
+through a temporary file renamed into place, so a statement is either
+complete or missing. `generate_statements` runs `write_statements` over
+chunks of users in a process pool and records every finished chunk in
+`<root>/<YYYY-MM>/progress.jsonl`; a restarted run skips those users.
+"""
+import csv
+import json
+import os
+from collections import defaultdict
+from datetime import timedelta
+from pathlib import Path
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from sharding.router import use_user_shard
+from transactions.models import IncomeOutcomeTransaction, TransferTransaction
+from .ledger import ZERO, amount_at, month_end
+from .models import Balance
+
+PROGRESS_FILE = 'progress.jsonl'
+CSV_COLUMNS = ('kind', 'date', 'id', 'type', 'category', 'note', 'amount', 'balance')
+
+
+def month_directory(root, month):
+    return Path(root) / month.strftime('%Y-%m')
+
+
+def read_progress(root, month):
+    """Return the ids of the users whose statements of `month` are complete."""
+    path = month_directory(root, month) / PROGRESS_FILE
+    if not path.exists():
+        return set()
+    done = set()
+    with open(path) as progress:
+        for line in progress:
+            # A line cut off by an interruption is just not counted
+            try:
+                done.update(json.loads(line)['users'])
+            except (ValueError, KeyError):
+                continue
+    return done
+
+
+def record_progress(root, month, result):
+    """Append a finished chunk to the progress file, durably."""
+    path = month_directory(root, month) / PROGRESS_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a') as progress:
+        progress.write(json.dumps(result) + '\n')
+        progress.flush()
+        os.fsync(progress.fileno())
+
+
+def _movements(user_id, start, end):
+    """{balance_id: [movement]} of the month, each movement being a dict with a signed `amount`."""
+    movements = defaultdict(list)
+    income_outcome = IncomeOutcomeTransaction.objects.filter(
+        user_id=user_id, date__range=(start, end), balance__isnull=False
+    ).values_list('pk', 'balance_id', 'date', 'created_at', 'transaction_type', 'category__name', 'note', 'amount')
+    for pk, balance_id, day, created_at, transaction_type, category, note, amount in income_outcome:
+        sign = 1 if transaction_type == IncomeOutcomeTransaction.TransactionType.INCOME else -1
+        movements[balance_id].append({
+            'id': pk, 'date': day, 'created_at': created_at, 'type': transaction_type, 'category': category,
+            'note': note or '', 'amount': sign * amount,
+        })
+
+    transfers = TransferTransaction.objects.filter(user_id=user_id, date__range=(start, end)).values_list(
+        'pk', 'balance_from_id', 'balance_to_id', 'date', 'created_at', 'category__name', 'note', 'amount'
+    )
+    for pk, balance_from_id, balance_to_id, day, created_at, category, note, amount in transfers:
+        legs = ((balance_from_id, 'transfer_out', -amount), (balance_to_id, 'transfer_in', amount))
+        for balance_id, kind, signed in legs:
+            movements[balance_id].append({
+                'id': pk, 'date': day, 'created_at': created_at, 'type': kind, 'category': category,
+                'note': note or '', 'amount': signed,
+            })
+
+    for rows in movements.values():
+        rows.sort(key=lambda row: (row['date'], row['created_at'], str(row['id'])))
+    return movements
+
+
+def _category_totals(rows):
+    totals = {}
+    for row in rows:
+        total = totals.setdefault(row['category'], {'category': row['category'], 'amount': ZERO, 'count': 0})
+        total['amount'] += row['amount']
+        total['count'] += 1
+    return sorted(totals.values(), key=lambda total: total['category'])
+
+
+def _write_atomically(path, write):
+    temporary = path.with_name(path.name + '.tmp')
+    with open(temporary, 'w', newline='') as file:
+        write(file)
+    os.replace(temporary, path)
+
+
+def _write_csv(file, statement, rows, totals):
+    writer = csv.writer(file)
+    writer.writerow(CSV_COLUMNS)
+    writer.writerow(['opening', statement['start'], '', '', '', '', '', statement['opening']])
+    running = statement['opening']
+    for row in rows:
+        running += row['amount']
+        writer.writerow(['transaction', row['date'], row['id'], row['type'], row['category'], row['note'],
+                         row['amount'], running])
+    writer.writerow(['closing', statement['end'], '', '', '', '', '', statement['closing']])
+    for total in totals:
+        writer.writerow(['category', '', '', '', total['category'], '', total['amount'], ''])
+
+
+def _write_json(file, statement, rows, totals):
+    encoder = DjangoJSONEncoder()
+    header = {key: value for key, value in statement.items() if key != 'closing'}
+    # The transaction list is written row by row, the summary after it
+    file.write(encoder.encode(header)[:-1] + ', "transactions": [')
+    for index, row in enumerate(rows):
+        file.write((',\n' if index else '\n') + encoder.encode({key: row[key] for key in row if key != 'created_at'}))
+    summary = {
+        'categories': totals,
+        'income': sum((row['amount'] for row in rows if row['amount'] > 0), ZERO),
+        'outcome': sum((row['amount'] for row in rows if row['amount'] < 0), ZERO),
+        'closing': statement['closing'],
+    }
+    file.write('\n], ' + encoder.encode(summary)[1:] + '\n')
+
+
+def write_user_statements(user_id, month, root):
+    """Write the statements of one user for the month starting on `month`; return (statements, transactions)."""
+    start, end = month, month_end(month)
+    movements = _movements(user_id, start, end)
+    balances = Balance.objects.filter(user_id=user_id).order_by('pk')
+    directory = month_directory(root, month) / f'user_id={user_id}'
+    directory.mkdir(parents=True, exist_ok=True)
+
+    statements = transactions = 0
+    for balance in balances:
+        rows = movements.get(balance.pk, [])
+        if not balance.is_active and not rows:
+            continue
+        opening = amount_at(balance, start - timedelta(days=1))
+        statement = {
+            'user_id': user_id,
+            'balance_id': balance.pk,
+            'balance': balance.name,
+            'currency': balance.currency,
+            'month': start.strftime('%Y-%m'),
+            'start': start,
+            'end': end,
+            'opening': opening,
+            'closing': opening + sum((row['amount'] for row in rows), ZERO),
+        }
+        totals = _category_totals(rows)
+        base = directory / f'balance_id={balance.pk}'
+        _write_atomically(base.with_suffix('.csv'), lambda file: _write_csv(file, statement, rows, totals))
+        _write_atomically(base.with_suffix('.json'), lambda file: _write_json(file, statement, rows, totals))
+        statements += 1
+        transactions += len(rows)
+    return statements, transactions
+
+
+def write_statements(user_ids, month, root):
+    """Write the statements of `user_ids` for `month`, each user on their own shard."""
+    summary = {'users': list(user_ids), 'statements': 0, 'transactions': 0}
+    for user_id in user_ids:
+        with use_user_shard(user_id):
+            statements, transactions = write_user_statements(user_id, month, root)
+        summary['statements'] += statements
+        summary['transactions'] += transactions
+    return summary
@@ -1,10 +1,31 @@
+import csv
+import json
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from .models import Balance
+from categories.models import Category
+from transactions.models import IncomeOutcomeTransaction, TransferTransaction
+from utils.history import buffered_history, update_with_history
+from utils.versioning import VersionConflict
+from . import ledger
+from .ledger import amount_at
+from .models import Balance, BalanceCheckpoint
+from .serializers import BalanceSerializer
 
 # Use the custom user model
 User = get_user_model()
@@ -86,3 +107,510 @@ class BalanceViewSetTests(TestCase):
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('currency', response.data)
+
+
+class BalanceSparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        Balance.objects.create(user=self.user, name="Savings Account", amount=1000.00, currency="USD")
+        Balance.objects.create(user=self.user, name="Checking Account", amount=500.00, currency="EUR")
+
+    def test_list_with_fields(self):
+        """Test that ?fields= trims both the representation and the selected columns."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('balance-list'), {'fields': 'id,name,amount'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual([set(balance) for balance in response.data], [{'id', 'name', 'amount'}] * 2)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('description', queries[0]['sql'])
+        self.assertNotIn('auth_user', queries[0]['sql'])
+
+    def test_list_without_fields_joins_user_once(self):
+        """Test that the full representation resolves the owner without a query per row."""
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('balance-list'))
+        self.assertEqual(response.data[0]['user'], 'testuser')
+
+    def test_retrieve_with_fields(self):
+        """Test that ?fields= applies to detail endpoints."""
+        balance = Balance.objects.first()
+        response = self.client.get(reverse('balance-detail', args=[balance.id]), {'fields': 'amount'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertDictEqual(response.data, {'amount': '1000.00'})
+
+    def test_unknown_field(self):
+        """Test that asking for a field the endpoint does not have is rejected."""
+        response = self.client.get(reverse('balance-list'), {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', response.data)
+
+
+class BalanceCheckpointTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+        self.category = Category.objects.create(user=self.user, name='Salary')
+        self.balance = Balance.objects.create(user=self.user, name='Savings Account', currency='EUR')
+        self.other_balance = Balance.objects.create(user=self.user, name='Checking Account', currency='EUR')
+
+        self.income(1000, date(2024, 1, 15))
+        self.outcome(200, date(2024, 2, 10))
+        self.income(500, date(2024, 4, 1))
+
+    def income(self, amount, on_date, transaction_type='income'):
+        return IncomeOutcomeTransaction.objects.create(
+            user=self.user,
+            category=self.category,
+            amount=amount,
+            date=on_date,
+            transaction_type=transaction_type,
+            balance=self.balance
+        )
+
+    def outcome(self, amount, on_date):
+        return self.income(amount, on_date, transaction_type='outcome')
+
+    def test_amount_at_builds_month_end_checkpoints(self):
+        """Test that a historical lookup materialises the closed month ends it crosses."""
+        self.assertEqual(amount_at(self.balance, date(2024, 3, 31)), Decimal('800.00'))
+        self.assertListEqual(
+            list(self.balance.checkpoints.order_by('date').values_list('date', 'amount')),
+            [
+                (date(2024, 1, 31), Decimal('1000.00')),
+                (date(2024, 2, 29), Decimal('800.00')),
+                (date(2024, 3, 31), Decimal('800.00')),
+            ]
+        )
+        self.assertEqual(amount_at(self.balance, date(2024, 4, 15)), Decimal('1300.00'))
+        self.assertEqual(amount_at(self.balance, date(2023, 12, 31)), Decimal('0'))
+
+    def test_amount_at_reads_from_nearest_checkpoint(self):
+        """Test that a lookup after a checkpoint only aggregates the transactions since it."""
+        amount_at(self.balance, date(2024, 3, 31))
+        with self.assertNumQueries(9):
+            # version, checkpoint lookup, three ledger legs, then the bulk insert of April
+            # under the balance lock (savepoint, lock, insert, release)
+            self.assertEqual(amount_at(self.balance, date(2024, 4, 30)), Decimal('1300.00'))
+
+    def test_write_during_lookup_leaves_no_stale_checkpoints(self):
+        """Test that a lookup does not store checkpoints aggregated before a concurrent write committed."""
+        original = ledger.monthly_net_flows
+
+        def overtaken(*args, **kwargs):
+            flows = original(*args, **kwargs)
+            self.outcome(100, date(2024, 2, 1))
+            return flows
+
+        with mock.patch.object(ledger, 'monthly_net_flows', overtaken):
+            self.assertEqual(amount_at(self.balance, date(2024, 3, 31)), Decimal('800.00'))
+
+        self.assertFalse(self.balance.checkpoints.exists())
+        self.assertEqual(amount_at(self.balance, date(2024, 3, 31)), Decimal('700.00'))
+
+    def test_backdated_transaction_invalidates_later_checkpoints(self):
+        """Test that a backdated write drops the checkpoints on or after its date."""
+        amount_at(self.balance, date(2024, 3, 31))
+        self.outcome(100, date(2024, 2, 1))
+
+        self.assertListEqual(list(self.balance.checkpoints.values_list('date', flat=True)), [date(2024, 1, 31)])
+        self.assertEqual(amount_at(self.balance, date(2024, 3, 31)), Decimal('700.00'))
+
+    def test_moving_transaction_invalidates_previous_position(self):
+        """Test that moving a transaction forward in time invalidates where it used to be."""
+        transaction = IncomeOutcomeTransaction.objects.get(amount=200)
+        amount_at(self.balance, date(2024, 3, 31))
+
+        transaction.date = date(2024, 4, 2)
+        transaction.save()
+
+        self.assertEqual(BalanceCheckpoint.objects.filter(date__gte=date(2024, 2, 1)).count(), 0)
+        self.assertEqual(amount_at(self.balance, date(2024, 3, 31)), Decimal('1000.00'))
+
+    def test_transfer_invalidates_both_balances(self):
+        """Test that a backdated transfer invalidates source and destination checkpoints."""
+        amount_at(self.balance, date(2024, 3, 31))
+        BalanceCheckpoint.objects.create(balance=self.other_balance, date=date(2024, 3, 31), amount=0)
+
+        TransferTransaction.objects.create(
+            user=self.user,
+            category=self.category,
+            amount=300,
+            date=date(2024, 3, 1),
+            balance_from=self.balance,
+            balance_to=self.other_balance
+        )
+
+        self.assertFalse(BalanceCheckpoint.objects.filter(date=date(2024, 3, 31)).exists())
+        self.assertEqual(amount_at(self.balance, date(2024, 3, 31)), Decimal('500.00'))
+        self.assertEqual(amount_at(self.other_balance, date(2024, 3, 31)), Decimal('300.00'))
+
+    def test_amount_at_endpoint(self):
+        """Test the historical amount endpoint."""
+        url = reverse('balance-amount-at', args=[self.balance.id])
+        response = self.client.get(url, {'date': '2024-02-15'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertDictEqual(response.data, {'date': '2024-02-15', 'amount': '800.00'})
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_timeline_endpoint(self):
+        """Test the month-end series endpoint used by charts."""
+        url = reverse('balance-timeline', args=[self.balance.id])
+        response = self.client.get(url, {'start': '2024-02-01', 'end': '2024-04-10'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual(
+            [(point['date'], point['amount']) for point in response.data],
+            [('2024-02-29', '800.00'), ('2024-03-31', '800.00'), ('2024-04-10', '1300.00')]
+        )
+
+
+class ReconcileBalancesCommandTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(user=self.user, name='Salary')
+        self.balance = Balance.objects.create(user=self.user, name='Savings Account', currency='EUR')
+        self.drifted = Balance.objects.create(user=self.user, name='Checking Account', currency='EUR')
+
+        for balance, amount in ((self.balance, 100), (self.drifted, 250)):
+            IncomeOutcomeTransaction.objects.create(
+                user=self.user,
+                category=self.category,
+                amount=amount,
+                date=date(2024, 1, 1),
+                transaction_type='income',
+                balance=balance
+            )
+        Balance.objects.filter(pk=self.drifted.pk).update(amount=999)
+
+    def test_reports_mismatches_without_repairing(self):
+        """Test that drift is reported and left alone by default."""
+        out = StringIO()
+        with tempfile.NamedTemporaryFile(suffix='.json') as report:
+            call_command('reconcile_balances', workers=1, report=report.name, stdout=out)
+            summary = json.load(open(report.name))
+
+        self.assertEqual(summary['balances'], 2)
+        self.assertListEqual(summary['mismatches'], [{
+            'balance_id': self.drifted.id,
+            'user_id': self.user.id,
+            'stored': '999.00',
+            'ledger': '250.00',
+            'difference': '749.00',
+        }])
+        self.assertIn('found 1 mismatches', out.getvalue())
+        self.drifted.refresh_from_db()
+        self.assertEqual(self.drifted.amount, Decimal('999.00'))
+
+    def test_repairs_mismatches(self):
+        """Test that --repair rewrites drifted balances from the ledger."""
+        call_command('reconcile_balances', workers=1, chunk_size=1, repair=True, stdout=StringIO())
+        self.drifted.refresh_from_db()
+        self.assertEqual(self.drifted.amount, Decimal('250.00'))
+
+        out = StringIO()
+        call_command('reconcile_balances', workers=1, stdout=out)
+        self.assertIn('found 0 mismatches', out.getvalue())
+
+
+class BalanceHistoryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(user=self.user, name='Salary')
+
+    def test_request_history_is_written_in_one_bulk_insert(self):
+        """Test that a request's history rows are buffered and flushed together after commit."""
+        url = reverse('income_outcome_transaction-list')
+        balance = Balance.objects.create(user=self.user, name='Savings Account', currency='EUR')
+        data = {
+            'category': self.category.id,
+            'amount': 100,
+            'date': '2024-01-01',
+            'transaction_type': 'income',
+            'balance': balance.id,
+        }
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            # Nothing is written while the request's transaction is still open
+            self.assertEqual(IncomeOutcomeTransaction.history.count(), 0)
+
+        transaction_history = IncomeOutcomeTransaction.history.get()
+        self.assertEqual(transaction_history.history_type, '+')
+        self.assertEqual(transaction_history.history_user, self.user)
+        self.assertListEqual(
+            list(balance.history.order_by('history_id').values_list('history_type', 'amount')),
+            [('+', Decimal('0.00')), ('~', Decimal('100.00'))]
+        )
+
+    def test_rolled_back_changes_leave_no_history(self):
+        """Test that rows buffered by a rolled-back transaction are discarded."""
+        with self.captureOnCommitCallbacks(execute=True):
+            with buffered_history():
+                Balance.objects.create(user=self.user, name='Kept', currency='EUR')
+                try:
+                    with transaction.atomic():
+                        Balance.objects.create(user=self.user, name='Dropped', currency='EUR')
+                        raise ValueError
+                except ValueError:
+                    pass
+
+        self.assertListEqual(list(Balance.history.values_list('name', flat=True)), ['Kept'])
+
+    def test_update_with_history(self):
+        """Test that a bulk update records one historical row per updated object."""
+        for name in ('First', 'Second', 'Third'):
+            Balance.objects.create(user=self.user, name=name, currency='EUR')
+
+        with self.assertNumQueries(9):
+            # savepoint, pk lookup, then update, re-read and bulk history insert per batch of two
+            updated = update_with_history(Balance.objects.filter(user=self.user), batch_size=2, currency='USD')
+
+        self.assertEqual(updated, 3)
+        changes = Balance.history.filter(history_type='~')
+        self.assertEqual(changes.count(), 3)
+        self.assertTrue(all(change.currency == 'USD' for change in changes))
+
+
+class BalanceVersioningTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.balance = Balance.objects.create(user=self.user, name='Savings Account', currency='EUR')
+        self.url = reverse('balance-detail', args=[self.balance.id])
+
+    def test_etag_follows_version(self):
+        """Test that detail responses carry the version as ETag and updates bump it."""
+        response = self.client.get(self.url, {'fields': 'name'})
+        self.assertEqual(response['ETag'], '"1"')
+
+        response = self.client.patch(self.url, {'name': 'Rainy Day'}, format='json', HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['version'], 2)
+        self.assertEqual(response['ETag'], '"2"')
+
+    def test_stale_if_match_is_rejected(self):
+        """Test that writes with a stale If-Match get 412 and change nothing."""
+        self.client.patch(self.url, {'name': 'Rainy Day'}, format='json')
+
+        response = self.client.patch(self.url, {'name': 'Holidays'}, format='json', HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        response = self.client.delete(self.url, HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+        self.balance.refresh_from_db()
+        self.assertEqual((self.balance.name, self.balance.version), ('Rainy Day', 2))
+
+    def test_ledger_updates_invalidate_etag(self):
+        """Test that a transaction booked on the balance makes an earlier ETag stale."""
+        category = Category.objects.create(user=self.user, name='Salary')
+        IncomeOutcomeTransaction.objects.create(
+            user=self.user, category=category, amount=Decimal('100.00'), date='2024-01-01',
+            transaction_type='income', balance=self.balance
+        )
+
+        response = self.client.put(
+            self.url, {'name': 'Savings Account', 'amount': '0.00', 'currency': 'EUR'},
+            format='json', HTTP_IF_MATCH='"1"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.balance.refresh_from_db()
+        self.assertEqual(self.balance.amount, Decimal('100.00'))
+
+    def test_lost_race_without_if_match_is_a_conflict(self):
+        """Test that an update overtaken between read and write gets 409."""
+        original_update = BalanceSerializer.update
+
+        def overtaken_update(serializer, instance, validated_data):
+            Balance.objects.get(pk=instance.pk).save()
+            return original_update(serializer, instance, validated_data)
+
+        with mock.patch.object(BalanceSerializer, 'update', overtaken_update):
+            response = self.client.patch(self.url, {'name': 'Holidays'}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.balance.refresh_from_db()
+        self.assertEqual(self.balance.name, 'Savings Account')
+
+    def test_stale_instance_save_raises(self):
+        """Test that saving an instance read before another save raises instead of overwriting."""
+        stale = Balance.objects.get(pk=self.balance.pk)
+        self.balance.name = 'Rainy Day'
+        self.balance.save()
+
+        stale.name = 'Holidays'
+        with self.assertRaises(VersionConflict), transaction.atomic():
+            stale.save()
+
+        stale.update_amount()
+        self.balance.refresh_from_db()
+        self.assertEqual((self.balance.name, self.balance.version), ('Rainy Day', 3))
+
+
+class ForecastProjectionTests(SimpleTestCase):
+    def test_monthly_salary_and_daily_spending(self):
+        """Test that the projection picks up a monthly income on top of a steady daily outflow."""
+        import numpy as np
+
+        from .forecast import project
+
+        last_day = date(2024, 6, 30)
+        dates = np.datetime64(last_day) - np.arange(730)[::-1]
+        flows = np.where((dates - dates.astype('datetime64[M]')).astype(int) == 0, 1000.0, 0.0) - 10.0
+
+        days, expected, lower, upper, trend = project(flows, last_day, 60)
+        self.assertEqual(days[0], np.datetime64('2024-07-01'))
+        self.assertAlmostEqual(trend, 0, places=3)
+        start = flows.sum()
+        # July 1st brings the salary, every day costs 10
+        self.assertAlmostEqual(expected[0], start + 990, delta=5)
+        self.assertAlmostEqual(expected[30], start + 1000 - 31 * 10, delta=10)
+        self.assertAlmostEqual(expected[31], start + 2 * 1000 - 32 * 10, delta=10)
+        self.assertTrue(np.all(lower <= expected) and np.all(expected <= upper))
+        self.assertTrue(np.all(np.diff(upper - lower) >= 0))
+
+    def test_empty_history(self):
+        """Test that a balance without transactions is projected flat."""
+        import numpy as np
+
+        from .forecast import project
+
+        _, expected, lower, upper, _ = project(np.zeros(1), date(2024, 6, 30), 30)
+        self.assertTrue(np.all(expected == 0) and np.all(lower == 0) and np.all(upper == 0))
+
+
+class BalanceForecastTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(user=self.user, name='Salary')
+        self.balance = Balance.objects.create(user=self.user, name='Savings Account', currency='EUR')
+        self.today = date.today()
+        for days_ago in (1, 31, 61):
+            self.transaction(1000 + days_ago, self.today - timedelta(days=days_ago))
+        self.url = reverse('balance-forecast', args=[self.balance.pk])
+
+    def transaction(self, amount, on_date):
+        return IncomeOutcomeTransaction.objects.create(
+            user=self.user, category=self.category, amount=amount, date=on_date,
+            transaction_type='income', balance=self.balance,
+        )
+
+    def test_forecast_endpoint(self):
+        """Test that the forecast starts at today's amount and covers the requested days."""
+        response = self.client.get(self.url, {'days': 30})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['start'], self.today.isoformat())
+        self.assertEqual(response.data['amount'], '3093.00')
+        self.assertEqual(len(response.data['series']), 30)
+        point = response.data['series'][-1]
+        self.assertEqual(point['date'], (self.today + timedelta(days=30)).isoformat())
+        self.assertLessEqual(Decimal(point['lower']), Decimal(point['amount']))
+        self.assertLessEqual(Decimal(point['amount']), Decimal(point['upper']))
+
+        self.assertEqual(self.client.get(self.url, {'days': 1000}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_forecast_is_cached_until_the_ledger_changes(self):
+        """Test that a repeated forecast skips the ledger queries and a write refreshes it."""
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertFalse([query for query in queries if 'transactions' in query['sql']])
+
+        # Moving a transaction to another day leaves the amount alone but still bumps the version
+        moved = IncomeOutcomeTransaction.objects.get(amount=1001)
+        moved.date = self.today - timedelta(days=5)
+        moved.save()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertTrue([query for query in queries if 'transactions' in query['sql']])
+
+    def test_forecast_horizons_are_cached_apart(self):
+        """Test that each horizon has its own cache entry, which another horizon does not replace."""
+        from .forecast import forecast_cache_key
+
+        self.client.get(self.url, {'days': 30})
+        self.client.get(self.url, {'days': 60})
+        self.balance.refresh_from_db()
+        for days in (30, 60):
+            self.assertEqual(len(cache.get(forecast_cache_key(self.balance, self.today, days))['series']), days)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {'days': 30})
+            self.client.get(self.url, {'days': 60})
+        self.assertFalse([query for query in queries if 'transactions' in query['sql']])
+
+
+class GenerateStatementsCommandTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.other_user = User.objects.create_user(username='otheruser', password='otherpassword')
+        self.salary = Category.objects.create(user=self.user, name='Salary')
+        self.rent = Category.objects.create(user=self.user, name='Rent')
+        self.checking = Balance.objects.create(user=self.user, name='Checking Account', currency='EUR')
+        self.savings = Balance.objects.create(user=self.user, name='Savings Account', currency='EUR')
+
+        for amount, day, category, transaction_type in (
+            (1000, date(2024, 1, 31), self.salary, 'income'),
+            (2000, date(2024, 2, 1), self.salary, 'income'),
+            (700, date(2024, 2, 3), self.rent, 'outcome'),
+            (50, date(2024, 3, 1), self.rent, 'outcome'),
+        ):
+            IncomeOutcomeTransaction.objects.create(
+                user=self.user, category=category, amount=amount, date=day, transaction_type=transaction_type,
+                balance=self.checking
+            )
+        TransferTransaction.objects.create(
+            user=self.user, category=self.salary, amount=300, date=date(2024, 2, 10), note='Monthly saving',
+            balance_from=self.checking, balance_to=self.savings
+        )
+        self.output = tempfile.TemporaryDirectory()
+        self.addCleanup(self.output.cleanup)
+        self.month = Path(self.output.name) / '2024-02'
+
+    def generate(self, *args):
+        out = StringIO()
+        call_command('generate_statements', self.output.name, '--month', '2024-02', '--workers', '1', *args,
+                     stdout=out)
+        return out.getvalue()
+
+    def test_statements(self):
+        """Test that each balance gets a CSV and JSON statement with opening, totals and transactions."""
+        output = self.generate()
+        self.assertIn('Wrote 2 statements (4 transactions) of 2 users', output)
+
+        statement = json.loads((self.month / f'user_id={self.user.pk}' / f'balance_id={self.checking.pk}.json')
+                               .read_text())
+        self.assertEqual((statement['opening'], statement['closing']), ('1000.00', '2000.00'))
+        self.assertEqual([row['type'] for row in statement['transactions']], ['income', 'outcome', 'transfer_out'])
+        self.assertEqual(statement['categories'], [
+            {'category': 'Rent', 'amount': '-700.00', 'count': 1},
+            {'category': 'Salary', 'amount': '1700.00', 'count': 2},
+        ])
+        self.assertEqual((statement['income'], statement['outcome']), ('2000.00', '-1000.00'))
+
+        rows = list(csv.reader(open(self.month / f'user_id={self.user.pk}' / f'balance_id={self.savings.pk}.csv')))
+        self.assertEqual(rows[1][0::7], ['opening', '0.00'])
+        self.assertEqual(rows[2][3:], ['transfer_in', 'Salary', 'Monthly saving', '300.00', '300.00'])
+        self.assertEqual(rows[3][0::7], ['closing', '300.00'])
+
+    def test_resumes_from_progress_file(self):
+        """Test that users recorded in the progress file are skipped unless the run is restarted."""
+        self.generate('--chunk-size', '1', '--user', str(self.user.pk))
+        self.assertIn('of 1 users', self.generate('--chunk-size', '1'))
+        self.assertIn('0 users for 2024-02', self.generate())
+        self.assertIn('Wrote 2 statements', self.generate('--restart'))
+
+        with self.assertRaises(CommandError):
+            call_command('generate_statements', self.output.name, '--month', 'February', stdout=StringIO())
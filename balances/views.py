@@ -1,13 +1,21 @@
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
 
 from utils.permissions import IsOwner
+from utils.routing import ReplicaReadMixin
+from utils.sparse_fields import SparseFieldsetViewMixin
+from utils.versioning import VersionedViewMixin
+from .ledger import amount_at, amount_series
 from .models import Balance
-from .serializers import BalanceSerializer
+from .serializers import BalanceSerializer, BalanceAmountSerializer, AmountAtQuerySerializer, \
+    TimelineQuerySerializer, ForecastQuerySerializer, ForecastSerializer
 
 
-class BalanceViewSet(viewsets.ModelViewSet):
+class BalanceViewSet(ReplicaReadMixin, VersionedViewMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = BalanceSerializer
     permission_classes = [IsOwner]
+    replica_actions = ('list', 'amount_at', 'timeline', 'forecast')
 
     def get_queryset(self):
         # Return only the balances belonging to the authenticated user
@@ -16,3 +24,35 @@ class BalanceViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         # Automatically associate the balance with the authenticated user
         serializer.save(user=self.request.user)
+
+    @action(detail=True, methods=['get'], url_path='amount-at')
+    def amount_at(self, request, pk=None):
+        """Ledger amount of the balance at the end of `?date=`."""
+        query = AmountAtQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        on_date = query.validated_data['date']
+
+        amount = amount_at(self.get_object(), on_date)
+        return Response(BalanceAmountSerializer({'date': on_date, 'amount': amount}).data)
+
+    @action(detail=True, methods=['get'])
+    def timeline(self, request, pk=None):
+        """Month-end ledger amounts between `?start=` and `?end=`, for charts."""
+        query = TimelineQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        points = amount_series(self.get_object(), **query.validated_data)
+        data = [{'date': day, 'amount': amount} for day, amount in points]
+        return Response(BalanceAmountSerializer(data, many=True).data)
+
+    @action(detail=True, methods=['get'])
+    def forecast(self, request, pk=None):
+        """Projected daily amounts for the next `?days=` days, with a 95% confidence band."""
+        # NumPy is only loaded by the workers that serve forecasts
+        from .forecast import forecast
+
+        query = ForecastQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        result = forecast(self.get_object(), query.validated_data['days'])
+        return Response(ForecastSerializer(result).data)
@@ -0,0 +1,15 @@
+"""
+Latency benchmarks for the API.
+
+Benchmarks are Django test cases in `bench_*.py` modules, so they run against a
+throwaway test database but stay out of the regular test run:
+
+    python manage.py test benchmarks --pattern="bench_*.py"
+
+Every benchmark prints one line per measured case and asserts only on
+structural properties (such as query counts), never on wall-clock time.
+
+The multi-threaded benchmarks in `bench_concurrency.py` skip themselves on the
+in-memory SQLite test database; run them against PostgreSQL (or a file-backed
+SQLite test database) to get numbers.
+"""
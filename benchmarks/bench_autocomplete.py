@@ -0,0 +1,23 @@
+from django.urls import reverse
+
+from categories import autocomplete
+from .utils import BenchmarkCase, measure
+
+
+class AutocompleteBenchmark(BenchmarkCase):
+    def setUp(self):
+        super().setUp()
+        autocomplete.invalidate()
+
+    def test_index_lookup(self):
+        """Latency of a cached prefix lookup, without HTTP."""
+        autocomplete.suggest(self.user.pk, 'c')
+        self.report('index_lookup', measure(lambda: autocomplete.suggest(self.user.pk, 'categ'), repeat=1000))
+
+    def test_endpoint(self):
+        """Latency of the autocomplete endpoint on a warm index."""
+        url = reverse('category-autocomplete')
+        self.client.get(url, {'q': 'c'})
+        with self.assertNumQueries(0):
+            self.client.get(url, {'q': 'categ'})
+        self.report('endpoint', measure(lambda: self.client.get(url, {'q': 'categ'})))
@@ -0,0 +1,92 @@
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+
+from balances.models import Balance
+from utils.versioning import VersionConflict
+
+User = get_user_model()
+
+
+def locking_write(balance_id, value):
+    """Pessimistic baseline: lock the row, then read-modify-write it."""
+    with transaction.atomic():
+        balance = Balance.objects.select_for_update().get(pk=balance_id)
+        balance.description = value
+        balance.save(update_fields=['description'])
+    return 0
+
+
+def optimistic_write(balance_id, value):
+    """Read without locks and write conditioned on the version, retrying lost races."""
+    retries = 0
+    while True:
+        balance = Balance.objects.get(pk=balance_id)
+        balance.description = value
+        try:
+            with transaction.atomic():
+                balance.save(update_fields=['description'])
+            return retries
+        except VersionConflict:
+            retries += 1
+
+
+class ConcurrentWriteBenchmark(TransactionTestCase):
+    """
+    Throughput of concurrent read-modify-write on balances, optimistic versions
+    against row locks. On SQLite every write transaction is serialized anyway,
+    so the numbers are only meaningful on PostgreSQL.
+    """
+    threads = 8
+    writes_per_thread = 25
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Threads cannot write to the in-memory SQLite test database concurrently')
+        self.user = User.objects.create_user(username='benchmark', password='benchmark')
+        self.balances = [
+            Balance.objects.create(user=self.user, name=f'Balance {index}', currency='EUR')
+            for index in range(self.threads)
+        ]
+
+    def run_writers(self, write, hot):
+        retries, errors = [], []
+
+        def writer(thread):
+            balance_id = self.balances[0 if hot else thread].pk
+            try:
+                for index in range(self.writes_per_thread):
+                    retries.append(write(balance_id, f'{thread}-{index}'))
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=writer, args=(thread,)) for thread in range(self.threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(errors, [])
+        writes = self.threads * self.writes_per_thread
+        self.assertEqual(len(retries), writes)
+        return writes / elapsed, sum(retries)
+
+    def report(self, name, throughput, retries):
+        print(f"\n{type(self).__name__}.{name}: {throughput:.0f} writes/s, {retries} retries")
+
+    def test_hot_balance(self):
+        """Every thread writes the same balance."""
+        self.report('hot_balance_locking', *self.run_writers(locking_write, hot=True))
+        self.report('hot_balance_optimistic', *self.run_writers(optimistic_write, hot=True))
+
+    def test_spread_balances(self):
+        """Every thread writes a balance of its own."""
+        self.report('spread_balances_locking', *self.run_writers(locking_write, hot=False))
+        self.report('spread_balances_optimistic', *self.run_writers(optimistic_write, hot=False))
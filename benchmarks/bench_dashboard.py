@@ -0,0 +1,22 @@
+from django.urls import reverse
+
+from .utils import BenchmarkCase, measure
+
+
+class DashboardBenchmark(BenchmarkCase):
+    def test_dashboard(self):
+        """Latency of the one-round-trip dashboard."""
+        url = reverse('dashboard')
+        with self.assertNumQueries(3):
+            self.client.get(url)
+        self.report('dashboard', measure(lambda: self.client.get(url)))
+
+    def test_separate_endpoints(self):
+        """Latency of the three list calls the dashboard replaces, for comparison."""
+        urls = [reverse('balance-list'), reverse('category-list'), reverse('transaction-list')]
+
+        def home_screen():
+            for url in urls:
+                self.client.get(url)
+
+        self.report('separate_endpoints', measure(home_screen, repeat=10))
@@ -0,0 +1,34 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.urls import reverse
+
+from transactions.duplicates import candidate_pairs, note_similarity
+from .utils import BenchmarkCase, measure
+
+
+def synthetic_rows(count):
+    """(amount, date)-ordered rows shaped like a large ledger: few distinct amounts, many repeats."""
+    rows = [
+        (index, Decimal(10 + index % 97), date(2000, 1, 1) + timedelta(days=index // 40), ('EUR', 'outcome'),
+         f'card payment shop {index % 311}')
+        for index in range(count)
+    ]
+    rows.sort(key=lambda row: (row[1], row[2]))
+    return rows
+
+
+class DuplicateBenchmark(BenchmarkCase):
+    def test_scan_scales_linearly(self):
+        """Blocking and note comparison over 20k and 200k rows, without the database; the ratio should be ~10."""
+        def scan(rows):
+            for (_, _, _, _, first), (_, _, _, _, second) in candidate_pairs(rows, window=3):
+                note_similarity(first, second, 0.6)
+
+        for count in (20_000, 200_000):
+            rows = synthetic_rows(count)
+            self.report(f'scan_{count}', measure(lambda: scan(rows), repeat=3, warmup=0))
+
+    def test_endpoint(self):
+        """Latency of listing the seeded user's duplicate clusters."""
+        self.report('endpoint', measure(lambda: self.client.get(reverse('transaction-duplicates'))))
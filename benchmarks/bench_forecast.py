@@ -0,0 +1,26 @@
+from datetime import date
+
+import numpy as np
+from django.core.cache import cache
+from django.urls import reverse
+
+from balances.forecast import project
+from .utils import BenchmarkCase, measure
+
+
+class ForecastBenchmark(BenchmarkCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_projection_of_ten_years(self):
+        """Latency of projecting a year ahead from ten years of daily flows, without the database."""
+        flows = np.random.default_rng(0).normal(-10, 50, 3650)
+        self.report('project_10y_365d', measure(lambda: project(flows, date(2024, 12, 31), 365)))
+
+    def test_endpoint(self):
+        """Latency of the forecast endpoint, computed (cold) and from the cache (warm)."""
+        url = reverse('balance-forecast', args=[self.balances[0].pk])
+        self.report('endpoint_cold', measure(lambda: (cache.clear(), self.client.get(url, {'days': 365}))))
+        self.report('endpoint_warm', measure(lambda: self.client.get(url, {'days': 365})))
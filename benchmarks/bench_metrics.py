@@ -0,0 +1,42 @@
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+
+from monitoring.metrics import registry
+from monitoring.middleware import MetricsMiddleware
+from .utils import BenchmarkCase, measure
+
+CALLS = 1000
+
+
+class MetricsBenchmark(BenchmarkCase):
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    def test_middleware_overhead(self):
+        """Cost of recording a request; per 1000 requests in ms, i.e. microseconds per request."""
+        request = RequestFactory().get('/balances/')
+        response = HttpResponse()
+        bare = lambda request: response  # noqa: E731
+        middleware = MetricsMiddleware(bare)
+
+        def run(handler):
+            for _ in range(CALLS):
+                handler(request)
+
+        self.report('bare_x1000', measure(lambda: run(bare)))
+        self.report('recorded_x1000', measure(lambda: run(middleware)))
+
+    def test_endpoint(self):
+        """Latency of rendering the metrics after a few hundred requests over several views."""
+        for _ in range(100):
+            self.client.get(reverse('balance-list'))
+            self.client.get(reverse('category-list'))
+            self.client.get(reverse('transaction-list'))
+        self.client.force_authenticate(user=None)
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        self.report('endpoint', measure(lambda: self.client.get(reverse('metrics'))))
@@ -0,0 +1,63 @@
+from datetime import date
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from utils.routing import PIN_COOKIE
+from .utils import BenchmarkCase
+
+
+# `default` doubles as the replica, so the queries run while the routing decision is observed
+@override_settings(REPLICA_DATABASES=['default'])
+class ReplicaOffloadBenchmark(BenchmarkCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def run_request(self, send):
+        """Send one request and return (queries, whether they were routed to a replica)."""
+        with mock.patch('utils.routing.random.choice', side_effect=lambda aliases: aliases[0]) as choice:
+            with CaptureQueriesContext(connection) as queries:
+                response = send()
+        self.assertLess(response.status_code, 400, response.content)
+        return len(queries), choice.called
+
+    def test_primary_share_of_read_heavy_traffic(self):
+        """Share of queries left on the primary for a 9:1 read/write mix of one user."""
+        reads = [
+            lambda: self.client.get(reverse('balance-list')),
+            lambda: self.client.get(reverse('income_outcome_transaction-list')),
+            lambda: self.client.get(reverse('dashboard')),
+        ]
+        write_url = reverse('income_outcome_transaction-list')
+        balance = self.balances[0]
+        category = self.categories[0]
+
+        primary = replica = 0
+        for index in range(100):
+            if index % 10 == 9:
+                # Writes pin the user to the primary; let the pin expire before the next burst of reads
+                send = lambda: self.client.post(write_url, {
+                    'transaction_type': 'outcome', 'balance': balance.pk, 'category': category.pk,
+                    'amount': f'{index}.50', 'date': date(2024, 1, 1).isoformat(),
+                })
+            else:
+                send = reads[index % len(reads)]
+            queries, routed = self.run_request(send)
+            if routed:
+                replica += queries
+            else:
+                primary += queries
+            if index % 10 == 9:
+                self.client.cookies.pop(PIN_COOKIE, None)
+
+        self.assertGreater(replica, 0)
+        print(
+            f"\n{type(self).__name__}.primary_share: {primary / (primary + replica):.0%} "
+            f"of {primary + replica} queries ({replica} served by replicas)"
+        )
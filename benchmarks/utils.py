@@ -0,0 +1,90 @@
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase
+
+from balances.models import Balance
+from categories.models import Category
+from transactions.models import IncomeOutcomeTransaction, TransferTransaction
+
+User = get_user_model()
+
+
+def measure(func, repeat=50, warmup=3):
+    """Call `func` repeatedly and return its latency statistics in milliseconds."""
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+
+    samples.sort()
+    return {
+        'min': samples[0],
+        'median': statistics.median(samples),
+        'p95': samples[int(len(samples) * 0.95) - 1],
+        'max': samples[-1],
+    }
+
+
+def seed_ledger(user, balances=3, categories=10, transactions=300, start=date(2020, 1, 1)):
+    """Create a realistic ledger for `user`: a mix of incomes, outcomes and transfers over time."""
+    with transaction.atomic():
+        balance_rows = [
+            Balance.objects.create(user=user, name=f'Balance {index}', currency='EUR')
+            for index in range(balances)
+        ]
+        category_rows = [
+            Category.objects.create(user=user, name=f'Category {index}')
+            for index in range(categories)
+        ]
+
+        for index in range(transactions):
+            common = {
+                'user': user,
+                'category': category_rows[index % categories],
+                'amount': 10 + index % 97,
+                'date': start + timedelta(days=index % 1500),
+                'note': f'Seeded transaction {index}',
+            }
+            if index % 10 == 0 and balances > 1:
+                TransferTransaction.objects.create(
+                    balance_from=balance_rows[index % balances],
+                    balance_to=balance_rows[(index + 1) % balances],
+                    **common
+                )
+            else:
+                IncomeOutcomeTransaction.objects.create(
+                    transaction_type='income' if index % 4 == 0 else 'outcome',
+                    balance=balance_rows[index % balances],
+                    **common
+                )
+    return balance_rows, category_rows
+
+
+class BenchmarkCase(TestCase):
+    """Base class for benchmarks: a user with a seeded ledger and an authenticated client."""
+    transactions = 300
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='benchmark', password='benchmark')
+        cls.balances, cls.categories = seed_ledger(cls.user, transactions=cls.transactions)
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def report(self, name, stats):
+        print(
+            f"\n{type(self).__name__}.{name}: "
+            + ', '.join(f"{key} {value:.2f}ms" for key, value in stats.items())
+        )
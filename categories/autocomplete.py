@@ -0,0 +1,96 @@
+"""
+Per-user category autocomplete served from an in-process prefix index.
+
+Each user's index is a sorted list of the case-folded word starts of their
+category names, searched with `bisect`; matches are ranked by how many
+transactions use the category. Indexes are built lazily from the database,
+kept for `INDEX_TTL` seconds and dropped as soon as this process sees one of
+the user's categories change, so a cache hit never touches the database.
+Other worker processes pick up a change when their copy expires. At most
+`MAX_INDEXES` are kept, evicting the least recently used.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+
+from .models import Category
+
+INDEX_TTL = 300
+MAX_INDEXES = 10000
+
+_indexes = OrderedDict()
+_lock = threading.Lock()
+
+
+class PrefixIndex:
+    def __init__(self, categories):
+        """`categories` is an iterable of (id, name, usage count)."""
+        self.names = {}
+        self.usage = {}
+        keys = []
+        for category_id, name, usage in categories:
+            self.names[category_id] = name
+            self.usage[category_id] = usage
+            words = name.casefold().split()
+            # Index every word start, so "food" finds "Fast Food" as well
+            keys.extend((' '.join(words[position:]), category_id) for position in range(len(words)))
+        keys.sort()
+        self.keys = [key for key, _ in keys]
+        self.ids = [category_id for _, category_id in keys]
+        self.built_at = time.monotonic()
+
+    def search(self, prefix, limit=10):
+        """Return [(id, name, usage)] of the categories with a word starting with `prefix`, most used first."""
+        prefix = ' '.join(prefix.casefold().split())
+        start = bisect_left(self.keys, prefix)
+        matches = set()
+        for position in range(start, len(self.keys)):
+            if not self.keys[position].startswith(prefix):
+                break
+            matches.add(self.ids[position])
+        ranked = sorted(matches, key=lambda category_id: (-self.usage[category_id], self.names[category_id]))
+        return [(category_id, self.names[category_id], self.usage[category_id]) for category_id in ranked[:limit]]
+
+
+def _build(user_id):
+    rows = Category.objects.filter(user_id=user_id).with_stats().values_list('id', 'name', 'transaction_count')
+    return PrefixIndex(rows)
+
+
+def get_index(user_id):
+    """Return the user's index, building it if it is missing or expired."""
+    with _lock:
+        index = _indexes.get(user_id)
+        if index is not None and time.monotonic() - index.built_at < INDEX_TTL:
+            _indexes.move_to_end(user_id)
+            return index
+
+    index = _build(user_id)
+    with _lock:
+        _indexes[user_id] = index
+        _indexes.move_to_end(user_id)
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def suggest(user_id, prefix, limit=10):
+    return get_index(user_id).search(prefix, limit)
+
+
+def invalidate(user_id=None):
+    """Drop the index of `user_id`, or every index."""
+    with _lock:
+        if user_id is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(user_id, None)
+
+
+def record_usage(user_id, category_id, delta):
+    """Adjust the usage count of a category in a cached index, if any."""
+    with _lock:
+        index = _indexes.get(user_id)
+        if index is not None and category_id in index.usage:
+            index.usage[category_id] += delta
@@ -1,16 +1,85 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import Count, DecimalField, F, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from utils.history import BufferedHistoricalRecords, record_update_history
 
 User = get_user_model()
 
 
+class CategoryQuerySet(models.QuerySet):
+    def with_stats(self):
+        """
+        Annotate usage statistics over the category's transactions, in the same query.
+
+        `total_income` and `total_outcome` sum the incomes and outcomes, and
+        `total_amount` is their net (income minus outcome). Transfers only move
+        money between the user's balances, so they count as uses but not in the sums.
+        """
+        from transactions.models import IncomeOutcomeTransaction
+
+        amount = DecimalField(max_digits=15, decimal_places=2)
+
+        def total(transaction_type):
+            return Coalesce(
+                Sum('transactions__amount', filter=Q(
+                    transactions__incomeoutcometransaction__transaction_type=transaction_type
+                )),
+                Value(0), output_field=amount,
+            )
+
+        return self.annotate(
+            transaction_count=Count('transactions'),
+            total_income=total(IncomeOutcomeTransaction.TransactionType.INCOME),
+            total_outcome=total(IncomeOutcomeTransaction.TransactionType.OUTCOME),
+            last_used=Max('transactions__date'),
+        ).annotate(
+            total_amount=F('total_income') - F('total_outcome'),
+        )
+
+
 class Category(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="categories")
     name = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    history = BufferedHistoricalRecords()
+
+    objects = CategoryQuerySet.as_manager()
+
     class Meta:
         unique_together = ('user', 'name')
 
     def __str__(self):
         return self.name
+
+    def merge_into(self, target, name=None):
+        """
+        Move all transactions of this category to `target` with a single UPDATE, delete this
+        category and optionally rename `target`. Returns the number of transactions moved.
+        """
+        from transactions.models import BaseTransaction, IncomeOutcomeTransaction, TransferTransaction
+        from transactions.signals import bulk_updated
+
+        with transaction.atomic(using=router.db_for_write(Category, instance=self)):
+            # FOR UPDATE (not NO KEY) also blocks concurrent inserts into this category, so none
+            # can slip in after the UPDATE and be lost in the cascading delete below
+            list(Category.objects.select_for_update().filter(pk__in=[self.pk, target.pk]).order_by('pk'))
+
+            moved = {
+                model: list(model.objects.filter(category=self).values_list('pk', flat=True))
+                for model in (IncomeOutcomeTransaction, TransferTransaction)
+            }
+            count = BaseTransaction.objects.filter(category=self).update(category=target, version=F('version') + 1)
+            for model, pks in moved.items():
+                if pks:
+                    record_update_history(model, pks)
+                    bulk_updated.send(sender=model, user_id=self.user_id, object_ids=pks)
+
+            self.delete()
+            if name is not None and name != target.name:
+                # Only now that this category is gone may `target` take over its name
+                target.name = name
+                target.save(update_fields=['name'])
+        return count
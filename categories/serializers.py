@@ -1,9 +1,12 @@
 from rest_framework import serializers
 
+from utils.fields import OwnedPrimaryKeyRelatedField
+from utils.sparse_fields import SparseFieldsetSerializerMixin
+
 from .models import Category
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)  # Display user as a string (e.g., username)
 
     class Meta:
@@ -24,3 +27,55 @@ class CategorySerializer(serializers.ModelSerializer):
         if Category.objects.filter(user=user, name=value).exists():
             raise serializers.ValidationError("A category with this name already exists for the user.")
         return value
+
+
+class CategoryStatsSerializer(CategorySerializer):
+    """Category with the usage statistics annotated by `CategoryQuerySet.with_stats`."""
+    transaction_count = serializers.IntegerField(read_only=True)
+    total_income = serializers.DecimalField(max_digits=15, decimal_places=2, read_only=True)
+    total_outcome = serializers.DecimalField(max_digits=15, decimal_places=2, read_only=True)
+    total_amount = serializers.DecimalField(max_digits=15, decimal_places=2, read_only=True,
+                                            help_text="Net amount: total income minus total outcome.")
+    last_used = serializers.DateField(read_only=True)
+
+    class Meta(CategorySerializer.Meta):
+        fields = CategorySerializer.Meta.fields + [
+            'transaction_count', 'total_income', 'total_outcome', 'total_amount', 'last_used',
+        ]
+
+
+class CategoryQuerySerializer(serializers.Serializer):
+    stats = serializers.BooleanField(default=False, help_text="Include usage statistics.")
+
+
+class CategoryMergeSerializer(serializers.Serializer):
+    target = OwnedPrimaryKeyRelatedField(queryset=Category.objects.all(),
+                                         help_text="Category receiving the transactions.")
+    name = serializers.CharField(max_length=255, required=False,
+                                 help_text="New name of the merged category, e.g. the source's name.")
+
+    def validate(self, data):
+        source = self.context['source']
+        if data['target'] == source:
+            raise serializers.ValidationError("A category cannot be merged into itself.")
+        name = data.get('name')
+        if name is not None and Category.objects.filter(user=source.user, name=name).exclude(
+                pk__in=[source.pk, data['target'].pk]).exists():
+            raise serializers.ValidationError({'name': "A category with this name already exists for the user."})
+        return data
+
+
+class CategoryMergeResultSerializer(serializers.Serializer):
+    category = CategorySerializer()
+    transactions = serializers.IntegerField(help_text="Number of transactions moved.")
+
+
+class AutocompleteQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(allow_blank=True, default='', trim_whitespace=False, help_text="Name prefix.")
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+
+class CategorySuggestionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    usage = serializers.IntegerField(help_text="Number of transactions in the category.")
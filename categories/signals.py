@@ -0,0 +1,53 @@
+from django.db import router, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from transactions.models import IncomeOutcomeTransaction, TransferTransaction
+from transactions.signals import bulk_updated
+from . import autocomplete
+from .models import Category
+
+
+def _invalidate(user_id):
+    autocomplete.invalidate(user_id)
+    # Again once committed, in case a concurrent request rebuilt the index from the old rows meanwhile
+    transaction.on_commit(lambda: autocomplete.invalidate(user_id), using=router.db_for_write(Category))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_autocomplete_on_category_change(sender, instance, **kwargs):
+    """Drop the owner's autocomplete index when a category is created, renamed or deleted."""
+    _invalidate(instance.user_id)
+
+
+@receiver(bulk_updated, sender=IncomeOutcomeTransaction)
+@receiver(bulk_updated, sender=TransferTransaction)
+def invalidate_autocomplete_on_bulk_update(sender, user_id, **kwargs):
+    """Drop the owner's autocomplete index when transactions are recategorized in bulk."""
+    _invalidate(user_id)
+
+
+def _record_usage(sender, user_id, deltas):
+    # Only once committed, so a rolled back write leaves the ranking alone
+    def record():
+        for category_id, delta in deltas:
+            autocomplete.record_usage(user_id, category_id, delta)
+    transaction.on_commit(record, using=router.db_for_write(sender))
+
+
+@receiver(post_save, sender=IncomeOutcomeTransaction)
+@receiver(post_save, sender=TransferTransaction)
+def count_category_usage_on_save(sender, instance, created, **kwargs):
+    """Keep the usage ranking of a cached autocomplete index current."""
+    previous = getattr(instance, '_loaded_values', {}).get('category_id')
+    if created:
+        _record_usage(sender, instance.user_id, [(instance.category_id, 1)])
+    elif previous is not None and previous != instance.category_id:
+        _record_usage(sender, instance.user_id, [(previous, -1), (instance.category_id, 1)])
+
+
+@receiver(post_delete, sender=IncomeOutcomeTransaction)
+@receiver(post_delete, sender=TransferTransaction)
+def count_category_usage_on_delete(sender, instance, **kwargs):
+    _record_usage(sender, instance.user_id, [(instance.category_id, -1)])
@@ -1,9 +1,19 @@
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from balances.models import Balance
+from sync.models import Change
+from transactions.models import IncomeOutcomeTransaction, TransferTransaction
+from . import autocomplete
+from .autocomplete import PrefixIndex
 from .models import Category
 from .serializers import CategorySerializer
 
@@ -128,3 +138,206 @@ class CategoryViewSetTests(TestCase):
         response = self.client.delete(url, format='json')
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Category.objects.count(), 0)
+
+
+class CategoryStatsAndMergeTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+        self.groceries = Category.objects.create(user=self.user, name='Groceries')
+        self.food = Category.objects.create(user=self.user, name='Food')
+        self.unused = Category.objects.create(user=self.user, name='Unused')
+        self.savings = Balance.objects.create(user=self.user, name='Savings Account', currency='EUR')
+        self.checking = Balance.objects.create(user=self.user, name='Checking Account', currency='EUR')
+
+        for day in range(1, 4):
+            IncomeOutcomeTransaction.objects.create(
+                user=self.user, category=self.groceries, amount=Decimal(10 * day), date=date(2024, 1, day),
+                transaction_type='outcome', balance=self.savings
+            )
+        self.transfer = TransferTransaction.objects.create(
+            user=self.user, category=self.groceries, amount=Decimal('5.00'), date=date(2024, 2, 1),
+            balance_from=self.savings, balance_to=self.checking
+        )
+        IncomeOutcomeTransaction.objects.create(
+            user=self.user, category=self.food, amount=Decimal('7.50'), date=date(2024, 1, 15),
+            transaction_type='outcome', balance=self.savings
+        )
+
+    def test_list_with_stats_in_one_query(self):
+        """Test that ?stats=true annotates count, sums and last use within the list query, sums without transfers."""
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('category-list'), {'stats': 'true'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats = {
+            row['name']: (row['transaction_count'], row['total_income'], row['total_outcome'], row['total_amount'],
+                          row['last_used'])
+            for row in response.data
+        }
+        self.assertEqual(stats, {
+            'Groceries': (4, '0.00', '60.00', '-60.00', '2024-02-01'),
+            'Food': (1, '0.00', '7.50', '-7.50', '2024-01-15'),
+            'Unused': (0, '0.00', '0.00', '0.00', None),
+        })
+
+    def test_stats_of_category_mixing_incomes_and_outcomes(self):
+        """Test that incomes and outcomes are summed apart and netted with their sign."""
+        IncomeOutcomeTransaction.objects.create(
+            user=self.user, category=self.food, amount=Decimal('20.00'), date=date(2024, 1, 20),
+            transaction_type='income', balance=self.savings
+        )
+        food = Category.objects.with_stats().get(pk=self.food.pk)
+        self.assertEqual(
+            (food.transaction_count, food.total_income, food.total_outcome, food.total_amount),
+            (2, Decimal('20.00'), Decimal('7.50'), Decimal('12.50'))
+        )
+
+    def test_list_without_stats(self):
+        """Test that statistics are only computed when asked for."""
+        response = self.client.get(reverse('category-list'))
+        self.assertNotIn('transaction_count', response.data[0])
+
+        response = self.client.get(reverse('category-list'), {'stats': 'sometimes'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_merge(self):
+        """Test that merging moves every transaction, deletes the source and records the changes."""
+        url = reverse('category-merge', args=[self.groceries.id])
+        response = self.client.post(url, {'target': self.food.id}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['transactions'], 4)
+        self.assertEqual(response.data['category']['name'], 'Food')
+        self.assertFalse(Category.objects.filter(pk=self.groceries.pk).exists())
+        self.assertEqual(IncomeOutcomeTransaction.objects.filter(category=self.food).count(), 4)
+        self.assertEqual(TransferTransaction.history.filter(id=self.transfer.id, history_type='~').count(), 1)
+        self.assertEqual(Change.objects.filter(object_id=str(self.transfer.id)).count(), 2)
+        self.savings.refresh_from_db()
+        self.assertEqual(self.savings.amount, Decimal('-72.50'))
+
+    def test_merge_takes_over_source_name(self):
+        """Test that the target may take the source's name despite the unique constraint."""
+        url = reverse('category-merge', args=[self.groceries.id])
+
+        response = self.client.post(url, {'target': self.food.id, 'name': 'Unused'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(url, {'target': self.food.id, 'name': 'Groceries'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.food.refresh_from_db()
+        self.assertEqual(self.food.name, 'Groceries')
+        self.assertEqual(Category.objects.filter(user=self.user).count(), 2)
+
+    def test_merge_into_itself_or_foreign_category(self):
+        """Test that a category can only be merged into another category of the same user."""
+        other_user = User.objects.create_user(username='otheruser', password='otherpassword')
+        foreign = Category.objects.create(user=other_user, name='Groceries')
+        url = reverse('category-merge', args=[self.groceries.id])
+
+        for target in (self.groceries, foreign):
+            response = self.client.post(url, {'target': target.id}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(IncomeOutcomeTransaction.objects.filter(category=self.groceries).count(), 3)
+
+
+class CategoryAutocompleteTests(TestCase):
+    def setUp(self):
+        autocomplete.invalidate()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('category-autocomplete')
+
+        self.groceries = Category.objects.create(user=self.user, name='Groceries')
+        self.gifts = Category.objects.create(user=self.user, name='Gifts')
+        self.fast_food = Category.objects.create(user=self.user, name='Fast Food')
+        self.balance = Balance.objects.create(user=self.user, name='Savings Account', currency='EUR')
+        for day in range(1, 3):
+            self._spend(self.gifts, day)
+
+    def _spend(self, category, day):
+        IncomeOutcomeTransaction.objects.create(
+            user=self.user, category=category, amount=Decimal('1.00') * day, date=date(2024, 1, day),
+            transaction_type='outcome', balance=self.balance
+        )
+
+    def test_prefix_index(self):
+        """Test that the index matches word starts case-insensitively and ranks by usage."""
+        index = PrefixIndex([(1, 'Groceries', 3), (2, 'Gifts', 5), (3, 'Fast Food', 1), (4, 'Food Court', 1)])
+
+        self.assertEqual([name for _, name, _ in index.search('g')], ['Gifts', 'Groceries'])
+        self.assertEqual([name for _, name, _ in index.search('FOO')], ['Fast Food', 'Food Court'])
+        self.assertEqual([name for _, name, _ in index.search('fast  f')], ['Fast Food'])
+        self.assertEqual(index.search('g', limit=1), [(2, 'Gifts', 5)])
+        self.assertEqual(index.search('x'), [])
+
+    def test_cache_hit_needs_no_query(self):
+        """Test that suggestions are ranked by usage and served from memory once built."""
+        response = self.client.get(self.url, {'q': 'g'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['name'] for row in response.data], ['Gifts', 'Groceries'])
+        self.assertEqual(response.data[0]['usage'], 2)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'q': 'foo'})
+        self.assertEqual([row['name'] for row in response.data], ['Fast Food'])
+
+    def test_category_changes_invalidate_index(self):
+        """Test that creating, renaming and deleting categories shows up in the next answer."""
+        self.client.get(self.url, {'q': 'g'})
+
+        Category.objects.create(user=self.user, name='Gym')
+        self.fast_food.name = 'Garden'
+        self.fast_food.save()
+        self.groceries.delete()
+
+        response = self.client.get(self.url, {'q': 'g'})
+        self.assertEqual([row['name'] for row in response.data], ['Gifts', 'Garden', 'Gym'])
+
+    def test_usage_is_counted_without_rebuild(self):
+        """Test that new transactions update the ranking of a cached index in place."""
+        self.client.get(self.url, {'q': 'g'})
+        with self.captureOnCommitCallbacks(execute=True):
+            for day in range(3, 6):
+                self._spend(self.groceries, day)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'q': 'g', 'limit': 1})
+        self.assertEqual(response.data, [{'id': self.groceries.id, 'name': 'Groceries', 'usage': 3}])
+
+    def test_rolled_back_usage_is_not_counted(self):
+        """Test that transactions rolled back do not change the ranking of a cached index."""
+        self.client.get(self.url, {'q': 'g'})
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    for day in range(3, 6):
+                        self._spend(self.groceries, day)
+                    raise ValueError
+            except ValueError:
+                pass
+
+        response = self.client.get(self.url, {'q': 'g'})
+        self.assertEqual([(row['name'], row['usage']) for row in response.data], [('Gifts', 2), ('Groceries', 0)])
+
+    def test_least_recently_used_index_is_evicted(self):
+        """Test that a cache hit keeps an index from being the next one evicted."""
+        with mock.patch.object(autocomplete, 'MAX_INDEXES', 2):
+            busy = autocomplete.get_index(self.user.pk)
+            autocomplete.get_index(self.user.pk + 1000)
+            self.assertIs(autocomplete.get_index(self.user.pk), busy)
+            autocomplete.get_index(self.user.pk + 2000)
+
+            self.assertIs(autocomplete.get_index(self.user.pk), busy)
+            self.assertNotIn(self.user.pk + 1000, autocomplete._indexes)
+
+    def test_other_users_categories_are_not_suggested(self):
+        """Test that the index is per user."""
+        other_user = User.objects.create_user(username='otheruser', password='otherpassword')
+        Category.objects.create(user=other_user, name='Golf')
+
+        response = self.client.get(self.url, {'q': 'go'})
+        self.assertEqual(response.data, [])
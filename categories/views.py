@@ -1,18 +1,60 @@
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
 
 from utils.permissions import IsOwner
+from utils.routing import ReplicaReadMixin
+from utils.sparse_fields import SparseFieldsetViewMixin
+from .autocomplete import suggest
 from .models import Category
-from .serializers import CategorySerializer
+from .serializers import CategorySerializer, CategoryStatsSerializer, CategoryQuerySerializer, \
+    CategoryMergeSerializer, CategoryMergeResultSerializer, AutocompleteQuerySerializer, CategorySuggestionSerializer
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ReplicaReadMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = CategorySerializer
     permission_classes = [IsOwner]
 
+    @property
+    def include_stats(self):
+        if self.request.method != 'GET' or self.action not in ('list', 'retrieve'):
+            return False
+        query = CategoryQuerySerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+        return query.validated_data['stats']
+
+    def get_serializer_class(self):
+        return CategoryStatsSerializer if self.include_stats else CategorySerializer
+
     def get_queryset(self):
         # Return only the categories belonging to the authenticated user
-        return Category.objects.filter(user=self.request.user)
+        queryset = Category.objects.filter(user=self.request.user)
+        return queryset.with_stats() if self.include_stats else queryset
 
     def perform_create(self, serializer):
         # Automatically associate the category with the authenticated user
         serializer.save(user=self.request.user)
+
+    @action(detail=True, methods=['post'])
+    def merge(self, request, pk=None):
+        """Move every transaction of this category to `target` and delete this category."""
+        source = self.get_object()
+        merge = CategoryMergeSerializer(data=request.data, context={**self.get_serializer_context(), 'source': source})
+        merge.is_valid(raise_exception=True)
+
+        target = merge.validated_data['target']
+        moved = source.merge_into(target, name=merge.validated_data.get('name'))
+        return Response(CategoryMergeResultSerializer(
+            {'category': target, 'transactions': moved}, context=self.get_serializer_context()
+        ).data)
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """Categories with a word starting with `?q=`, most used first, from an in-memory index."""
+        query = AutocompleteQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        suggestions = suggest(request.user.pk, query.validated_data['q'], query.validated_data['limit'])
+        return Response(CategorySuggestionSerializer(
+            [{'id': category_id, 'name': name, 'usage': usage} for category_id, name, usage in suggestions], many=True
+        ).data)
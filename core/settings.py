@@ -14,9 +14,6 @@ from datetime import timedelta
 from os import getenv
 from pathlib import Path
 
-from django.conf import settings
-from django.contrib.auth import get_user_model
-
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -38,6 +35,9 @@ SPECTACULAR_SETTINGS = {
     'SERVE_INCLUDE_SCHEMA': False,
 }
 
+# Pre-generated schema served by `api/schema/` (python manage.py spectacular --file schema.yml)
+SPECTACULAR_SCHEMA_FILE = BASE_DIR / 'schema.yml'
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -57,11 +57,16 @@ INSTALLED_APPS = [
     'balances.apps.BalancesConfig',
     'transactions.apps.TransactionsConfig',
     'categories.apps.CategoriesConfig',
-    'authentication.apps.AuthenticationConfig'
+    'authentication.apps.AuthenticationConfig',
+    'dashboard.apps.DashboardConfig',
+    'sync.apps.SyncConfig',
+    'monitoring.apps.MonitoringConfig',
+    'sharding.apps.ShardingConfig',
+    'analytics.apps.AnalyticsConfig',
 ]
 
 REST_FRAMEWORK = {
-    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_SCHEMA_CLASS': 'utils.schema.LazyAutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'authentication.authentication.CustomJWTAuthentication',
     ],
@@ -107,7 +112,7 @@ SIMPLE_JWT = {
     "UPDATE_LAST_LOGIN": False,
 
     "ALGORITHM": "HS256",
-    "SIGNING_KEY": settings.SECRET_KEY,
+    "SIGNING_KEY": SECRET_KEY,
     "VERIFYING_KEY": "",
     "AUDIENCE": None,
     "ISSUER": None,
@@ -149,16 +154,22 @@ DJOSER = {
 }
 
 MIDDLEWARE = [
+    'monitoring.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'monitoring.profiling.ProfilingMiddleware',
+    'monitoring.capture.CaptureMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 
+    'sharding.router.ShardRoutingMiddleware',
     'simple_history.middleware.HistoryRequestMiddleware',
+    'utils.history.HistoryBufferMiddleware',
+    'utils.routing.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -189,6 +200,12 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Take the write lock when a transaction starts, so concurrent writers (web workers,
+        # batch commands) wait on the busy timeout instead of failing with "database is locked"
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     },
     # 'default': {
     #     'ENGINE': 'django.db.backends.postgresql_psycopg2',
@@ -200,6 +217,28 @@ DATABASES = {
     # }
 }
 
+# Read replicas of `default`, e.g. DB_REPLICAS=/srv/replica1.sqlite3,/srv/replica2.sqlite3.
+# Replication itself happens outside Django; in tests the replicas mirror `default`.
+REPLICA_DATABASES = []
+for index, name in enumerate(filter(None, getenv('DB_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica{index}'] = {**DATABASES['default'], 'NAME': name, 'TEST': {'MIRROR': 'default'}}
+    REPLICA_DATABASES.append(f'replica{index}')
+
+# Shards holding the users' ledgers, e.g. DB_SHARDS=/srv/shard1.sqlite3,/srv/shard2.sqlite3 (see `sharding`).
+# Each shard's position in the list fixes its id range: append new shards, never reorder them.
+SHARD_DATABASES = []
+for index, name in enumerate(filter(None, getenv('DB_SHARDS', '').split(',')), start=1):
+    DATABASES[f'shard{index}'] = {**DATABASES['default'], 'NAME': name}
+    SHARD_DATABASES.append(f'shard{index}')
+
+# How long a web worker may act on a stale shard directory entry.
+SHARD_DIRECTORY_TTL = float(getenv('SHARD_DIRECTORY_TTL', '30'))
+
+DATABASE_ROUTERS = ['sharding.router.ShardRouter', 'utils.routing.ReplicaRouter']
+
+# After a write, the user's reads stay on the primary this long; keep it above the replica lag.
+READ_YOUR_WRITES_SECONDS = float(getenv('READ_YOUR_WRITES_SECONDS', '5'))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -243,3 +282,69 @@ CURRENCIES = [
     ('EUR', 'Euro'),
     ('USD', 'US Dollar')
 ]
+
+# Outcomes whose modified z-score within their category reaches this are anomalies
+# (see `transactions.anomalies`).
+ANOMALY_THRESHOLD = float(getenv('ANOMALY_THRESHOLD', '3.5'))
+
+# Cold start (interpreter start up to the first response) must stay under
+# this budget, see `python manage.py profile_startup`.
+STARTUP_BUDGET_SECONDS = float(getenv('STARTUP_BUDGET_SECONDS', '5'))
+
+# Prime URL resolver, serializers and DB connections before the worker
+# accepts traffic.
+WARMUP_ON_STARTUP = getenv('DJANGO_WARMUP', '0') == '1'
+
+# Request metrics (see `monitoring.metrics`), served on /metrics/ to staff users
+# and to scrapers sending `Authorization: Bearer <METRICS_TOKEN>`. With several
+# worker processes, METRICS_DIR is a directory they share to aggregate their
+# metrics; clear it when the server starts.
+METRICS_TOKEN = getenv('METRICS_TOKEN', '')
+METRICS_DIR = getenv('METRICS_DIR') or None
+METRICS_FLUSH_SECONDS = float(getenv('METRICS_FLUSH_SECONDS', '1'))
+
+# Statements taking at least SLOW_QUERY_SECONDS (0 disables) are logged with
+# their plan to SLOW_QUERY_LOG_FILE, each query shape at most once per
+# SLOW_QUERY_DEDUP_SECONDS per process (see `monitoring.slow_queries`).
+# SLOW_QUERY_ANALYZE_RATE of the logged SELECTs are run again under EXPLAIN ANALYZE.
+SLOW_QUERY_SECONDS = float(getenv('SLOW_QUERY_SECONDS', '0.5'))
+SLOW_QUERY_DEDUP_SECONDS = float(getenv('SLOW_QUERY_DEDUP_SECONDS', '300'))
+SLOW_QUERY_ANALYZE_RATE = float(getenv('SLOW_QUERY_ANALYZE_RATE', '0.1'))
+SLOW_QUERY_LOG_FILE = getenv('SLOW_QUERY_LOG_FILE', str(BASE_DIR / 'slow_queries.log'))
+
+# Staff requests with `X-Profile: cprofile|sample` (or ?profile=) are profiled
+# and stored in PROFILE_DIR, keeping the newest PROFILE_MAX_FILES (see
+# `monitoring.profiling`).
+PROFILING_ENABLED = getenv('PROFILING_ENABLED', '1') == '1'
+PROFILE_DIR = getenv('PROFILE_DIR', str(BASE_DIR / 'profiles'))
+PROFILE_MAX_FILES = int(getenv('PROFILE_MAX_FILES', '200'))
+PROFILE_SAMPLE_INTERVAL = float(getenv('PROFILE_SAMPLE_INTERVAL', '0.001'))
+
+# With CAPTURE_FILE set, a CAPTURE_RATE fraction of requests is appended to it,
+# scrubbed and with pseudonymized users keyed by CAPTURE_SALT (default the
+# secret key), for `python manage.py replay_traffic` (see `monitoring.capture`).
+CAPTURE_FILE = getenv('CAPTURE_FILE', '')
+CAPTURE_RATE = float(getenv('CAPTURE_RATE', '0.01'))
+CAPTURE_SALT = getenv('CAPTURE_SALT', '')
+CAPTURE_MAX_BODY_BYTES = int(getenv('CAPTURE_MAX_BODY_BYTES', '65536'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG_FILE,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'monitoring.slow_queries': {'handlers': ['slow_queries'], 'level': 'WARNING', 'propagate': False},
+    },
+}
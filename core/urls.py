@@ -16,17 +16,22 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+
+from utils.schema import schema_view, lazy_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),  # YOUR PATTERNS
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),  # Optional UI:
-    path('', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
-    path('api/schema/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+    path('api/schema/', schema_view, name='schema'),  # Optional UI:
+    path('', lazy_view('drf_spectacular.views.SpectacularSwaggerView', url_name='schema'), name='swagger-ui'),
+    path('api/schema/redoc/', lazy_view('drf_spectacular.views.SpectacularRedocView', url_name='schema'), name='redoc'),
 
     path('auth/', include('djoser.urls')),
     path('auth/', include('authentication.urls')),
     path('balances/', include('balances.urls')),
     path('categories/', include('categories.urls')),
     path('transactions/', include('transactions.urls')),
+    path('dashboard/', include('dashboard.urls')),
+    path('sync/', include('sync.urls')),
+    path('analytics/', include('analytics.urls')),
+    path('', include('monitoring.urls')),
 ]
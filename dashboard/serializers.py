@@ -0,0 +1,23 @@
+from rest_framework import serializers
+
+from balances.serializers import BalanceSerializer
+from transactions.serializers.base_transaction_serializers import BaseTransactionSerializer
+
+
+class CategoryMonthTotalSerializer(serializers.Serializer):
+    """Income and outcome booked on one category in the current month."""
+    category = serializers.IntegerField()
+    category_name = serializers.CharField()
+    income = serializers.DecimalField(max_digits=15, decimal_places=2)
+    outcome = serializers.DecimalField(max_digits=15, decimal_places=2)
+
+
+class DashboardSerializer(serializers.Serializer):
+    balances = BalanceSerializer(many=True)
+    recent_transactions = BaseTransactionSerializer(many=True)
+    month = serializers.CharField()
+    month_totals = CategoryMonthTotalSerializer(many=True)
+
+
+class DashboardQuerySerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
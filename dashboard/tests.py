@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from balances.models import Balance
+from categories.models import Category
+from transactions.models import IncomeOutcomeTransaction, TransferTransaction
+
+User = get_user_model()
+
+
+class DashboardViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.other_user = User.objects.create_user(username='otheruser', password='otherpassword')
+        self.client.force_authenticate(user=self.user)
+
+        self.today = timezone.localdate()
+        self.groceries = Category.objects.create(user=self.user, name='Groceries')
+        self.salary = Category.objects.create(user=self.user, name='Salary')
+        self.savings = Balance.objects.create(user=self.user, name='Savings Account', currency='EUR')
+        self.checking = Balance.objects.create(user=self.user, name='Checking Account', currency='EUR')
+        Balance.objects.create(user=self.user, name='Closed Account', currency='EUR', is_active=False)
+
+        self.book(self.salary, 2000, 'income', self.today)
+        self.book(self.groceries, 50, 'outcome', self.today)
+        self.book(self.groceries, 30, 'outcome', self.today)
+        self.book(self.groceries, 70, 'outcome', self.today.replace(day=1) - timedelta(days=1))
+        TransferTransaction.objects.create(
+            user=self.user,
+            category=self.salary,
+            amount=500,
+            date=self.today,
+            balance_from=self.savings,
+            balance_to=self.checking
+        )
+
+    def book(self, category, amount, transaction_type, on_date):
+        return IncomeOutcomeTransaction.objects.create(
+            user=self.user,
+            category=category,
+            amount=amount,
+            date=on_date,
+            transaction_type=transaction_type,
+            balance=self.savings
+        )
+
+    def test_dashboard(self):
+        """Test that the dashboard returns balances, recent transactions and month totals."""
+        response = self.client.get(reverse('dashboard'), {'limit': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertListEqual(
+            [balance['name'] for balance in response.data['balances']],
+            ['Checking Account', 'Savings Account']
+        )
+        self.assertEqual(len(response.data['recent_transactions']), 3)
+        self.assertTrue(all(transaction['detail_url'] for transaction in response.data['recent_transactions']))
+        self.assertEqual(response.data['month'], self.today.strftime('%Y-%m'))
+        self.assertListEqual(
+            [dict(total) for total in response.data['month_totals']],
+            [
+                {'category': self.groceries.id, 'category_name': 'Groceries', 'income': '0.00', 'outcome': '80.00'},
+                {'category': self.salary.id, 'category_name': 'Salary', 'income': '2000.00', 'outcome': '0.00'},
+            ]
+        )
+
+    def test_dashboard_runs_a_fixed_number_of_queries(self):
+        """Test that the query count does not grow with the number of rows."""
+        with self.assertNumQueries(3):
+            self.client.get(reverse('dashboard'), {'limit': 100})
+
+    def test_dashboard_only_shows_own_data(self):
+        """Test that another user's dashboard is empty."""
+        self.client.force_authenticate(user=self.other_user)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual(response.data['balances'], [])
+        self.assertListEqual(response.data['recent_transactions'], [])
+        self.assertListEqual(response.data['month_totals'], [])
+
+    def test_dashboard_rejects_invalid_limit(self):
+        """Test that the limit is validated."""
+        response = self.client.get(reverse('dashboard'), {'limit': 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
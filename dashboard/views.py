@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+from django.db.models import Q, Sum
+from django.utils import timezone
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from balances.ledger import month_end
+from balances.models import Balance
+from transactions.models import BaseTransaction, IncomeOutcomeTransaction
+from utils.routing import ReplicaReadMixin
+from .serializers import DashboardSerializer, DashboardQuerySerializer
+
+INCOME = IncomeOutcomeTransaction.TransactionType.INCOME
+OUTCOME = IncomeOutcomeTransaction.TransactionType.OUTCOME
+
+
+class DashboardView(ReplicaReadMixin, APIView):
+    """
+    Everything the home screen needs in one response, in three queries: active
+    balances, the most recent transactions and this month's totals per category.
+    """
+    permission_classes = [IsAuthenticated]
+    replica_actions = ('get',)
+
+    def get(self, request):
+        query = DashboardQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        user = request.user
+
+        balances = Balance.objects.filter(user=user, is_active=True).select_related('user').order_by('name')
+
+        # The subtype joins let `detail_url` resolve without a query per row
+        recent_transactions = BaseTransaction.objects.filter(user=user).select_related(
+            'category', 'incomeoutcometransaction', 'transfertransaction'
+        ).order_by('-date', '-created_at')[:query.validated_data['limit']]
+
+        today = timezone.localdate()
+        month_totals = IncomeOutcomeTransaction.objects.filter(
+            user=user,
+            date__range=(today.replace(day=1), month_end(today)),
+        ).values('category', 'category__name').annotate(
+            income=Sum('amount', filter=Q(transaction_type=INCOME), default=Decimal('0')),
+            outcome=Sum('amount', filter=Q(transaction_type=OUTCOME), default=Decimal('0')),
+        ).order_by('category__name')
+
+        return Response(DashboardSerializer({
+            'balances': balances,
+            'recent_transactions': recent_transactions,
+            'month': today.strftime('%Y-%m'),
+            'month_totals': [
+                {
+                    'category': row['category'],
+                    'category_name': row['category__name'],
+                    'income': row['income'],
+                    'outcome': row['outcome'],
+                }
+                for row in month_totals
+            ],
+        }).data)
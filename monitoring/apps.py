@@ -0,0 +1,16 @@
+from django.apps import AppConfig
+
+
+class MonitoringConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'monitoring'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .middleware import install_query_timer, instrument_serializers
+        from .slow_queries import install_slow_query_log
+
+        connection_created.connect(install_query_timer, dispatch_uid='monitoring.install_query_timer')
+        connection_created.connect(install_slow_query_log, dispatch_uid='monitoring.install_slow_query_log')
+        instrument_serializers()
@@ -0,0 +1,133 @@
+"""
+Capture of sampled production requests, for replaying them as load tests.
+
+With `CAPTURE_FILE` set, `CaptureMiddleware` records a `CAPTURE_RATE` fraction
+of requests as one JSON line each: when it arrived, the method, path, query,
+body, the view that served it, its status and duration, and a pseudonym of the
+authenticated user. `monitoring.replay` (`python manage.py replay_traffic`)
+sends them again.
+
+Nothing sensitive is written:
+
+* the user is a keyed hash of their id (`CAPTURE_SALT`, the secret key by
+  default), stable within a capture but not reversible without the key;
+* query parameters and body fields whose name looks like a credential or an
+  identity (`password`, `token`, `email`, ...) are replaced, as are JWTs found
+  anywhere in values;
+* headers and cookies are not captured at all;
+* only JSON and form bodies of at most `CAPTURE_MAX_BODY_BYTES` are kept; other
+  bodies are recorded by size only.
+
+Every line is a single append to the file, opened per write, so worker
+processes can share it and it can be rotated by moving it away.
+"""
+import hmac
+import json
+import os
+import random
+import re
+import time
+from hashlib import sha256
+from time import perf_counter
+from urllib.parse import parse_qsl
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .middleware import current_view
+
+SCRUBBED = '[scrubbed]'
+EXCLUDED_PREFIXES = ('/metrics/', '/profiles/', '/admin/')
+SENSITIVE_NAME = re.compile(
+    r'pass|token|secret|auth|key|refresh|access|session|csrf|cookie|signature|uid'
+    r'|email|username|first_name|last_name|phone',
+    re.IGNORECASE,
+)
+# Any JWT, e.g. in a free-text field or an unexpectedly named parameter
+_JWT = re.compile(r'eyJ[\w-]+\.[\w-]+\.[\w-]+')
+JSON_TYPE, FORM_TYPE = 'application/json', 'application/x-www-form-urlencoded'
+
+
+def pseudonym(user_id):
+    """A stable, keyed pseudonym of a user id."""
+    key = (settings.CAPTURE_SALT or settings.SECRET_KEY).encode()
+    return 'u_' + hmac.new(key, str(user_id).encode(), sha256).hexdigest()[:16]
+
+
+def scrub(value, name=''):
+    """`value` with the entries of sensitive names, and JWTs, replaced; lists and dicts are scrubbed recursively."""
+    if name and SENSITIVE_NAME.search(name):
+        return SCRUBBED
+    if isinstance(value, dict):
+        return {key: scrub(item, str(key)) for key, item in value.items()}
+    if isinstance(value, list):
+        return [scrub(item) for item in value]
+    if isinstance(value, str):
+        return _JWT.sub(SCRUBBED, value)
+    return value
+
+
+def scrub_pairs(pairs):
+    return [[name, scrub(value, name)] for name, value in pairs]
+
+
+def capture_body(request):
+    """Return (body kind, scrubbed body, size); the body is None unless it is small JSON or form data."""
+    size = int(request.META.get('CONTENT_LENGTH') or 0)
+    content_type = request.content_type
+    if not size or size > settings.CAPTURE_MAX_BODY_BYTES or content_type not in (JSON_TYPE, FORM_TYPE):
+        return None, None, size
+    # Read before the view; Django keeps it for the view's own parsing
+    raw = request.body
+    if content_type == FORM_TYPE:
+        return 'form', scrub_pairs(parse_qsl(raw.decode(errors='replace'), keep_blank_values=True)), size
+    try:
+        return 'json', scrub(json.loads(raw)), size
+    except ValueError:
+        return None, None, size
+
+
+def write_record(path, record):
+    """Append one record as a single write, so concurrent writers do not interleave lines."""
+    line = (json.dumps(record, separators=(',', ':'), default=str) + '\n').encode()
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+class CaptureMiddleware:
+    """Record a sample of requests to `CAPTURE_FILE`; place after `AuthenticationMiddleware`."""
+
+    def __init__(self, get_response):
+        if not settings.CAPTURE_FILE or settings.CAPTURE_RATE <= 0:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.CAPTURE_RATE or request.path.startswith(EXCLUDED_PREFIXES):
+            return self.get_response(request)
+
+        arrived = time.time()
+        body_kind, body, body_bytes = capture_body(request)
+        started = perf_counter()
+        response = self.get_response(request)
+        duration = perf_counter() - started
+
+        # DRF sets the user it authenticated (JWT included) on the Django request too
+        user = getattr(request, 'user', None)
+        write_record(settings.CAPTURE_FILE, {
+            'ts': round(arrived, 6),
+            'method': request.method,
+            'path': request.path,
+            'query': scrub_pairs(parse_qsl(request.META.get('QUERY_STRING', ''), keep_blank_values=True)),
+            'body_kind': body_kind,
+            'body': body,
+            'body_bytes': body_bytes,
+            'user': pseudonym(user.pk) if user is not None and user.is_authenticated else None,
+            'view': current_view(),
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 3),
+        })
+        return response
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring.startup import measure_startup, package_totals
+
+
+class Command(BaseCommand):
+    help = 'Report import times and time to first request of the WSGI/ASGI application.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--app', choices=('wsgi', 'asgi'), default='wsgi')
+        parser.add_argument('--path', default='/balances/', help='Path of the first request.')
+        parser.add_argument('--top', type=int, default=20, help='Number of packages and modules to list.')
+        parser.add_argument('--warmup', action='store_true', help='Warm up before the first request.')
+        parser.add_argument('--check', action='store_true',
+                            help='Fail when the cold start exceeds STARTUP_BUDGET_SECONDS.')
+
+    def handle(self, *args, **options):
+        try:
+            result = measure_startup(options['app'], options['path'], options['warmup'])
+        except RuntimeError as error:
+            raise CommandError(str(error))
+
+        top = options['top']
+        self.stdout.write('Packages by import time (self, summed):')
+        for package, seconds in package_totals(result['modules'])[:top]:
+            self.stdout.write(f'  {seconds * 1000:9.1f} ms  {package}')
+
+        self.stdout.write('Modules by cumulative import time:')
+        modules = sorted(result['modules'], key=lambda module: module['cumulative'], reverse=True)
+        for module in modules[:top]:
+            self.stdout.write(
+                f'  {module["cumulative"] * 1000:9.1f} ms  {module["module"]} (self {module["self"] * 1000:.1f} ms)'
+            )
+
+        budget = settings.STARTUP_BUDGET_SECONDS
+        self.stdout.write(
+            f'Imported core.{options["app"]} in {result["import_seconds"]:.3f}s, '
+            f'warm-up {result["warmup_seconds"]:.3f}s, '
+            f'first request ({result["status"]}) in {result["first_request_seconds"]:.3f}s, '
+            f'cold start {result["total_seconds"]:.3f}s of {budget:.3f}s budget.'
+        )
+        if options['check'] and result['total_seconds'] > budget:
+            raise CommandError(f'Cold start of {result["total_seconds"]:.3f}s exceeds the {budget:.3f}s budget.')
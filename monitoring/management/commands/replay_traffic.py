@@ -0,0 +1,66 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from monitoring.replay import HttpSender, assign_users, load_capture, replay, summarize
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Replay a traffic capture (CAPTURE_FILE) against a running instance and report latency per endpoint.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('capture', help='Capture file written by the capture middleware.')
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Instance to send the requests to.')
+        parser.add_argument('--speed', type=float, default=1.0,
+                            help='Multiple of the captured pace (2 is twice as fast, 0 as fast as possible).')
+        parser.add_argument('--workers', type=int, default=8, help='Number of concurrent requests.')
+        parser.add_argument('--limit', type=int, help='Replay only the first N requests.')
+        parser.add_argument('--method', action='append', dest='methods',
+                            help='Replay only these methods, e.g. --method GET for a read-only run.')
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help='Local user ids the captured users are mapped onto (default every active user).')
+        parser.add_argument('--timeout', type=float, default=30, help='Seconds before a request counts as failed.')
+
+    def handle(self, *args, **options):
+        if options['speed'] < 0 or options['workers'] < 1:
+            raise CommandError('--speed must not be negative and --workers must be at least 1.')
+        try:
+            records = load_capture(options['capture'], options['methods'], options['limit'])
+        except OSError as error:
+            raise CommandError(f'Cannot read the capture: {error}')
+        if not records:
+            raise CommandError('The capture has no requests to replay.')
+
+        users = User.objects.filter(is_active=True).order_by('pk')
+        if options['users']:
+            users = users.filter(pk__in=options['users'])
+        users = list(users)
+        mapping = assign_users(records, [user.pk for user in users])
+        by_id = {user.pk: user for user in users}
+        tokens = {name: str(AccessToken.for_user(by_id[user_id])) for name, user_id in mapping.items()}
+
+        started = time.monotonic()
+        sender = HttpSender(options['base_url'], tokens, options['timeout'])
+        results = replay(records, sender, options['speed'], options['workers'])
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(
+            f'{"endpoint":40} {"requests":>8} {"errors":>7} {"4xx":>7} '
+            f'{"p50 ms":>9} {"p90 ms":>9} {"p99 ms":>9} {"max ms":>9} {"lag ms":>9}'
+        )
+        for row in summarize(results):
+            self.stdout.write(
+                f'{row["endpoint"][:40]:40} {row["requests"]:8d} {row["error_rate"]:7.1%} '
+                f'{row["client_error_rate"]:7.1%} {row["p50"]:9.1f} {row["p90"]:9.1f} {row["p99"]:9.1f} '
+                f'{row["max"]:9.1f} {row["max_lag"]:9.1f}'
+            )
+
+        failed = sum(1 for result in results if result['status'] is None or result['status'] >= 500)
+        self.stdout.write(self.style.SUCCESS(
+            f'Replayed {len(results)} requests of {len(mapping)} users in {elapsed:.3f}s '
+            f'({len(results) / elapsed:.1f} req/s), {failed} server errors.'
+        ))
@@ -0,0 +1,163 @@
+"""
+In-process metrics registry, rendered in the Prometheus text format.
+
+`MetricsMiddleware` records one observation per request, labeled by view
+(`BalanceViewSet.list`, `ExportView.get`, ...): the request count, its latency,
+and the number and time of its database queries and of serializing its
+response. Recording updates a few dictionary entries under a lock.
+
+Every worker process has its own registry. With `METRICS_DIR` set, each
+process also writes its registry to `<METRICS_DIR>/<pid>.json` at most every
+`METRICS_FLUSH_SECONDS`, and the `/metrics/` endpoint sums the files of all
+processes, so whichever worker serves the scrape reports the whole server.
+Files of exited workers are kept, which keeps the summed counters monotonic;
+clear the directory when the server is (re)started, not while it runs.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+COUNTER, HISTOGRAM = 'counter', 'histogram'
+
+# name: (type, help, label names, histogram buckets)
+METRICS = {
+    'api_requests_total': (COUNTER, 'Requests served.', ('view', 'method', 'status'), None),
+    'api_request_duration_seconds': (HISTOGRAM, 'Time to serve a request.', ('view',), LATENCY_BUCKETS),
+    'api_request_db_queries': (HISTOGRAM, 'Database queries per request.', ('view',), QUERY_COUNT_BUCKETS),
+    'api_db_queries_total': (COUNTER, 'Database queries run by requests.', ('view',), None),
+    'api_db_seconds_total': (COUNTER, 'Time spent in database queries.', ('view',), None),
+    'api_serializer_seconds_total': (COUNTER, 'Time spent in serializer `.data`, including lazy queries.',
+                                     ('view',), None),
+}
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = defaultdict(float)
+            # (name, labels): [count per bucket..., count above the last bucket, sum]
+            self.histograms = {}
+            self._flushed_at = 0.0
+
+    def _observe(self, name, labels, value):
+        buckets = METRICS[name][3]
+        state = self.histograms.get((name, labels))
+        if state is None:
+            state = self.histograms[(name, labels)] = [0] * (len(buckets) + 1) + [0.0]
+        # Buckets are upper bounds, inclusive
+        state[bisect_left(buckets, value)] += 1
+        state[-1] += value
+
+    def observe_request(self, view, method, status, duration, queries, db_seconds, serializer_seconds):
+        labels = (view,)
+        with self._lock:
+            self.counters[('api_requests_total', (view, method, str(status)))] += 1
+            self._observe('api_request_duration_seconds', labels, duration)
+            self._observe('api_request_db_queries', labels, queries)
+            if queries:
+                self.counters[('api_db_queries_total', labels)] += queries
+                self.counters[('api_db_seconds_total', labels)] += db_seconds
+            if serializer_seconds:
+                self.counters[('api_serializer_seconds_total', labels)] += serializer_seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, list(labels), list(state)] for (name, labels), state in self.histograms.items()],
+            }
+
+    def maybe_flush(self):
+        """Write this process's registry to `METRICS_DIR` if the last write is older than the flush interval."""
+        if settings.METRICS_DIR and time.monotonic() - self._flushed_at >= settings.METRICS_FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        directory = Path(settings.METRICS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        self._flushed_at = time.monotonic()
+        path = directory / f'{os.getpid()}.json'
+        temporary = path.with_name(path.name + '.tmp')
+        temporary.write_text(json.dumps(self.snapshot()))
+        os.replace(temporary, path)
+
+
+registry = Registry()
+
+
+def merge(snapshots):
+    """Sum registry snapshots into {(name, labels): value or histogram state}."""
+    merged = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(labels))
+            merged[key] = merged.get(key, 0) + value
+        for name, labels, state in snapshot['histograms']:
+            key = (name, tuple(labels))
+            current = merged.get(key)
+            merged[key] = state if current is None else [total + value for total, value in zip(current, state)]
+    return merged
+
+
+def collect():
+    """The metrics of every worker process when `METRICS_DIR` is set, otherwise of this one."""
+    if not settings.METRICS_DIR:
+        return merge([registry.snapshot()])
+    registry.flush()
+    snapshots = []
+    for path in Path(settings.METRICS_DIR).glob('*.json'):
+        try:
+            snapshots.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            # Replaced or removed while being read
+            continue
+    return merge(snapshots)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(merged):
+    """Render merged metrics in the Prometheus text exposition format (version 0.0.4)."""
+    by_name = defaultdict(list)
+    for (name, labels), value in merged.items():
+        by_name[name].append((labels, value))
+
+    lines = []
+    for name, (kind, help_text, label_names, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(by_name.get(name, [])):
+            if kind == COUNTER:
+                lines.append(f'{name}{_labels(label_names, labels)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip([*buckets, '+Inf'], value[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(label_names, labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(label_names, labels)} {_number(value[-1])}')
+            lines.append(f'{name}_count{_labels(label_names, labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
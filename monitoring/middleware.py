@@ -0,0 +1,113 @@
+"""
+Per-request measurements for `monitoring.metrics`.
+
+The request's counters live in a context variable. The database wrapper
+installed on every connection adds to them, as does the timed `.data` of
+DRF serializers (only the outermost serializer is timed, so nested ones are
+not counted twice). Outside a request both cost a context variable lookup.
+"""
+from contextvars import ContextVar
+from time import perf_counter
+
+from .metrics import registry
+
+_stats = ContextVar('request_metrics', default=None)
+
+
+class RequestStats:
+    __slots__ = ('view', 'queries', 'db_seconds', 'serializer_seconds', 'serializing')
+
+    def __init__(self):
+        self.view = 'unresolved'
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializing = False
+
+
+def current_view():
+    """Name of the view the current request is served by, or None outside a request."""
+    stats = _stats.get()
+    return stats.view if stats is not None else None
+
+
+def view_name(view_func, method):
+    """`<ViewSet>.<action>` for DRF viewsets, `<View>.<method>` for class-based views, the function name otherwise."""
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    if view_class is None:
+        return getattr(view_func, '__name__', type(view_func).__name__)
+    method = method.lower()
+    actions = getattr(view_func, 'actions', None) or {}
+    # DRF answers HEAD with the GET action
+    action = actions.get(method) or (actions.get('get') if method == 'head' else None) or method
+    return f'{view_class.__name__}.{action}'
+
+
+def time_query(execute, sql, params, many, context):
+    """Database execute wrapper adding the query to the current request's counters."""
+    stats = _stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_seconds += perf_counter() - started
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """`connection_created` receiver; wrappers outlive reconnects, so it is added once per connection."""
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+def instrument_serializers():
+    """Time `BaseSerializer.data`, which `Serializer.data` and `ListSerializer.data` go through."""
+    from rest_framework.serializers import BaseSerializer
+
+    original = BaseSerializer.data.fget
+    if getattr(original, 'timed', False):
+        return
+
+    def data(self):
+        stats = _stats.get()
+        if stats is None or stats.serializing:
+            return original(self)
+        stats.serializing = True
+        started = perf_counter()
+        try:
+            return original(self)
+        finally:
+            stats.serializer_seconds += perf_counter() - started
+            stats.serializing = False
+
+    data.timed = True
+    BaseSerializer.data = property(data)
+
+
+class MetricsMiddleware:
+    """Record every request in the metrics registry; keep it first so the latency covers all middleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _stats.set(stats)
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _stats.reset(token)
+        registry.observe_request(
+            stats.view, request.method, response.status_code, perf_counter() - started,
+            stats.queries, stats.db_seconds, stats.serializer_seconds,
+        )
+        registry.maybe_flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        stats = _stats.get()
+        if stats is not None:
+            stats.view = view_name(view_func, request.method)
@@ -0,0 +1,82 @@
+"""
+Cold start probe, run in a fresh interpreter by `monitoring.startup`:
+
+    python -X importtime -m monitoring.probe wsgi /balances/ [--warmup]
+
+Imports the WSGI or ASGI application from `core`, serves one GET request
+and prints the timings as JSON on stdout (`-X importtime` writes to stderr).
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+
+
+def wsgi_request(application, path):
+    from wsgiref.util import setup_testing_defaults
+
+    environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path}
+    setup_testing_defaults(environ)
+    statuses = []
+    response = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    try:
+        b''.join(response)
+    finally:
+        if hasattr(response, 'close'):
+            response.close()
+    return int(statuses[0].split()[0])
+
+
+def asgi_request(application, path):
+    from asgiref.testing import ApplicationCommunicator
+
+    async def request():
+        communicator = ApplicationCommunicator(application, {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'query_string': b'',
+            'headers': [(b'host', b'localhost')],
+            'server': ('localhost', 80),
+            'client': ('127.0.0.1', 0),
+        })
+        await communicator.send_input({'type': 'http.request', 'body': b''})
+        start = await communicator.receive_output(timeout=30)
+        await communicator.wait(timeout=30)
+        return start['status']
+
+    return asyncio.run(request())
+
+
+def main(argv):
+    app, path = argv[0], argv[1]
+    warmup = '--warmup' in argv
+
+    started = time.perf_counter()
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    module = __import__(f'core.{app}', fromlist=['application'])
+    imported = time.perf_counter()
+
+    if warmup:
+        from monitoring.startup import warm_up
+        warm_up()
+    warmed = time.perf_counter()
+
+    request = wsgi_request if app == 'wsgi' else asgi_request
+    status = request(module.application, path)
+    finished = time.perf_counter()
+
+    json.dump({
+        'import_seconds': imported - started,
+        'warmup_seconds': warmed - imported,
+        'first_request_seconds': finished - warmed,
+        'status': status,
+    }, sys.stdout)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
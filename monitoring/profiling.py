@@ -0,0 +1,206 @@
+"""
+On-demand profiling of single requests by staff users.
+
+A request carrying `X-Profile: cprofile` (or `sample`), or `?profile=...`,
+from a user with `is_staff` runs under the chosen profiler:
+
+* `cprofile` traces every call with cProfile and is stored in pstats format;
+* `sample` snapshots the request's stack every `PROFILE_SAMPLE_INTERVAL`
+  seconds from a background thread, which costs the request next to
+  nothing, and is stored as collapsed stacks (`a;b;c <samples>`), the input
+  format of flamegraph.pl and speedscope.
+
+Profiles are written to `PROFILE_DIR` next to a JSON file describing the
+request, keeping the newest `PROFILE_MAX_FILES`. The response carries their
+id in `X-Profile-Id`; staff retrieve them from `/profiles/<id>/`.
+
+`ProfilingMiddleware` only looks for the trigger on other requests, and is
+removed altogether when `PROFILING_ENABLED` is off.
+"""
+import cProfile
+import io
+import json
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+
+MODES = ('cprofile', 'sample')
+FILES = {'cprofile': 'pstats', 'sample': 'folded'}
+PROFILE_ID = re.compile(r'^[0-9a-f]{32}$')
+TOP_FUNCTIONS = 40
+
+
+class Sampler:
+    """Collect the stacks of one thread at a fixed interval, as collapsed stack counts."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def collapse(frame):
+    """The stack ending in `frame`, outermost first, as `function (file:line);...`."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def _directory():
+    directory = Path(settings.PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def _prune(directory):
+    profiles = sorted(directory.glob('*.json'), key=lambda path: path.stat().st_mtime)
+    for path in profiles[:max(len(profiles) - settings.PROFILE_MAX_FILES, 0)]:
+        for sibling in directory.glob(f'{path.stem}.*'):
+            sibling.unlink(missing_ok=True)
+
+
+def save_profile(mode, data, meta):
+    """Store a profile (a `cProfile.Profile` or collapsed stack counts) and its description; return its id."""
+    directory = _directory()
+    profile_id = uuid.uuid4().hex
+    path = directory / f'{profile_id}.{FILES[mode]}'
+    if mode == 'cprofile':
+        data.dump_stats(path)
+    else:
+        path.write_text(''.join(f'{stack} {count}\n' for stack, count in data.most_common()))
+    meta = {'id': profile_id, 'mode': mode, 'created_at': timezone.now().isoformat(), **meta}
+    (directory / f'{profile_id}.json').write_text(json.dumps(meta))
+    _prune(directory)
+    return profile_id
+
+
+def load_meta(profile_id):
+    """The description of a stored profile, or None."""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = Path(settings.PROFILE_DIR) / f'{profile_id}.json'
+    return json.loads(path.read_text()) if path.exists() else None
+
+
+def profile_path(meta):
+    return Path(settings.PROFILE_DIR) / f"{meta['id']}.{FILES[meta['mode']]}"
+
+
+def list_profiles():
+    """Descriptions of the stored profiles, newest first."""
+    directory = Path(settings.PROFILE_DIR)
+    if not directory.exists():
+        return []
+    profiles = [json.loads(path.read_text()) for path in directory.glob('*.json')]
+    return sorted(profiles, key=lambda meta: meta['created_at'], reverse=True)
+
+
+def summary(meta):
+    """A readable summary: the pstats table by cumulative time, or the functions sampled most often."""
+    path = profile_path(meta)
+    if meta['mode'] == 'cprofile':
+        out = io.StringIO()
+        pstats.Stats(str(path), stream=out).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        return out.getvalue()
+
+    own, total = Counter(), 0
+    for line in path.read_text().splitlines():
+        stack, _, count = line.rpartition(' ')
+        own[stack.rpartition(';')[2]] += int(count)
+        total += int(count)
+    lines = [f'{total} samples every {meta["interval"] * 1000:g} ms, by function on top of the stack:']
+    lines.extend(f'{count:8d} {count / total:6.1%}  {function}' for function, count in own.most_common(TOP_FUNCTIONS))
+    if not total:
+        lines.append('The request finished before the first sample.')
+    return '\n'.join(lines) + '\n'
+
+
+def requested_mode(request):
+    """The profiler asked for by the request, or None; invalid names count as `cprofile`."""
+    mode = request.META.get('HTTP_X_PROFILE')
+    if mode is None and 'profile=' in request.META.get('QUERY_STRING', ''):
+        mode = request.GET.get('profile')
+    if not mode:
+        return None
+    return mode if mode in MODES else 'cprofile'
+
+
+def staff_user(request):
+    """The request's user if it is staff, authenticating like the API does (session or JWT)."""
+    from rest_framework.exceptions import APIException
+    from rest_framework.request import Request
+    from rest_framework.settings import api_settings
+
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        authenticators = [authentication() for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+        try:
+            user = Request(request, authenticators=authenticators).user
+        except APIException:
+            return None
+    return user if user.is_authenticated and user.is_staff else None
+
+
+class ProfilingMiddleware:
+    """Profile the requests of staff users that ask for it; place after `AuthenticationMiddleware`."""
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = requested_mode(request)
+        if mode is None:
+            return self.get_response(request)
+        user = staff_user(request)
+        if user is None:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        if mode == 'cprofile':
+            profiler = data = cProfile.Profile()
+            response = profiler.runcall(self.get_response, request)
+            meta = {}
+        else:
+            interval = settings.PROFILE_SAMPLE_INTERVAL
+            with Sampler(threading.get_ident(), interval) as sampler:
+                response = self.get_response(request)
+            data, meta = sampler.stacks, {'interval': interval}
+        meta.update({
+            'user_id': user.pk,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+        })
+        response['X-Profile-Id'] = save_profile(mode, data, meta)
+        return response
@@ -0,0 +1,153 @@
+"""
+Replay of captured traffic (see `monitoring.capture`) against a running instance.
+
+`replay` sends the captured requests again, at their original pace divided by
+`speed` (0 sends them as fast as the workers allow), from a pool of worker
+threads. Each user pseudonym of the capture is mapped to a local user, whose
+access token authenticates its requests, so the per-user access mix is kept.
+
+Requests are grouped by the view that served them in production
+(`BalanceViewSet.list`), which folds object ids in paths together. `summarize`
+reports the latency percentiles, server errors (5xx and failed connections)
+and client errors of each group. Captured paths name objects of the original
+users, so client errors are expected and kept apart. `max_lag` is how far the
+dispatcher fell behind the schedule, i.e. the workers could not keep up.
+"""
+import json
+import math
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+PERCENTILES = (50, 90, 99)
+
+
+def load_capture(path, methods=None, limit=None):
+    """The records of a capture file in arrival order, optionally only of `methods` and the first `limit`."""
+    records = []
+    with open(path) as capture:
+        for line in capture:
+            # A line cut off by an interrupted writer is skipped
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if methods and record['method'] not in methods:
+                continue
+            records.append(record)
+    records.sort(key=lambda record: record['ts'])
+    return records[:limit] if limit else records
+
+
+def endpoint(record):
+    """The group a record is reported in: its view, or its method and path when no view served it."""
+    view = record.get('view')
+    if view and view != 'unresolved':
+        return view
+    return f"{record['method']} {record['path']}"
+
+
+def assign_users(records, user_ids):
+    """Map the user pseudonyms of the capture onto `user_ids`, round-robin in order of first appearance."""
+    pseudonyms = list(dict.fromkeys(record['user'] for record in records if record['user']))
+    if not user_ids:
+        return {}
+    return {name: user_ids[index % len(user_ids)] for index, name in enumerate(pseudonyms)}
+
+
+class HttpSender:
+    """Send a captured request to `base_url`, authenticated with `tokens[pseudonym]` when it had a user."""
+
+    def __init__(self, base_url, tokens, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.tokens = tokens
+        self.timeout = timeout
+
+    def build(self, record):
+        url = self.base_url + record['path']
+        if record['query']:
+            url += '?' + urlencode(record['query'])
+        headers, data = {}, None
+        if record['body_kind'] == 'json':
+            headers['Content-Type'] = 'application/json'
+            data = json.dumps(record['body']).encode()
+        elif record['body_kind'] == 'form':
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            data = urlencode(record['body']).encode()
+        token = self.tokens.get(record['user'])
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        return Request(url, data=data, headers=headers, method=record['method'])
+
+    def __call__(self, record):
+        """Return the response status, or None when the request failed without one."""
+        try:
+            with urlopen(self.build(record), timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except HTTPError as error:
+            error.read()
+            return error.code
+        except (URLError, OSError):
+            return None
+
+
+def replay(records, send, speed=1.0, workers=8):
+    """Send `records` with `send` on their captured schedule; return a result dict per record."""
+    if not records:
+        return []
+    first = records[0]['ts']
+    results = []
+    lock = threading.Lock()
+    started = time.monotonic()
+
+    def run(record, due):
+        lag = time.monotonic() - due
+        sent = perf_counter()
+        status = send(record)
+        result = {'endpoint': endpoint(record), 'status': status, 'seconds': perf_counter() - sent, 'lag': lag}
+        with lock:
+            results.append(result)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for record in records:
+            due = started + ((record['ts'] - first) / speed if speed else 0)
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(run, record, due)
+    return results
+
+
+def percentile(ordered, percent):
+    """Nearest-rank percentile of an ordered, non-empty list."""
+    rank = max(math.ceil(len(ordered) * percent / 100), 1)
+    return ordered[rank - 1]
+
+
+def summarize(results):
+    """Per endpoint, busiest first: count, error rates and latency percentiles in milliseconds."""
+    groups = defaultdict(list)
+    for result in results:
+        groups[result['endpoint']].append(result)
+
+    rows = []
+    for name, group in groups.items():
+        latencies = sorted(result['seconds'] * 1000 for result in group)
+        server_errors = sum(1 for result in group if result['status'] is None or result['status'] >= 500)
+        client_errors = sum(1 for result in group if result['status'] is not None and 400 <= result['status'] < 500)
+        rows.append({
+            'endpoint': name,
+            'requests': len(group),
+            'error_rate': server_errors / len(group),
+            'client_error_rate': client_errors / len(group),
+            **{f'p{percent}': percentile(latencies, percent) for percent in PERCENTILES},
+            'max': latencies[-1],
+            'max_lag': max(result['lag'] for result in group) * 1000,
+        })
+    return sorted(rows, key=lambda row: (-row['requests'], row['endpoint']))
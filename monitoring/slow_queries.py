@@ -0,0 +1,169 @@
+"""
+Slow-query log.
+
+`log_slow_queries`, a database execute wrapper installed on every connection,
+times each statement. Those taking at least `SLOW_QUERY_SECONDS` are written
+as one JSON line to the `monitoring.slow_queries` logger (a rotating file,
+see `LOGGING`). Each line has the statement's shape, the view it ran for,
+the application frames that issued it, and its plan.
+
+Statements are grouped by shape: the SQL with literals replaced and
+`IN (%s, %s, ...)` lists collapsed. A shape is logged, and explained, at most
+once per `SLOW_QUERY_DEDUP_SECONDS` per process; the occurrences in between
+are only counted and reported with the next line. The plan is captured with
+`EXPLAIN`. A `SLOW_QUERY_ANALYZE_RATE` fraction of logged SELECTs get
+`EXPLAIN ANALYZE` where the database supports it, which runs them again.
+"""
+import json
+import logging
+import random
+import re
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from contextvars import ContextVar
+from hashlib import sha1
+from time import perf_counter
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from . import middleware
+from .middleware import current_view
+
+logger = logging.getLogger(__name__)
+
+MAX_SHAPES = 1000
+STACK_DEPTH = 8
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+
+_IN_LIST = re.compile(r'\bIN \((?:%s|\?)(?:, (?:%s|\?))*\)', re.IGNORECASE)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w"])-?\d+(?:\.\d+)?\b')
+_SPACE = re.compile(r'\s+')
+# Django's savepoint names: s<thread id>_x<counter>
+_SAVEPOINT = re.compile(r'"s\d+_x\d+"')
+
+_OWN_FILES = {__file__, middleware.__file__}
+_explaining = ContextVar('explaining_slow_query', default=False)
+
+
+def normalize(sql):
+    """The shape of a statement: literals as `?`, IN lists as `IN (...)`, single spaces."""
+    shape = _SAVEPOINT.sub('"s?"', sql)
+    shape = _STRING.sub('?', shape)
+    shape = _NUMBER.sub('?', shape)
+    shape = _IN_LIST.sub('IN (...)', shape)
+    return _SPACE.sub(' ', shape).strip()
+
+
+def stack_summary():
+    """The innermost application frames, outermost first, as `path:line in function`."""
+    root = str(settings.BASE_DIR) + '/'
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(root) and '/site-packages/' not in frame.filename
+        and frame.filename not in _OWN_FILES
+    ]
+    return [f'{frame.filename[len(root):]}:{frame.lineno} in {frame.name}' for frame in frames[-STACK_DEPTH:]]
+
+
+class ShapeTracker:
+    """Which shapes were logged recently, and how often each was seen since; bounded to `MAX_SHAPES`."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._shapes = OrderedDict()
+
+    def seen(self, shape, duration):
+        """Count an occurrence; return (suppressed occurrences, slowest of them) when it should be logged, else None."""
+        now = time.monotonic()
+        with self._lock:
+            state = self._shapes.get(shape)
+            if state is not None and now - state[0] < settings.SLOW_QUERY_DEDUP_SECONDS:
+                state[1] += 1
+                state[2] = max(state[2], duration)
+                return None
+            self._shapes[shape] = [now, 0, 0.0]
+            self._shapes.move_to_end(shape)
+            while len(self._shapes) > MAX_SHAPES:
+                self._shapes.popitem(last=False)
+            return (state[1], state[2]) if state is not None else (0, 0.0)
+
+    def clear(self):
+        with self._lock:
+            self._shapes.clear()
+
+
+shapes = ShapeTracker()
+
+
+def explain(connection, sql, params, analyze=False):
+    """Return (plan lines, analyzed) of a statement, or (None, False) when it cannot be explained."""
+    try:
+        prefix = connection.ops.explain_query_prefix(analyze=True) if analyze else None
+    except ValueError:
+        prefix = None
+    analyzed = prefix is not None
+    prefix = prefix or connection.ops.explain_query_prefix()
+
+    token = _explaining.set(True)
+    try:
+        # A failed EXPLAIN must not abort the transaction the statement ran in
+        with transaction.atomic(using=connection.alias, savepoint=connection.in_atomic_block):
+            with connection.cursor() as cursor:
+                cursor.execute(f'{prefix} {sql}', params)
+                rows = cursor.fetchall()
+    except DatabaseError:
+        return None, False
+    finally:
+        _explaining.reset(token)
+    return [' '.join(str(column) for column in row) for row in rows], analyzed
+
+
+def log_slow_queries(execute, sql, params, many, context):
+    """Database execute wrapper logging the statements slower than `SLOW_QUERY_SECONDS`."""
+    started = perf_counter()
+    result = execute(sql, params, many, context)
+    duration = perf_counter() - started
+    threshold = settings.SLOW_QUERY_SECONDS
+    if threshold and duration >= threshold and not _explaining.get():
+        _log(context['connection'], sql, params, many, duration)
+    return result
+
+
+def _log(connection, sql, params, many, duration):
+    shape = normalize(sql)
+    previous = shapes.seen(shape, duration)
+    if previous is None:
+        return
+
+    statement = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ''
+    plan, analyzed = None, False
+    if not many and statement in EXPLAINABLE:
+        analyze = statement == 'SELECT' and random.random() < settings.SLOW_QUERY_ANALYZE_RATE
+        plan, analyzed = explain(connection, sql, params, analyze)
+
+    logger.warning(json.dumps({
+        'event': 'slow_query',
+        'duration_ms': round(duration * 1000, 3),
+        'threshold_ms': round(settings.SLOW_QUERY_SECONDS * 1000, 3),
+        'database': connection.alias,
+        'view': current_view(),
+        'shape': shape,
+        'shape_id': sha1(shape.encode()).hexdigest()[:16],
+        'sql': sql,
+        'many': many,
+        'suppressed': previous[0],
+        'suppressed_max_ms': round(previous[1] * 1000, 3),
+        'stack': stack_summary(),
+        'plan': plan,
+        'analyzed': analyzed,
+    }))
+
+
+def install_slow_query_log(sender, connection, **kwargs):
+    """`connection_created` receiver, see `monitoring.middleware.install_query_timer`."""
+    if log_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log_slow_queries)
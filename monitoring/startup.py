@@ -0,0 +1,105 @@
+import json
+import logging
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def parse_import_times(output):
+    """
+    Parse `python -X importtime` output into a list of
+    {'module', 'self', 'cumulative', 'depth'} dicts, times in seconds.
+    """
+    modules = []
+    for line in output.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        modules.append({
+            'module': module,
+            'self': int(self_us) / 1e6,
+            'cumulative': int(cumulative_us) / 1e6,
+            'depth': (len(indent) - 1) // 2,
+        })
+    return modules
+
+
+def package_totals(modules):
+    """Sum the self import time of every module per top-level package."""
+    totals = defaultdict(float)
+    for module in modules:
+        totals[module['module'].partition('.')[0]] += module['self']
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def measure_startup(app='wsgi', path='/balances/', warmup=False):
+    """
+    Start a fresh interpreter that imports `core.<app>` and serves a single
+    GET request to `path`, and return its timings and import breakdown.
+
+    `total_seconds` is the wall time of the whole process, interpreter start
+    up included, and is what `STARTUP_BUDGET_SECONDS` is compared against.
+    """
+    if app not in ('wsgi', 'asgi'):
+        raise ValueError(f'Unknown application "{app}", expected wsgi or asgi.')
+
+    command = [sys.executable, '-X', 'importtime', '-m', 'monitoring.probe', app, path]
+    if warmup:
+        command.append('--warmup')
+
+    started = time.perf_counter()
+    process = subprocess.run(command, cwd=settings.BASE_DIR, capture_output=True, text=True)
+    total = time.perf_counter() - started
+    if process.returncode:
+        raise RuntimeError(f'Startup probe failed:\n{process.stderr[-2000:]}')
+
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    result['total_seconds'] = total
+    result['modules'] = parse_import_times(process.stderr)
+    return result
+
+
+def _view_classes(patterns):
+    for pattern in patterns:
+        if hasattr(pattern, 'url_patterns'):
+            yield from _view_classes(pattern.url_patterns)
+            continue
+        view_class = getattr(pattern.callback, 'cls', None) or getattr(pattern.callback, 'view_class', None)
+        if view_class is not None:
+            yield view_class
+
+
+def warm_up():
+    """
+    Do the work the first requests would otherwise pay for: populate the URL
+    resolver, build the fields of every view's serializer and open the
+    database connections.
+    """
+    from django.db import connections
+    from django.urls import get_resolver
+
+    resolver = get_resolver()
+    resolver.reverse_dict
+
+    serializer_classes = {
+        serializer_class
+        for view_class in _view_classes(resolver.url_patterns)
+        if (serializer_class := getattr(view_class, 'serializer_class', None)) is not None
+    }
+    for serializer_class in serializer_classes:
+        try:
+            serializer_class().fields
+        except Exception:
+            logger.exception('Failed to warm up %s', serializer_class.__name__)
+
+    for connection in connections.all():
+        connection.ensure_connection()
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from .views import ProfileDetailView, ProfileListView, metrics_view
+
+urlpatterns = [
+    path('metrics/', metrics_view, name='metrics'),
+    path('profiles/', ProfileListView.as_view(), name='profile-list'),
+    path('profiles/<str:profile_id>/', ProfileDetailView.as_view(), name='profile-detail'),
+]
@@ -0,0 +1,64 @@
+from hmac import compare_digest
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_safe
+from rest_framework import serializers
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .metrics import collect, render
+from .profiling import list_profiles, load_meta, profile_path, staff_user, summary
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _authorized(request):
+    token = settings.METRICS_TOKEN
+    if token and compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    return staff_user(request) is not None
+
+
+@require_safe
+def metrics_view(request):
+    """The metrics of all worker processes, for Prometheus (bearer `METRICS_TOKEN`) or staff users, by session or JWT."""
+    if not _authorized(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render(collect()), content_type=CONTENT_TYPE)
+
+
+class ProfileOutputSerializer(serializers.Serializer):
+    output = serializers.ChoiceField(choices=['json', 'text', 'raw'], default='json', help_text=(
+        "json: the description of the request; text: a readable summary; "
+        "raw: the pstats file (cprofile) or collapsed stacks (sample)."
+    ))
+
+
+class ProfileListView(APIView):
+    """The stored request profiles, newest first."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(list_profiles())
+
+
+class ProfileDetailView(APIView):
+    """One stored request profile."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, profile_id):
+        meta = load_meta(profile_id)
+        if meta is None:
+            raise Http404
+        query = ProfileOutputSerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        output = query.validated_data['output']
+        if output == 'text':
+            return HttpResponse(summary(meta), content_type='text/plain; charset=utf-8')
+        if output == 'raw':
+            path = profile_path(meta)
+            return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
+        return Response(meta)
@@ -0,0 +1,67 @@
+"""
+Which shard holds which user's ledger.
+
+The directory is the `ShardAssignment` table on `default`, read through the
+cache for `SHARD_DIRECTORY_TTL` seconds. A change made by `move_user_shard`
+reaches every web worker within that time, which is why the move waits that
+long between its steps.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+User = get_user_model()
+
+
+def _key(user_id):
+    return f'sharding:user:{user_id}'
+
+
+def lookup(user_id):
+    """Return (alias, read_only) of the database holding the ledger of `user_id`."""
+    if not settings.SHARD_DATABASES:
+        return DEFAULT_DB_ALIAS, False
+
+    entry = cache.get(_key(user_id))
+    if entry is None:
+        from .models import ShardAssignment
+
+        row = ShardAssignment.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_id).values_list(
+            'alias', 'read_only'
+        ).first()
+        entry = tuple(row) if row else (DEFAULT_DB_ALIAS, False)
+        cache.set(_key(user_id), entry, timeout=settings.SHARD_DIRECTORY_TTL)
+    return entry
+
+
+def ledger_databases():
+    """Every database that may hold ledgers: `default` and the shards."""
+    return [DEFAULT_DB_ALIAS, *settings.SHARD_DATABASES]
+
+
+def forget(user_id):
+    cache.delete(_key(user_id))
+
+
+def set_assignment(user_id, alias, read_only=False):
+    from .models import ShardAssignment
+
+    ShardAssignment.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+        user_id=user_id, defaults={'alias': alias, 'read_only': read_only}
+    )
+    forget(user_id)
+
+
+def place_new_user(user):
+    """Assign a new user to a shard, spreading users evenly by id."""
+    shards = settings.SHARD_DATABASES
+    set_assignment(user.pk, shards[user.pk % len(shards)])
+
+
+def replicate_user(user, alias):
+    """Create or update the copy of `user` on the shard `alias`."""
+    values = {
+        field.attname: getattr(user, field.attname) for field in user._meta.concrete_fields if not field.primary_key
+    }
+    User._base_manager.using(alias).update_or_create(pk=user.pk, defaults=values)
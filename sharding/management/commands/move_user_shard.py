@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from sharding.moves import move_user
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Move users' ledgers to another shard while they keep using the API."
+
+    def add_arguments(self, parser):
+        parser.add_argument('target', help="Shard alias to move to, or 'default'.")
+        parser.add_argument('--user', type=int, action='append', dest='users', required=True,
+                            help="Id of a user to move (repeatable).")
+        parser.add_argument('--grace', type=float,
+                            help="Seconds to wait for web workers to see a directory change "
+                                 "(default SHARD_DIRECTORY_TTL).")
+
+    def handle(self, *args, **options):
+        target = options['target']
+        if target != DEFAULT_DB_ALIAS and target not in settings.SHARD_DATABASES:
+            raise CommandError(f"Unknown shard {target}, expected one of {', '.join(settings.SHARD_DATABASES)}.")
+
+        users = {user.pk: user for user in User.objects.filter(pk__in=options['users'])}
+        for user_id in options['users']:
+            if user_id not in users:
+                raise CommandError(f"User {user_id} does not exist.")
+
+        for user_id in options['users']:
+            try:
+                result = move_user(
+                    users[user_id], target, grace=options['grace'],
+                    log=lambda message: self.stdout.write(f"user {user_id}: {message}"),
+                )
+            except ValueError as error:
+                raise CommandError(str(error))
+            self.stdout.write(self.style.SUCCESS(
+                f"Moved user {user_id} from {result['source']} to {result['target']}."
+            ))
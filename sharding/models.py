@@ -0,0 +1,19 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+
+User = get_user_model()
+
+
+class ShardAssignment(models.Model):
+    """
+    The shard holding a user's ledger. Lives on `default` with the users; a user
+    without an assignment (created before sharding was enabled) lives on `default`.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="shard_assignment")
+    alias = models.CharField(max_length=50)
+    # Set while the user is being moved: reads continue, writes are refused
+    read_only = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id} on {self.alias}"
@@ -0,0 +1,213 @@
+"""
+Moving users between shards while they keep using the API.
+
+A move copies the user's ledger to the target from a consistent snapshot of
+the source while the user carries on, then marks the user read-only, copies
+what changed in the meantime, points the directory at the target and finally
+deletes the ledger from the source. Writes are refused (503) only between the
+read-only mark and the switch. Each copy brings the target exactly in line
+with the source, so an interrupted move can simply be run again.
+
+Objects keep their primary keys: shard N hands out ids from
+N * SHARD_ID_SPACING, so ids never collide between shards. Historical rows
+are internal and get new ids on the target.
+"""
+import time
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import AutoField, BigAutoField, Max, SmallAutoField
+from simple_history.models import HistoricalChanges
+
+from .directory import forget, lookup, replicate_user, set_assignment
+from .router import SHARDED_APPS, is_sharded
+
+User = get_user_model()
+
+SHARD_ID_SPACING = 1 << 40
+COPY_BATCH_SIZE = 500
+
+
+def shard_id_floor(alias):
+    if alias in settings.SHARD_DATABASES:
+        return (settings.SHARD_DATABASES.index(alias) + 1) * SHARD_ID_SPACING
+    return 0
+
+
+def sharded_models():
+    """The concrete models of the sharded apps, parents before children."""
+    return [model for label in SHARDED_APPS for model in apps.get_app_config(label).get_models()]
+
+
+def _is_history(model):
+    return issubclass(model, HistoricalChanges)
+
+
+def _owner_lookup(model):
+    """The lookup from `model` to the id of the user owning a row."""
+    fields = {field.name: field for field in model._meta.fields}
+    if 'user' in fields:
+        return 'user_id'
+    for field in fields.values():
+        if field.many_to_one and is_sharded(field.related_model):
+            return f'{field.name}__{_owner_lookup(field.related_model)}'
+    raise ImproperlyConfigured(f'{model._meta.label} has no path to the user owning its rows.')
+
+
+def _rows(model, alias, user_id):
+    return model._base_manager.using(alias).filter(**{_owner_lookup(model): user_id})
+
+
+def reset_id_sequences(alias, models=None):
+    """Make the tables on `alias` continue numbering after the highest id of the shard's own range."""
+    floor = shard_id_floor(alias)
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        for model in models if models is not None else sharded_models():
+            pk = model._meta.pk
+            if _is_history(model) or not isinstance(pk, (AutoField, BigAutoField, SmallAutoField)):
+                continue
+            own = model._base_manager.using(alias).filter(pk__gte=floor, pk__lt=floor + SHARD_ID_SPACING)
+            last = own.aggregate(last=Max('pk'))['last'] or floor
+            table = model._meta.db_table
+            if connection.vendor == 'sqlite':
+                cursor.execute('UPDATE sqlite_sequence SET seq = %s WHERE name = %s', [last, table])
+                if not cursor.rowcount:
+                    cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [table, last])
+            elif connection.vendor == 'postgresql':
+                cursor.execute(
+                    'SELECT setval(pg_get_serial_sequence(%s, %s), %s, %s)', [table, pk.column, max(last, 1), last > 0]
+                )
+            else:
+                raise NotImplementedError(f'Shard id ranges are not supported on {connection.vendor}.')
+
+
+@contextmanager
+def _snapshot(alias):
+    """Read from `alias` as of one point in time inside the block."""
+    connection = connections[alias]
+    outermost = not connection.in_atomic_block
+    with transaction.atomic(using=alias):
+        if outermost and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY')
+        yield
+
+
+def _insert(model, alias, objs, fields):
+    if objs:
+        batch_size = connections[alias].ops.bulk_batch_size(fields, objs) or COPY_BATCH_SIZE
+        for start in range(0, len(objs), batch_size):
+            # raw: keep the stored values of auto_now fields
+            model._base_manager._insert(objs[start:start + batch_size], fields=fields, using=alias, raw=True)
+
+
+def _sync_model(model, user_id, source, target):
+    """Insert or update the user's rows of `model` on `target` to match `source`; returns the rows written."""
+    fields = model._meta.local_concrete_fields
+    names = [field.attname for field in fields]
+    pk_name = model._meta.pk.attname
+    source_pks = sorted(_rows(model, source, user_id).values_list('pk', flat=True))
+
+    written = 0
+    for start in range(0, len(source_pks), COPY_BATCH_SIZE):
+        chunk = source_pks[start:start + COPY_BATCH_SIZE]
+        wanted = {row[pk_name]: row for row in model._base_manager.using(source).filter(pk__in=chunk).values(*names)}
+        stored = {row[pk_name]: row for row in model._base_manager.using(target).filter(pk__in=chunk).values(*names)}
+
+        _insert(model, target, [model(**row) for pk, row in wanted.items() if pk not in stored], fields)
+        written += len(wanted.keys() - stored.keys())
+        for pk, row in wanted.items():
+            if pk in stored and stored[pk] != row:
+                model._base_manager.using(target).filter(pk=pk).update(**row)
+                written += 1
+    return written
+
+
+def _append_history(model, user_id, source, target, after):
+    """Copy the user's historical rows of `model` with ids above `after`; returns (highest id, rows copied)."""
+    fields = [field for field in model._meta.local_concrete_fields if not field.primary_key]
+    rows = list(_rows(model, source, user_id).filter(pk__gt=after).order_by('pk'))
+    _insert(model, target, rows, fields)
+    return (rows[-1].pk if rows else after), len(rows)
+
+
+def copy_user_rows(user_id, source, target, history_marks):
+    """
+    Bring the user's ledger on `target` in line with `source`, in one transaction.
+
+    History is append-only and copied incrementally: `history_marks` maps each historical
+    model to the last source id copied and is updated in place. The history of models
+    without a mark is copied from scratch. Returns the number of rows written.
+    """
+    models = sharded_models()
+    written = 0
+    with transaction.atomic(using=target):
+        # Children before parents, so rows found by joining to their parent are still found
+        for model in reversed(models):
+            if _is_history(model):
+                if model not in history_marks:
+                    _rows(model, target, user_id)._raw_delete(target)
+                continue
+            source_pks = set(_rows(model, source, user_id).values_list('pk', flat=True))
+            stale = sorted(set(_rows(model, target, user_id).values_list('pk', flat=True)) - source_pks)
+            for start in range(0, len(stale), COPY_BATCH_SIZE):
+                batch = stale[start:start + COPY_BATCH_SIZE]
+                model._base_manager.using(target).filter(pk__in=batch)._raw_delete(target)
+            written += len(stale)
+
+        for model in models:
+            if _is_history(model):
+                history_marks[model], copied = _append_history(
+                    model, user_id, source, target, history_marks.get(model, 0)
+                )
+                written += copied
+            else:
+                written += _sync_model(model, user_id, source, target)
+        # Explicit ids push SQLite's sequences into the source's id range
+        reset_id_sequences(target)
+    return written
+
+
+def purge_user_rows(user_id, alias):
+    """Delete the user's ledger from `alias`."""
+    with transaction.atomic(using=alias):
+        for model in reversed(sharded_models()):
+            _rows(model, alias, user_id)._raw_delete(alias)
+        if alias != DEFAULT_DB_ALIAS:
+            User._base_manager.using(alias).filter(pk=user_id)._raw_delete(alias)
+
+
+def move_user(user, target, grace=None, log=lambda message: None):
+    """Move the ledger of `user` to the shard `target` (or back to `default`), online."""
+    if target != DEFAULT_DB_ALIAS and target not in settings.SHARD_DATABASES:
+        raise ValueError(f'{target} is not a shard.')
+    forget(user.pk)
+    source, _ = lookup(user.pk)
+    if source == target:
+        raise ValueError(f'User {user.pk} already lives on {target}.')
+    grace = settings.SHARD_DIRECTORY_TTL if grace is None else grace
+
+    if target != DEFAULT_DB_ALIAS:
+        replicate_user(user, target)
+    history_marks = {}
+    with _snapshot(source):
+        copied = copy_user_rows(user.pk, source, target, history_marks)
+    log(f'copied {copied} rows from {source} to {target}')
+
+    set_assignment(user.pk, source, read_only=True)
+    time.sleep(grace)
+    with _snapshot(source):
+        changed = copy_user_rows(user.pk, source, target, history_marks)
+    log(f'copied {changed} rows changed during the copy')
+
+    set_assignment(user.pk, target)
+    # Workers still holding the old directory entry read the (frozen) source until it expires
+    time.sleep(grace)
+    purge_user_rows(user.pk, source)
+    log(f'removed the ledger from {source}')
+    return {'user': user.pk, 'source': source, 'target': target, 'copied': copied, 'changed': changed}
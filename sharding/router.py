@@ -0,0 +1,121 @@
+"""
+User-keyed sharding of the ledger.
+
+All of a user's balances, categories and transactions, with their checkpoints,
+history and sync change log, live on one database of `SHARD_DATABASES`, so a
+write and its change entries commit together. Everything else (users, sessions,
+the shard directory) stays on `default`, which also keeps the ledgers of users
+that have no shard assigned. User rows are
+copied to the shard of their user, so the ledger's foreign keys hold there.
+
+`ShardRouter` sends the sharded apps to the shard of the request's user. The
+shard is looked up lazily, the first time a sharded model is used once the user
+is authenticated, so views need no changes. Code running outside a request
+picks a shard with `use_shard()` or `use_user_shard()`.
+
+Read replicas (`utils.routing`) only serve `default`: requests of sharded
+users read their ledger from the shard itself.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions, status
+
+from .directory import lookup
+
+SHARDED_APPS = ('balances', 'categories', 'transactions', 'sync')
+# Migrated on every shard as well, for the sharded apps' foreign keys to users
+SHARD_SUPPORT_APPS = ('auth', 'contenttypes')
+
+_routing = ContextVar('shard_routing', default=None)
+
+
+class ShardReadOnly(exceptions.APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Your data is being moved, try again in a moment.')
+    default_code = 'shard_read_only'
+
+
+def is_sharded(model):
+    return model._meta.app_label in SHARDED_APPS
+
+
+@contextmanager
+def use_shard(alias, read_only=False):
+    """Route the sharded apps to `alias` inside the block."""
+    token = _routing.set({'shard': alias, 'read_only': read_only})
+    try:
+        yield
+    finally:
+        _routing.reset(token)
+
+
+def use_user_shard(user_id):
+    """Route the sharded apps to the shard of `user_id` inside the block."""
+    return use_shard(*lookup(user_id))
+
+
+def _current():
+    """Return the routing state of the current request or block, or None if no shard is chosen."""
+    state = _routing.get()
+    if state is None:
+        return None
+    if 'shard' not in state:
+        user = getattr(state['request'], 'user', None)
+        if user is None or not user.is_authenticated:
+            return None
+        state['shard'], state['read_only'] = lookup(user.pk)
+    return state
+
+
+def _instance_db(hints):
+    instance = hints.get('instance')
+    if instance is not None and is_sharded(type(instance)):
+        return instance._state.db
+    return None
+
+
+class ShardRouter:
+    def db_for_read(self, model, **hints):
+        if not is_sharded(model):
+            return None
+        state = _current()
+        return _instance_db(hints) or (state['shard'] if state else None)
+
+    def db_for_write(self, model, **hints):
+        if not is_sharded(model):
+            return None
+        state = _current()
+        if state and state['read_only']:
+            raise ShardReadOnly()
+        return _instance_db(hints) or (state['shard'] if state else None)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        sharded = is_sharded(type(obj1)), is_sharded(type(obj2))
+        if all(sharded):
+            return obj1._state.db == obj2._state.db
+        if any(sharded):
+            # A ledger object and its user, which is copied to the ledger's shard
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.SHARD_DATABASES:
+            return app_label in SHARDED_APPS + SHARD_SUPPORT_APPS
+        return None
+
+
+class ShardRoutingMiddleware:
+    """Scope shard routing to one request; the shard follows whoever the request authenticates as."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _routing.set({'request': request})
+        try:
+            return self.get_response(request)
+        finally:
+            _routing.reset(token)
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+
+from .directory import forget, lookup, place_new_user, replicate_user
+from .moves import purge_user_rows, reset_id_sequences
+from .router import SHARDED_APPS
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def place_user(sender, instance, created, raw=False, using=None, **kwargs):
+    """Assign new users to a shard and keep the copy of every user on their shard current."""
+    if raw or using != DEFAULT_DB_ALIAS or not settings.SHARD_DATABASES:
+        return
+    if created:
+        place_new_user(instance)
+    alias, _ = lookup(instance.pk)
+    if alias != DEFAULT_DB_ALIAS:
+        replicate_user(instance, alias)
+
+
+@receiver(pre_delete, sender=User)
+def remember_user_shard(sender, instance, using=None, **kwargs):
+    if using == DEFAULT_DB_ALIAS and settings.SHARD_DATABASES:
+        instance._shard_alias, _ = lookup(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def delete_user_from_shard(sender, instance, using=None, **kwargs):
+    """Delete the user's copy, and with it their ledger, from their shard."""
+    alias = getattr(instance, '_shard_alias', DEFAULT_DB_ALIAS)
+    if using == DEFAULT_DB_ALIAS and alias != DEFAULT_DB_ALIAS:
+        # Tables of other apps referencing users (admin log, tokens) only exist on `default`
+        purge_user_rows(instance.pk, alias)
+        forget(instance.pk)
+
+
+@receiver(post_migrate)
+def reserve_id_range(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """Start the id sequences of a freshly migrated shard at the beginning of its own range."""
+    if sender.label in SHARDED_APPS and using in settings.SHARD_DATABASES:
+        reset_id_sequences(using, list(sender.get_models()))
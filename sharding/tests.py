@@ -0,0 +1,157 @@
+from datetime import date
+from io import StringIO
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from balances.models import Balance
+from categories.models import Category
+from sync.models import Change
+from transactions.models import BaseTransaction, IncomeOutcomeTransaction
+from .directory import lookup, set_assignment
+from .moves import SHARD_ID_SPACING
+from .router import ShardReadOnly, ShardRouter, use_shard, use_user_shard
+
+User = get_user_model()
+
+
+@override_settings(SHARD_DATABASES=['shard1', 'shard2'])
+class ShardRouterTests(SimpleTestCase):
+    def test_sharded_apps_follow_the_chosen_shard(self):
+        """Test that the ledger models are routed to the chosen shard and everything else is not."""
+        self.assertEqual(Balance.objects.all().db, DEFAULT_DB_ALIAS)
+        with use_shard('shard2'):
+            self.assertEqual(Balance.objects.all().db, 'shard2')
+            self.assertEqual(BaseTransaction.objects.all().db, 'shard2')
+            self.assertEqual(User.objects.all().db, DEFAULT_DB_ALIAS)
+
+    def test_instances_stay_on_their_database(self):
+        """Test that an object read from one shard is saved back to it, whatever the current shard."""
+        balance = Balance()
+        balance._state.db = 'shard1'
+        with use_shard('shard2'):
+            self.assertEqual(ShardRouter().db_for_write(Balance, instance=balance), 'shard1')
+
+    def test_read_only_shard_refuses_writes(self):
+        """Test that a user being moved can read but not write."""
+        with use_shard('shard1', read_only=True):
+            self.assertEqual(Balance.objects.all().db, 'shard1')
+            with self.assertRaises(ShardReadOnly):
+                Balance.objects.db_manager().select_for_update().db
+
+    def test_migrations(self):
+        """Test that shards only get the ledger tables and the tables they reference."""
+        router = ShardRouter()
+        self.assertTrue(router.allow_migrate('shard1', 'transactions'))
+        self.assertTrue(router.allow_migrate('shard1', 'auth'))
+        self.assertTrue(router.allow_migrate('shard1', 'sync'))
+        self.assertFalse(router.allow_migrate('shard1', 'sessions'))
+        self.assertFalse(router.allow_migrate('shard1', 'sharding'))
+        self.assertIsNone(router.allow_migrate(DEFAULT_DB_ALIAS, 'sessions'))
+
+
+@skipUnless(len(settings.SHARD_DATABASES) >= 2,
+            'needs two shards, e.g. DB_SHARDS=/tmp/shard1.sqlite3,/tmp/shard2.sqlite3')
+class ShardingTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username='sharded', password='testpassword')
+        self.shard, _ = lookup(self.user.pk)
+        self.other_shard = next(alias for alias in settings.SHARD_DATABASES if alias != self.shard)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create_ledger(self):
+        # History is written once the shard's transaction and then the request commit
+        with self.captureOnCommitCallbacks(execute=True), \
+                self.captureOnCommitCallbacks(using=self.shard, execute=True):
+            balance = self.client.post(reverse('balance-list'), {'name': 'Cash', 'currency': 'EUR'}).data
+            category = self.client.post(reverse('category-list'), {'name': 'Food'}).data
+            for day in (1, 2):
+                response = self.client.post(reverse('income_outcome_transaction-list'), {
+                    'transaction_type': 'income', 'balance': balance['id'], 'category': category['id'],
+                    'amount': '10.00', 'date': date(2024, 1, day).isoformat(),
+                })
+                self.assertEqual(response.status_code, 201, response.data)
+        return balance, category
+
+    def test_new_user_lives_on_a_shard(self):
+        """Test that a new user is copied to a shard and the API keeps their ledger there only."""
+        self.assertIn(self.shard, settings.SHARD_DATABASES)
+        self.assertTrue(User.objects.using(self.shard).filter(pk=self.user.pk).exists())
+
+        balance, _ = self.create_ledger()
+        self.assertGreaterEqual(balance['id'], (settings.SHARD_DATABASES.index(self.shard) + 1) * SHARD_ID_SPACING)
+        self.assertEqual(Balance.objects.using(self.shard).get(pk=balance['id']).amount, Decimal('20.00'))
+        self.assertFalse(Balance.objects.using(DEFAULT_DB_ALIAS).exists())
+        self.assertFalse(Balance.objects.using(self.other_shard).exists())
+        self.assertEqual(len(self.client.get(reverse('balance-list')).data), 1)
+
+    def test_move_user(self):
+        """Test that moving a user carries their ledger and history over, with the same ids."""
+        balance, category = self.create_ledger()
+        history = Balance.history.using(self.shard).filter(id=balance['id']).count()
+        self.assertGreater(history, 0)
+        cursor = self.client.get(reverse('sync')).data['cursor']
+        call_command('move_user_shard', self.other_shard, '--user', self.user.pk, grace=0, stdout=StringIO())
+
+        self.assertEqual(lookup(self.user.pk), (self.other_shard, False))
+        self.assertFalse(Balance.objects.using(self.shard).exists())
+        self.assertFalse(BaseTransaction.objects.using(self.shard).exists())
+        self.assertEqual(IncomeOutcomeTransaction.objects.using(self.other_shard).count(), 2)
+        self.assertEqual(Balance.history.using(self.other_shard).filter(id=balance['id']).count(), history)
+
+        response = self.client.get(reverse('balance-detail', args=[balance['id']]))
+        self.assertEqual(response.data['amount'], '20.00')
+        response = self.client.patch(reverse('category-detail', args=[category['id']]), {'name': 'Groceries'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Category.objects.using(self.other_shard).get().name, 'Groceries')
+        # The change log moved along, so the client's cursor still holds
+        response = self.client.get(reverse('sync'), {'cursor': cursor})
+        self.assertEqual(response.data['cursor'], cursor + 1)
+        self.assertEqual([item['name'] for item in response.data['changes']['categories']], ['Groceries'])
+
+    def test_user_being_moved_cannot_write(self):
+        """Test that a read-only user still reads their ledger while writes get 503."""
+        self.create_ledger()
+        set_assignment(self.user.pk, self.shard, read_only=True)
+
+        self.assertEqual(self.client.get(reverse('balance-list')).status_code, 200)
+        response = self.client.post(reverse('category-list'), {'name': 'Rent'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(Category.objects.using(self.shard).count(), 1)
+
+    def test_change_log_commits_with_the_ledger(self):
+        """Test that change entries are written in the ledger's transaction on its shard, and roll back with it."""
+        self.create_ledger()
+        cursor = self.client.get(reverse('sync')).data['cursor']
+        self.assertEqual(Change.objects.using(self.shard).count(), cursor)
+
+        with self.assertRaises(RuntimeError), use_user_shard(self.user.pk), transaction.atomic(using=self.shard):
+            category = Category.objects.create(user=self.user, name='Rent')
+            # While the ledger transaction is open, nothing of the write is visible outside it
+            self.assertTrue(Change.objects.using(self.shard).filter(object_id=str(category.pk)).exists())
+            self.assertFalse(Change.objects.using(DEFAULT_DB_ALIAS).exists())
+            raise RuntimeError('roll back the ledger write')
+
+        response = self.client.get(reverse('sync'), {'cursor': cursor})
+        self.assertEqual(response.data['cursor'], cursor)
+        self.assertEqual(response.data['changes']['categories'], [])
+
+    def test_deleting_user_deletes_their_shard(self):
+        """Test that deleting a user removes their copy and ledger from the shard."""
+        self.create_ledger()
+        self.user.delete()
+        self.assertFalse(User.objects.using(self.shard).exists())
+        self.assertFalse(Balance.objects.using(self.shard).exists())
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, Max, Min, OuterRef
+
+from sharding.directory import ledger_databases
+from sync.models import Change
+
+
+class Command(BaseCommand):
+    help = "Drop change entries superseded by a later change of the same object."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000, help="Change ids scanned per delete statement.")
+
+    def handle(self, *args, **options):
+        # A client at any cursor still converges, since it receives the latest change of every object after it
+        deleted = 0
+        # Change logs live with the ledgers, on `default` and every shard
+        for using in ledger_databases():
+            changes = Change.objects.using(using)
+            superseded = Exists(changes.filter(
+                user=OuterRef('user'),
+                resource=OuterRef('resource'),
+                object_id=OuterRef('object_id'),
+                sequence__gt=OuterRef('sequence'),
+            ))
+            first_id, last_id = changes.aggregate(first_id=Min('id'), last_id=Max('id')).values()
+            if first_id is None:
+                continue
+            for start in range(first_id - 1, last_id, options['chunk_size']):
+                chunk = changes.filter(id__gt=start, id__lte=start + options['chunk_size'])
+                deleted += chunk.filter(superseded).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f"Removed {deleted} superseded changes."))
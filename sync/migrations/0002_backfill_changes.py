@@ -0,0 +1,34 @@
+from django.db import migrations
+
+RESOURCES = [
+    ('balances', 'Balance', 'balances'),
+    ('categories', 'Category', 'categories'),
+    ('transactions', 'IncomeOutcomeTransaction', 'income_outcome_transactions'),
+    ('transactions', 'TransferTransaction', 'transfer_transactions'),
+]
+
+
+def backfill_changes(apps, schema_editor):
+    """Give every existing object an upsert, so a sync from cursor 0 downloads it."""
+    Change = apps.get_model('sync', 'Change')
+    for app_label, model_name, resource in RESOURCES:
+        model = apps.get_model(app_label, model_name)
+        rows = model.objects.order_by('pk').values_list('pk', 'user_id').iterator(chunk_size=2000)
+        Change.objects.bulk_create(
+            (Change(user_id=user_id, resource=resource, object_id=str(pk), action='upsert') for pk, user_id in rows),
+            batch_size=2000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0001_initial'),
+        ('balances', '0004_historicalbalance'),
+        ('categories', '0003_historicalcategory'),
+        ('transactions', '0007_historicalincomeoutcometransaction_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_changes, migrations.RunPython.noop),
+    ]
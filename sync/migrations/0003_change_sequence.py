@@ -0,0 +1,56 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def number_existing_changes(apps, schema_editor):
+    """Number the existing changes by id, so the cursors clients already hold stay valid."""
+    Change = apps.get_model('sync', 'Change')
+    ChangeSequence = apps.get_model('sync', 'ChangeSequence')
+    Change.objects.update(sequence=F('id'))
+    last = Change.objects.values('user_id').annotate(value=Max('id')).order_by().values_list('user_id', 'value')
+    ChangeSequence.objects.bulk_create(
+        (ChangeSequence(user_id=user_id, value=value) for user_id, value in last.iterator(chunk_size=2000)),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('sync', '0002_backfill_changes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeSequence',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='change_sequence', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='change',
+            name='sequence',
+            field=models.PositiveBigIntegerField(null=True),
+        ),
+        migrations.RunPython(number_existing_changes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='change',
+            name='sequence',
+            field=models.PositiveBigIntegerField(),
+        ),
+        migrations.RemoveIndex(
+            model_name='change',
+            name='sync_change_user_id_55f3b4_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='change',
+            constraint=models.UniqueConstraint(fields=('user', 'sequence'), name='sync_change_user_sequence'),
+        ),
+    ]
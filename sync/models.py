@@ -0,0 +1,81 @@
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, models, router, transaction
+from django.db.models import F
+
+User = get_user_model()
+
+
+class ChangeSequence(models.Model):
+    """The last number handed out in a user's change sequence."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="change_sequence")
+    value = models.PositiveBigIntegerField(default=0)
+
+
+class Change(models.Model):
+    """
+    One entry of a user's change sequence. The per-user `sequence` is the sync
+    cursor: a client holding cursor N needs exactly the entries with `sequence > N`.
+
+    That only holds if entries become visible in sequence order, and together
+    with the write they describe. Entries live on the database of the user's
+    ledger (`sync` is a sharded app) and are written in the transaction of the
+    write. Their numbers are taken from the user's `ChangeSequence` row, whose
+    lock is held until that transaction commits, so a user's writers number and
+    commit their entries one after the other, on SQLite and PostgreSQL alike. The
+    auto-incrementing `id` is handed out at insert time instead, and concurrent
+    transactions may commit their ids out of order.
+    """
+
+    class Action(models.TextChoices):
+        UPSERT = 'upsert'
+        DELETE = 'delete'
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="changes")
+    resource = models.CharField(max_length=50)
+    object_id = models.CharField(max_length=36)
+    action = models.CharField(max_length=6, choices=Action.choices)
+    sequence = models.PositiveBigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'sequence'], name='sync_change_user_sequence'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'resource', 'object_id']),
+        ]
+
+
+def reserve_sequence(user_id, count, using):
+    """
+    Reserve `count` numbers of the user's change sequence on `using` and return the first.
+
+    The user's `ChangeSequence` row stays locked until the surrounding
+    transaction commits.
+    """
+    sequences = ChangeSequence.objects.using(using)
+    if sequences.filter(user_id=user_id).update(value=F('value') + count):
+        return sequences.get(user_id=user_id).value - count + 1
+    try:
+        with transaction.atomic(using=using):
+            sequences.create(user_id=user_id, value=count)
+        return 1
+    except IntegrityError:
+        # Created by a concurrent writer in the meantime
+        return reserve_sequence(user_id, count, using)
+
+
+def append_changes(user_id, resource, object_ids, action, using=None):
+    """
+    Append an entry per object to the user's change sequence, on `using`: the
+    database the objects were written to, by default the one the user's ledger
+    is routed to.
+    """
+    if not object_ids:
+        return
+    using = using or router.db_for_write(Change)
+    with transaction.atomic(using=using):
+        first = reserve_sequence(user_id, len(object_ids), using)
+        Change.objects.using(using).bulk_create([
+            Change(user_id=user_id, resource=resource, object_id=str(pk), action=action, sequence=first + index)
+            for index, pk in enumerate(object_ids)
+        ])
@@ -0,0 +1,20 @@
+"""The resources a client can sync, keyed by the name used in sync payloads."""
+from balances.models import Balance
+from balances.serializers import BalanceSerializer
+from categories.models import Category
+from categories.serializers import CategorySerializer
+from transactions.models import IncomeOutcomeTransaction, TransferTransaction
+from transactions.serializers.income_outcome_transaction_serializers import IncomeOutcomeTransactionSerializer
+from transactions.serializers.transfer_transaction_serializers import TransferTransactionSerializer
+
+# resource name -> (model, serializer, relations the serializer renders)
+RESOURCES = {
+    'balances': (Balance, BalanceSerializer, ('user',)),
+    'categories': (Category, CategorySerializer, ('user',)),
+    'income_outcome_transactions': (IncomeOutcomeTransaction, IncomeOutcomeTransactionSerializer, ('category',)),
+    'transfer_transactions': (
+        TransferTransaction, TransferTransactionSerializer, ('category', 'balance_from', 'balance_to'),
+    ),
+}
+
+RESOURCE_NAMES = {model: name for name, (model, _, _) in RESOURCES.items()}
@@ -0,0 +1,6 @@
+from rest_framework import serializers
+
+
+class SyncQuerySerializer(serializers.Serializer):
+    cursor = serializers.IntegerField(min_value=0, default=0)
+    limit = serializers.IntegerField(min_value=1, max_value=5000, default=1000)
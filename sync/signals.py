@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from balances.models import Balance
+from categories.models import Category
+from transactions.models import IncomeOutcomeTransaction, TransferTransaction
+from transactions.signals import bulk_updated
+from .models import Change, append_changes
+from .registry import RESOURCE_NAMES
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Balance)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=IncomeOutcomeTransaction)
+@receiver(post_save, sender=TransferTransaction)
+def record_upsert(sender, instance, raw=False, using=None, **kwargs):
+    """Append a created or updated object to its owner's change sequence."""
+    if not raw:
+        append_changes(instance.user_id, RESOURCE_NAMES[sender], [instance.pk], Change.Action.UPSERT, using)
+
+
+@receiver(bulk_updated)
+def record_bulk_upsert(sender, user_id, object_ids, **kwargs):
+    """Append the objects of a bulk update to their owner's change sequence."""
+    append_changes(user_id, RESOURCE_NAMES[sender], object_ids, Change.Action.UPSERT)
+
+
+@receiver(post_delete, sender=Balance)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=IncomeOutcomeTransaction)
+@receiver(post_delete, sender=TransferTransaction)
+def record_delete(sender, instance, origin=None, using=None, **kwargs):
+    """Append a tombstone for a deleted object, unless its owner is being deleted too."""
+    if not isinstance(origin, User):
+        append_changes(instance.user_id, RESOURCE_NAMES[sender], [instance.pk], Change.Action.DELETE, using)
@@ -0,0 +1,124 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from balances.models import Balance
+from categories.models import Category
+from transactions.models import IncomeOutcomeTransaction
+from .models import Change, ChangeSequence
+
+User = get_user_model()
+
+
+class SyncViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.other_user = User.objects.create_user(username='otheruser', password='otherpassword')
+        self.client.force_authenticate(user=self.user)
+
+        self.category = Category.objects.create(user=self.user, name='Groceries')
+        self.balance = Balance.objects.create(user=self.user, name='Savings Account', currency='EUR')
+        Category.objects.create(user=self.other_user, name='Hidden')
+
+    def sync(self, cursor=0, **params):
+        response = self.client.get(reverse('sync'), {'cursor': cursor, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def book(self, amount):
+        return IncomeOutcomeTransaction.objects.create(
+            user=self.user,
+            category=self.category,
+            amount=amount,
+            date='2024-01-01',
+            transaction_type='outcome',
+            balance=self.balance
+        )
+
+    def test_full_sync(self):
+        """Test that cursor 0 returns every object of the user and nothing else."""
+        data = self.sync()
+        self.assertListEqual([category['name'] for category in data['changes']['categories']], ['Groceries'])
+        self.assertListEqual([balance['name'] for balance in data['changes']['balances']], ['Savings Account'])
+        self.assertFalse(data['has_more'])
+
+    def test_delta_sync_returns_only_changes_since_cursor(self):
+        """Test that a later sync carries only the objects written after the cursor."""
+        cursor = self.sync()['cursor']
+        transaction = self.book(25)
+
+        data = self.sync(cursor)
+        self.assertListEqual(
+            [row['id'] for row in data['changes']['income_outcome_transactions']], [str(transaction.id)]
+        )
+        # The balance amount was recomputed, so the balance is part of the delta too
+        self.assertEqual(data['changes']['balances'][0]['amount'], '-25.00')
+        self.assertListEqual(data['changes']['categories'], [])
+        self.assertListEqual(self.sync(data['cursor'])['changes']['balances'], [])
+
+    def test_deletions_are_reported_as_tombstones(self):
+        """Test that deleted objects come back as ids under `deleted`."""
+        transaction = self.book(25)
+        cursor = self.sync()['cursor']
+        transaction.delete()
+
+        data = self.sync(cursor)
+        self.assertListEqual(data['deleted']['income_outcome_transactions'], [str(transaction.id)])
+        self.assertListEqual(data['changes']['income_outcome_transactions'], [])
+
+    def test_paging(self):
+        """Test that a client paging with the returned cursor sees every object once."""
+        for amount in range(1, 6):
+            self.book(amount)
+
+        cursor, seen = 0, set()
+        while True:
+            data = self.sync(cursor, limit=3)
+            seen.update(row['id'] for row in data['changes']['income_outcome_transactions'])
+            cursor = data['cursor']
+            if not data['has_more']:
+                break
+        self.assertEqual(len(seen), 5)
+
+    def test_change_committed_out_of_id_order_is_not_skipped(self):
+        """Test that a change whose id is below one the client already saw is still delivered."""
+        cursor = self.sync()['cursor']
+        transaction = self.book(25)
+        # As if its ids had been handed out before the changes already synced, and committed after them
+        Change.objects.filter(user=self.user, sequence__gt=cursor).update(id=F('id') - 1000)
+
+        data = self.sync(cursor)
+        self.assertListEqual(
+            [row['id'] for row in data['changes']['income_outcome_transactions']], [str(transaction.id)]
+        )
+        sequences = list(Change.objects.filter(user=self.user).order_by('sequence').values_list('sequence', flat=True))
+        self.assertListEqual(sequences, list(range(1, len(sequences) + 1)))
+        self.assertEqual(ChangeSequence.objects.get(user=self.user).value, data['cursor'])
+
+    def test_deleting_user_leaves_no_changes(self):
+        """Test that deleting an owner does not log tombstones for its cascaded objects."""
+        self.book(25)
+        self.user.delete()
+        self.assertFalse(Change.objects.filter(user_id=self.user.id).exists())
+
+    def test_compact_changes(self):
+        """Test that compaction keeps only the latest change per object and sync still converges."""
+        transaction = self.book(25)
+        transaction.note = 'Edited'
+        transaction.save()
+
+        call_command('compact_changes', chunk_size=2, stdout=StringIO())
+
+        self.assertEqual(
+            Change.objects.filter(resource='income_outcome_transactions', object_id=str(transaction.id)).count(), 1
+        )
+        self.assertEqual(Change.objects.filter(resource='balances').count(), 1)
+        data = self.sync()
+        self.assertEqual(data['changes']['income_outcome_transactions'][0]['note'], 'Edited')
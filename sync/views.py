@@ -0,0 +1,56 @@
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import Change
+from .registry import RESOURCES
+from .serializers import SyncQuerySerializer
+
+
+class SyncView(APIView):
+    """
+    Delta sync for offline clients.
+
+    Returns the balances, categories and transactions created, updated or deleted
+    after `?cursor=`, with deletions as tombstones (ids only). Clients store the
+    returned `cursor` and keep calling while `has_more` is true; cursor 0 is a
+    full download.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = SyncQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        cursor, limit = query.validated_data['cursor'], query.validated_data['limit']
+
+        # One row more than the page tells whether another page follows
+        changes = list(
+            Change.objects.filter(user=request.user, sequence__gt=cursor)
+            .order_by('sequence')
+            .values_list('sequence', 'resource', 'object_id', 'action')[:limit + 1]
+        )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        # Only the latest change of each object in the page matters
+        latest = {}
+        for sequence, resource, object_id, action in changes:
+            latest[resource, object_id] = action
+
+        upserted = {name: [] for name in RESOURCES}
+        deleted = {name: [] for name in RESOURCES}
+        for (resource, object_id), action in latest.items():
+            (upserted if action == Change.Action.UPSERT else deleted)[resource].append(object_id)
+
+        data = {}
+        for name, (model, serializer_class, relations) in RESOURCES.items():
+            # An object deleted after this page is missing here; its tombstone comes in a later page
+            objects = model.objects.filter(user=request.user, pk__in=upserted[name]).select_related(*relations)
+            data[name] = serializer_class(objects, many=True).data
+
+        return Response({
+            'cursor': changes[-1][0] if changes else cursor,
+            'has_more': has_more,
+            'changes': data,
+            'deleted': deleted,
+        })
@@ -0,0 +1,112 @@
+"""
+Spending anomalies: outcomes far above what their category usually costs.
+
+Every outcome is scored against the other outcomes of its category (and so of
+its user) with the modified z-score of Iglewicz and Hoaglin,
+0.6745 * (amount - median) / MAD, which a few extreme payments cannot drag
+along the way they drag a mean and standard deviation. Categories where most
+payments are equal (MAD 0) fall back to the mean absolute deviation, and
+categories with fewer than `MIN_SAMPLES` outcomes are not scored. Scores of
+at least `ANOMALY_THRESHOLD` count as anomalies.
+
+Medians are computed for all categories at once on one sorted array, so
+scoring never loops over categories or transactions in Python.
+`score_users()` stores the scores in `IncomeOutcomeTransaction.anomaly_score`
+for the nightly `detect_anomalies` command; the API scores a user live.
+"""
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from sharding.directory import lookup
+from .models import IncomeOutcomeTransaction
+
+MIN_SAMPLES = 5
+UPDATE_BATCH_SIZE = 500
+# Consistency constants of the MAD and the mean absolute deviation for normal data
+MAD_SCALE = 0.6745
+MEAN_AD_SCALE = 1.253314
+
+
+def _group_medians(groups, values):
+    """Return (sorted group keys, median per group, size per group)."""
+    order = np.lexsort((values, groups))
+    sorted_values = values[order]
+    keys, starts, counts = np.unique(groups[order], return_index=True, return_counts=True)
+    lower = sorted_values[starts + (counts - 1) // 2]
+    upper = sorted_values[starts + counts // 2]
+    return keys, (lower + upper) / 2, counts
+
+
+def robust_scores(groups, amounts):
+    """Modified z-score of every amount within its group; NaN where the group can't be scored."""
+    if not len(amounts):
+        return np.empty(0)
+    keys, medians, counts = _group_medians(groups, amounts)
+    index = np.searchsorted(keys, groups)
+    deviation = np.abs(amounts - medians[index])
+    _, mad, _ = _group_medians(groups, deviation)
+    mean_ad = np.bincount(index, weights=deviation) / counts
+    scale = np.where(mad > 0, mad / MAD_SCALE, mean_ad * MEAN_AD_SCALE)
+
+    unscored = (counts < MIN_SAMPLES) | (scale == 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = (amounts - medians[index]) / scale[index]
+    scores[unscored[index]] = np.nan
+    return scores
+
+
+def _outcomes(queryset, *fields):
+    return list(queryset.filter(
+        transaction_type=IncomeOutcomeTransaction.TransactionType.OUTCOME
+    ).values_list('pk', 'category_id', 'amount', *fields))
+
+
+def _score_rows(rows):
+    """Score rows starting with (pk, category_id, amount)."""
+    if not rows:
+        return np.empty(0)
+    columns = list(zip(*rows))
+    return robust_scores(np.array(columns[1], dtype=np.int64), np.array(columns[2], dtype=np.float64))
+
+
+def find_anomalies(user, threshold=None):
+    """Return [(pk, score)] of the user's outcomes scoring at least `threshold`, most unusual first."""
+    threshold = settings.ANOMALY_THRESHOLD if threshold is None else threshold
+    rows = _outcomes(IncomeOutcomeTransaction.objects.filter(user=user))
+    scores = _score_rows(rows)
+    flagged = np.flatnonzero(np.nan_to_num(scores, nan=-np.inf) >= threshold)
+    flagged = flagged[np.argsort(-scores[flagged], kind='stable')]
+    return [(rows[position][0], float(scores[position])) for position in flagged]
+
+
+def score_users(user_ids, threshold=None):
+    """Store fresh anomaly scores for the outcomes of `user_ids`, writing only the ones that changed."""
+    threshold = settings.ANOMALY_THRESHOLD if threshold is None else threshold
+    by_database = {}
+    for user_id in user_ids:
+        by_database.setdefault(lookup(user_id)[0], []).append(user_id)
+
+    summary = {'users': len(user_ids), 'transactions': 0, 'anomalies': 0, 'updated': 0}
+    for using, database_users in by_database.items():
+        queryset = IncomeOutcomeTransaction.objects.using(using).filter(user_id__in=database_users)
+        rows = _outcomes(queryset, 'anomaly_score')
+        scores = np.round(_score_rows(rows), 3)
+
+        changed = []
+        for (pk, _, _, stored), score in zip(rows, scores.tolist()):
+            score = None if np.isnan(score) else score
+            if stored != score:
+                changed.append(IncomeOutcomeTransaction(pk=pk, anomaly_score=score))
+        with transaction.atomic(using=using):
+            IncomeOutcomeTransaction.objects.using(using).bulk_update(
+                changed, ['anomaly_score'], batch_size=UPDATE_BATCH_SIZE
+            )
+            # Outcomes turned into incomes since the last run
+            changed_type = queryset.exclude(transaction_type=IncomeOutcomeTransaction.TransactionType.OUTCOME)
+            cleared = changed_type.filter(anomaly_score__isnull=False).update(anomaly_score=None)
+
+        summary['transactions'] += len(rows)
+        summary['anomalies'] += int(np.count_nonzero(np.nan_to_num(scores, nan=-np.inf) >= threshold))
+        summary['updated'] += len(changed) + cleared
+    return summary
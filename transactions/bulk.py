@@ -0,0 +1,112 @@
+"""
+Bulk recategorize, move and delete over a selection of a user's transactions.
+
+The selection is resolved to primary keys once and processed in chunks of
+`BULK_CHUNK_SIZE`, each in its own database transaction, so a bulk operation
+over hundreds of thousands of rows never holds locks for long. Updates go
+through `update_with_history` (audit history and version bumps) and announce
+themselves with `bulk_updated` (sync); deletes go through the ORM so every
+`post_delete` receiver still runs. Per-row balance updates are suspended for
+the whole operation: every affected balance is recomputed once at the end.
+"""
+from django.db import router, transaction
+from django.db.models import Q
+
+from utils.history import update_with_history
+from .models import BaseTransaction, IncomeOutcomeTransaction, TransferTransaction
+from .signals import bulk_updated, deferred_balance_updates
+
+BULK_CHUNK_SIZE = 1000
+
+
+def select_transactions(user, ids=None, category=None, balance=None, date_after=None, date_before=None,
+                        transaction_type=None):
+    """Return the primary keys of the `user`'s transactions matching the given criteria, in order."""
+    queryset = BaseTransaction.objects.filter(user=user)
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    if category is not None:
+        queryset = queryset.filter(category=category)
+    if balance is not None:
+        queryset = queryset.filter(
+            Q(incomeoutcometransaction__balance=balance)
+            | Q(transfertransaction__balance_from=balance)
+            | Q(transfertransaction__balance_to=balance)
+        )
+    if date_after is not None:
+        queryset = queryset.filter(date__gte=date_after)
+    if date_before is not None:
+        queryset = queryset.filter(date__lte=date_before)
+    if transaction_type == 'transfer':
+        queryset = queryset.filter(transfertransaction__isnull=False)
+    elif transaction_type is not None:
+        queryset = queryset.filter(incomeoutcometransaction__transaction_type=transaction_type)
+    return list(queryset.order_by('pk').values_list('pk', flat=True))
+
+
+def _chunks(pks):
+    for start in range(0, len(pks), BULK_CHUNK_SIZE):
+        yield pks[start:start + BULK_CHUNK_SIZE]
+
+
+def _update(model, user, pks, **values):
+    updated = update_with_history(model.objects.filter(pk__in=pks), **values)
+    if updated:
+        bulk_updated.send(sender=model, user_id=user.pk, object_ids=pks)
+    return updated
+
+
+def recategorize(user, pks, category):
+    """Move the transactions to `category`; balances are unaffected."""
+    updated = 0
+    for chunk in _chunks(pks):
+        with transaction.atomic(using=router.db_for_write(BaseTransaction)):
+            for model in (IncomeOutcomeTransaction, TransferTransaction):
+                chunk_pks = list(model.objects.filter(pk__in=chunk, user=user).values_list('pk', flat=True))
+                updated += _update(model, user, chunk_pks, category=category)
+    return {'transactions': updated}
+
+
+def move(user, pks, source, target):
+    """
+    Book the transactions that touch `source` against `target` instead.
+
+    Transfers whose other side already is `target` are skipped, since moving them
+    would turn them into a transfer from a balance to itself.
+    """
+    updated = skipped = 0
+    with deferred_balance_updates() as positions:
+        for chunk in _chunks(pks):
+            with transaction.atomic(using=router.db_for_write(BaseTransaction)):
+                income_outcome = IncomeOutcomeTransaction.objects.filter(pk__in=chunk, user=user, balance=source)
+                transfers = TransferTransaction.objects.filter(pk__in=chunk, user=user)
+                legs = [
+                    (IncomeOutcomeTransaction, income_outcome, 'balance'),
+                    (TransferTransaction, transfers.filter(balance_from=source).exclude(balance_to=target),
+                     'balance_from'),
+                    (TransferTransaction, transfers.filter(balance_to=source).exclude(balance_from=target),
+                     'balance_to'),
+                ]
+                skipped += transfers.filter(
+                    Q(balance_from=source, balance_to=target) | Q(balance_to=source, balance_from=target)
+                ).count()
+
+                for model, queryset, field in legs:
+                    rows = list(queryset.values_list('pk', 'date'))
+                    positions.update((balance.pk, day) for _, day in rows for balance in (source, target))
+                    updated += _update(model, user, [pk for pk, _ in rows], **{field: target})
+        affected = len({balance_id for balance_id, _ in positions})
+    return {'transactions': updated, 'skipped': skipped, 'balances': affected}
+
+
+def delete(user, pks):
+    """Delete the transactions."""
+    deleted = 0
+    with deferred_balance_updates() as positions:
+        for chunk in _chunks(pks):
+            with transaction.atomic(using=router.db_for_write(BaseTransaction)):
+                for model in (IncomeOutcomeTransaction, TransferTransaction):
+                    _, per_model = model.objects.filter(pk__in=chunk, user=user).delete()
+                    deleted += per_model.get(model._meta.label, 0)
+        affected = len({balance_id for balance_id, _ in positions})
+    return {'transactions': deleted, 'balances': affected}
@@ -0,0 +1,222 @@
+"""
+Distribution of transaction amounts per category: percentiles and histograms.
+
+Count, minimum, maximum and mean come from one aggregate query on every
+backend. Percentiles and histogram counts are computed by the database where
+it has ordered-set aggregates (`PERCENTILE_CONT`, PostgreSQL). Elsewhere the
+amounts are streamed category by category and counted with NumPy; a category
+holds at most `EXACT_LIMIT` amounts in memory at a time, and larger ones are
+summarized in a `SKETCH_BINS`-bucket histogram that their percentiles are
+interpolated from, within (max - min) / SKETCH_BINS of the exact value.
+
+Results are cached under the user's data version, the last number of their
+sync change sequence (`ChangeSequence`). Every write to their ledger bumps it
+in the writing transaction, and the numbers commit in order, so a cached
+result is never stale and needs no invalidation. (The id of the latest
+`Change` would not do: ids can commit out of order, so a write may not move
+the maximum.)
+"""
+import hashlib
+
+import numpy as np
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Aggregate, Avg, Case, Count, F, FloatField, Func, IntegerField, Max, Min, Value, When
+from django.db.models.functions import Least
+
+from sync.models import ChangeSequence
+from .models import IncomeOutcomeTransaction
+
+PERCENTILES = (25, 50, 75, 90, 95, 99)
+# Database backends with PERCENTILE_CONT ... WITHIN GROUP
+PERCENTILE_VENDORS = ('postgresql',)
+EXACT_LIMIT = 200_000
+SKETCH_BINS = 10_000
+STREAM_CHUNK_SIZE = 10_000
+DISTRIBUTION_CACHE_TTL = 24 * 3600
+
+
+class PercentileCont(Aggregate):
+    """The continuous percentile `fraction` of `expression`, interpolated like `numpy.percentile`."""
+    function = 'PERCENTILE_CONT'
+    template = '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, expression, fraction, **extra):
+        super().__init__(expression, fraction=float(fraction), **extra)
+
+
+def data_version(user_id):
+    """The last number of the user's change sequence, which every write to their data moves forward."""
+    return ChangeSequence.objects.filter(user_id=user_id).values_list('value', flat=True).first() or 0
+
+
+def edges(low, high, bins):
+    """Edges of `bins` equal-width buckets from `low` to `high`; one unit wide when all amounts are equal."""
+    low, high = float(low), float(high)
+    return np.linspace(low, high if high > low else low + 1, bins + 1)
+
+
+def bucket_counts(values, bucket_edges):
+    """Count `values` per bucket; buckets include their lower edge, the last one also its upper edge."""
+    positions = np.clip(np.searchsorted(bucket_edges, values, side='right') - 1, 0, len(bucket_edges) - 2)
+    return np.bincount(positions, minlength=len(bucket_edges) - 1)
+
+
+def sketch_percentiles(counts, bucket_edges, percentiles):
+    """
+    Percentiles read off a histogram, interpolated between order statistics like `numpy.percentile`.
+
+    Each order statistic is placed evenly within its bucket, so it is off by at most a bucket width.
+    """
+    cumulative = np.cumsum(counts)
+    width = bucket_edges[1] - bucket_edges[0]
+
+    def order_statistic(ranks):
+        buckets = np.searchsorted(cumulative, ranks, side='right')
+        before = np.where(buckets > 0, cumulative[np.maximum(buckets - 1, 0)], 0)
+        return bucket_edges[buckets] + (ranks - before + 0.5) / counts[buckets] * width
+
+    ranks = np.asarray(percentiles) / 100 * (cumulative[-1] - 1)
+    lower = np.floor(ranks)
+    below, above = order_statistic(lower), order_statistic(np.minimum(lower + 1, cumulative[-1] - 1))
+    return below + (ranks - lower) * (above - below)
+
+
+class _Accumulator:
+    """Histogram and percentiles of one category, fed its amounts chunk by chunk."""
+
+    def __init__(self, summary, bins):
+        self.edges = edges(summary['min'], summary['max'], bins)
+        self.histogram = np.zeros(bins, dtype=np.int64)
+        self.low, self.high = float(summary['min']), float(summary['max'])
+        if summary['count'] <= EXACT_LIMIT:
+            self.parts = []
+        else:
+            self.parts = None
+            self.sketch_edges = edges(summary['min'], summary['max'], SKETCH_BINS)
+            self.sketch = np.zeros(SKETCH_BINS, dtype=np.int64)
+
+    def add(self, values):
+        self.histogram += bucket_counts(values, self.edges)
+        if self.parts is not None:
+            self.parts.append(values)
+        else:
+            self.sketch += bucket_counts(values, self.sketch_edges)
+
+    def percentiles(self):
+        if self.parts is not None:
+            values = np.percentile(np.concatenate(self.parts), PERCENTILES)
+        else:
+            values = np.clip(sketch_percentiles(self.sketch, self.sketch_edges, PERCENTILES), self.low, self.high)
+        return values.tolist()
+
+
+def _streamed(queryset, summaries, bins):
+    """{category_id: (percentiles, histogram)} computed from the amounts, one category in memory at a time."""
+    results = {}
+    rows = queryset.order_by('category_id').values_list('category_id', 'amount').iterator(chunk_size=STREAM_CHUNK_SIZE)
+    current, accumulator, chunk = None, None, []
+
+    def flush():
+        if chunk:
+            accumulator.add(np.array(chunk, dtype=np.float64))
+            chunk.clear()
+
+    for category_id, amount in rows:
+        if category_id != current:
+            if accumulator is not None:
+                flush()
+                results[current] = (accumulator.percentiles(), accumulator.histogram.tolist())
+            current, accumulator = category_id, _Accumulator(summaries[category_id], bins)
+        chunk.append(amount)
+        if len(chunk) >= STREAM_CHUNK_SIZE:
+            flush()
+    if accumulator is not None:
+        flush()
+        results[current] = (accumulator.percentiles(), accumulator.histogram.tolist())
+    return results
+
+
+def _in_database(queryset, summaries, bins):
+    """{category_id: (percentiles, histogram)} computed by the database."""
+    aggregates = {f'p{percentile}': PercentileCont('amount', percentile / 100) for percentile in PERCENTILES}
+    percentiles = {
+        row['category_id']: [row[name] for name in aggregates]
+        for row in queryset.values('category_id').annotate(**aggregates).order_by()
+    }
+
+    bounds = {category_id: edges(summary['min'], summary['max'], bins) for category_id, summary in summaries.items()}
+    low = Case(*[When(category_id=category_id, then=Value(float(bucket_edges[0])))
+                 for category_id, bucket_edges in bounds.items()], output_field=FloatField())
+    high = Case(*[When(category_id=category_id, then=Value(float(bucket_edges[-1])))
+                  for category_id, bucket_edges in bounds.items()], output_field=FloatField())
+    # WIDTH_BUCKET numbers buckets from 1 and puts the maximum in bucket bins + 1
+    bucket = Least(
+        Func(F('amount'), low, high, Value(bins), function='WIDTH_BUCKET', output_field=IntegerField()), Value(bins)
+    )
+    histograms = {category_id: [0] * bins for category_id in summaries}
+    for row in queryset.annotate(bucket=bucket).values('category_id', 'bucket').annotate(count=Count('pk')).order_by():
+        histograms[row['category_id']][row['bucket'] - 1] = row['count']
+    return {category_id: (percentiles[category_id], histograms[category_id]) for category_id in summaries}
+
+
+def _cache_key(user_id, version, params):
+    digest = hashlib.sha256(repr(sorted(params.items())).encode()).hexdigest()[:16]
+    return f'transactions:distribution:{user_id}:{version}:{digest}'
+
+
+def distribution(user, category=None, transaction_type=IncomeOutcomeTransaction.TransactionType.OUTCOME,
+                 date_after=None, date_before=None, bins=10):
+    """Return the amount distribution of each of the `user`'s categories, ordered by category name."""
+    params = {
+        'category': getattr(category, 'pk', None), 'transaction_type': transaction_type,
+        'date_after': date_after, 'date_before': date_before, 'bins': bins,
+    }
+    key = _cache_key(user.pk, data_version(user.pk), params)
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    queryset = IncomeOutcomeTransaction.objects.filter(user=user, transaction_type=transaction_type)
+    if category is not None:
+        queryset = queryset.filter(category=category)
+    if date_after is not None:
+        queryset = queryset.filter(date__gte=date_after)
+    if date_before is not None:
+        queryset = queryset.filter(date__lte=date_before)
+
+    summaries = {
+        row['category_id']: row
+        for row in queryset.values('category_id', 'category__name').annotate(
+            count=Count('pk'), min=Min('amount'), max=Max('amount'), mean=Avg('amount'),
+        ).order_by()
+    }
+    if not summaries:
+        computed = {}
+    elif connections[queryset.db].vendor in PERCENTILE_VENDORS:
+        computed = _in_database(queryset, summaries, bins)
+    else:
+        computed = _streamed(queryset, summaries, bins)
+
+    result = []
+    for category_id, summary in sorted(summaries.items(), key=lambda item: item[1]['category__name']):
+        percentiles, histogram = computed[category_id]
+        bucket_edges = edges(summary['min'], summary['max'], bins).round(2).tolist()
+        result.append({
+            'category': category_id,
+            'category_name': summary['category__name'],
+            'count': summary['count'],
+            'min': summary['min'],
+            'max': summary['max'],
+            'mean': round(float(summary['mean']), 2),
+            'percentiles': {
+                f'p{percentile}': round(float(value), 2) for percentile, value in zip(PERCENTILES, percentiles)
+            },
+            'histogram': [
+                {'lower': lower, 'upper': upper, 'count': count}
+                for lower, upper, count in zip(bucket_edges, bucket_edges[1:], histogram)
+            ],
+        })
+    cache.set(key, result, timeout=DISTRIBUTION_CACHE_TTL)
+    return result
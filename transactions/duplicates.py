@@ -0,0 +1,136 @@
+"""
+Near-duplicate transactions: double imports and the same payment entered twice.
+
+`transaction_hash` only catches exact repeats. Near-duplicates have the same
+amount a day or two apart and notes that differ in punctuation, case or a
+reference number. Comparing every pair of a user's transactions would be
+quadratic, so candidates are blocked first: the user's transactions are read
+in (amount, date) order from the `(user, amount, date)` index, and a
+transaction is only compared with the earlier ones of the same amount,
+currency and kind at most `window` days before it. Only those pairs get the
+comparatively expensive note similarity, and at most `MAX_BLOCK_SIZE` of them
+per transaction, so a scan stays linear in the number of transactions even
+for a run of identical daily payments.
+
+Pairs at or above the similarity threshold are merged into clusters with a
+union-find; `resolve()` deletes the copies the user chose to drop.
+"""
+import re
+from collections import deque
+from difflib import SequenceMatcher
+
+from .bulk import delete
+from .models import BaseTransaction
+
+DEFAULT_WINDOW_DAYS = 3
+DEFAULT_SIMILARITY = 0.6
+MAX_BLOCK_SIZE = 20
+SCAN_CHUNK_SIZE = 5000
+
+_word = re.compile(r'\w+')
+
+
+def normalize_note(note):
+    """Case-folded words of the note, so punctuation and spacing do not count as differences."""
+    return ' '.join(_word.findall((note or '').casefold()))
+
+
+def note_similarity(first, second, threshold=0.0):
+    """
+    Similarity of two normalized notes between 0 and 1; two empty notes are identical.
+
+    Pairs that cannot reach `threshold` by the cheap upper bounds get 0 without a full comparison.
+    """
+    if first == second:
+        return 1.0
+    if not first or not second:
+        return 0.0
+    matcher = SequenceMatcher(None, first, second, autojunk=False)
+    if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+        return 0.0
+    return matcher.ratio()
+
+
+def _rows(user):
+    queryset = BaseTransaction.objects.filter(user=user).order_by('amount', 'date', 'pk').values_list(
+        'pk', 'amount', 'date', 'currency', 'incomeoutcometransaction__transaction_type', 'note',
+    )
+    for pk, amount, day, currency, transaction_type, note in queryset.iterator(chunk_size=SCAN_CHUNK_SIZE):
+        yield pk, amount, day, (currency, transaction_type or 'transfer'), normalize_note(note)
+
+
+def candidate_pairs(rows, window):
+    """
+    Yield the pairs of `rows` in the same block: equal amount and key, dates at most `window` days apart.
+
+    `rows` are (pk, amount, date, key, note) tuples ordered by amount and date.
+    """
+    blocks = {}
+    current_amount = None
+    for row in rows:
+        pk, amount, day, key, note = row
+        if amount != current_amount:
+            blocks.clear()
+            current_amount = amount
+        block = blocks.setdefault(key, deque(maxlen=MAX_BLOCK_SIZE))
+        while block and (day - block[0][2]).days > window:
+            block.popleft()
+        for other in block:
+            yield other, row
+        block.append(row)
+
+
+class _Clusters:
+    """Union-find over primary keys, remembering the weakest link of each cluster."""
+
+    def __init__(self):
+        self.parent = {}
+        self.similarity = {}
+
+    def find(self, pk):
+        root = pk
+        while self.parent.get(root, root) != root:
+            root = self.parent[root]
+        while pk != root:
+            self.parent[pk], pk = root, self.parent[pk]
+        return root
+
+    def union(self, first, second, similarity):
+        first, second = self.find(first), self.find(second)
+        weakest = min(similarity, self.similarity.get(first, 1.0), self.similarity.get(second, 1.0))
+        if first != second:
+            self.parent[second] = first
+            self.similarity.pop(second, None)
+        self.similarity[first] = weakest
+
+    def groups(self):
+        members = {}
+        for pk in self.parent.keys() | self.similarity.keys():
+            members.setdefault(self.find(pk), []).append(pk)
+        return [(pks, self.similarity[root]) for root, pks in members.items()]
+
+
+def find_duplicates(user, window=DEFAULT_WINDOW_DAYS, threshold=DEFAULT_SIMILARITY):
+    """
+    Return the `user`'s duplicate clusters as [(pks, similarity)], most recent first.
+
+    The pks of a cluster are ordered by date, the first being the original;
+    `similarity` is that of the weakest pair holding the cluster together.
+    """
+    clusters = _Clusters()
+    dates = {}
+    for (first_pk, _, first_date, _, first_note), (second_pk, _, second_date, _, second_note) in candidate_pairs(
+            _rows(user), window):
+        similarity = note_similarity(first_note, second_note, threshold)
+        if similarity >= threshold:
+            clusters.union(first_pk, second_pk, similarity)
+            dates[first_pk], dates[second_pk] = first_date, second_date
+
+    result = [(sorted(pks, key=lambda pk: (dates[pk], str(pk))), similarity) for pks, similarity in clusters.groups()]
+    result.sort(key=lambda cluster: dates[cluster[0][-1]], reverse=True)
+    return result
+
+
+def resolve(user, resolutions):
+    """Delete the discarded copies of each resolution, a mapping with `keep` and `discard` pks."""
+    return delete(user, sorted({pk for resolution in resolutions for pk in resolution['discard']}))
@@ -0,0 +1,43 @@
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from transactions.anomalies import score_users
+from utils.parallel import map_chunks
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Score every outcome against its category and store the anomaly scores (nightly job)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Number of worker processes (1 runs in-process).")
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help="Users per unit of work; bounds the rows held in memory at once.")
+        parser.add_argument('--threshold', type=float, default=settings.ANOMALY_THRESHOLD,
+                            help="Score from which an outcome counts as an anomaly.")
+        parser.add_argument('--user', type=int, action='append', dest='users', help="Limit to these user ids.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        users = User.objects.order_by('pk')
+        if options['users']:
+            users = users.filter(pk__in=options['users'])
+        user_ids = list(users.values_list('pk', flat=True))
+
+        summary = {'users': 0, 'transactions': 0, 'anomalies': 0, 'updated': 0}
+        for result in map_chunks(score_users, user_ids, workers=options['workers'],
+                                 chunk_size=options['chunk_size'], threshold=options['threshold']):
+            for key in summary:
+                summary[key] += result[key]
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Scored {summary['transactions']} outcomes of {summary['users']} users "
+            f"in {time.monotonic() - started:.3f}s: {summary['anomalies']} anomalies, "
+            f"{summary['updated']} scores updated."
+        ))
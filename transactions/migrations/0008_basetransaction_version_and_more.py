@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0007_historicalincomeoutcometransaction_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='basetransaction',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='historicalincomeoutcometransaction',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='historicaltransfertransaction',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
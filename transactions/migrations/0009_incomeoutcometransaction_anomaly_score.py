@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0008_basetransaction_version_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incomeoutcometransaction',
+            name='anomaly_score',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.6 on 2026-10-19 12:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0003_historicalcategory'),
+        ('transactions', '0009_incomeoutcometransaction_anomaly_score'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='basetransaction',
+            index=models.Index(fields=['user', 'amount', 'date'], name='transaction_user_id_ab1d7f_idx'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 import hashlib
 import uuid
+from collections import defaultdict
+from decimal import Decimal
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -7,12 +9,19 @@ from django.db import models
 from django.urls import reverse
 from rest_framework.exceptions import ValidationError
 
+from utils.history import BufferedHistoricalRecords
+from utils.versioning import VersionedModel
+
 User = get_user_model()
 
 
-class BaseTransaction(models.Model):
+class BaseTransaction(VersionedModel):
     class Meta:
         db_table = 'transactions'
+        indexes = [
+            # Blocking index of the duplicate finder, see `transactions.duplicates`
+            models.Index(fields=['user', 'amount', 'date']),
+        ]
 
     """Abstract base class for all transactions."""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -24,6 +33,52 @@ class BaseTransaction(models.Model):
     currency = models.CharField(max_length=3, choices=settings.CURRENCIES, default="EUR")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Attribute names of the balance foreign keys a transaction type books against.
+    balance_fields = ()
+    # Attribute names `ledger_entries` reads.
+    ledger_fields = ('amount',)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what is stored so signals can tell where the row used to sit in the ledger
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def ledger_positions(self):
+        """(balance_id, date) pairs touched by this transaction, both as stored and as pending."""
+        states = [self.__dict__, getattr(self, '_loaded_values', {})]
+        return {
+            (state.get(field), state.get('date'))
+            for state in states
+            for field in self.balance_fields
+            if state.get(field) is not None and state.get('date') is not None
+        }
+
+    def ledger_entries(self, state):
+        """{balance_id: signed amount} booked by the transaction in `state`, a mapping of attribute values."""
+        return {}
+
+    def ledger_deltas(self, deleted=False):
+        """
+        Change this save (or delete) makes to each balance amount, {balance_id: Decimal}.
+
+        Returns None when the stored or pending state was only partially loaded,
+        in which case the affected balances have to be recomputed from the ledger.
+        """
+        stored = getattr(self, '_loaded_values', self.__dict__ if deleted else {})
+        states = [stored] if deleted else [stored, self.__dict__]
+        if any(state and not all(field in state for field in self.ledger_fields) for state in states):
+            return None
+
+        deltas = defaultdict(Decimal)
+        for balance_id, amount in self.ledger_entries(stored).items():
+            deltas[balance_id] -= amount
+        if not deleted:
+            for balance_id, amount in self.ledger_entries(self.__dict__).items():
+                deltas[balance_id] += amount
+        return deltas
+
     @property
     def detail_url(self):
         if hasattr(self, 'incomeoutcometransaction'):
@@ -49,6 +104,7 @@ class BaseTransaction(models.Model):
         if not self.transaction_hash:
             self.transaction_hash = self.generate_transaction_hash()
         super().save(*args, **kwargs)
+        self._loaded_values = {field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields}
 
     def __str__(self):
         return f"{self.user.username} - {self.category.name} ({self.amount} {self.currency})"
@@ -69,6 +125,24 @@ class IncomeOutcomeTransaction(BaseTransaction):
     transaction_type = models.CharField(max_length=10, choices=TransactionType.choices, default=TransactionType.OUTCOME)
     balance = models.ForeignKey('balances.Balance', on_delete=models.CASCADE,
                                 related_name="income_outcome_transactions", null=True, blank=True)
+    # How unusual an outcome is for its category, see `transactions.anomalies`
+    anomaly_score = models.FloatField(null=True, blank=True, editable=False)
+
+    # Scores are derived data, rewritten in bulk every night
+    history = BufferedHistoricalRecords(excluded_fields=['anomaly_score'])
+
+    balance_fields = ('balance_id',)
+    ledger_fields = ('amount', 'transaction_type', 'balance_id')
+
+    def ledger_entries(self, state):
+        sign = {self.TransactionType.INCOME: 1, self.TransactionType.OUTCOME: -1}.get(state.get('transaction_type'))
+        if not state or state['balance_id'] is None or sign is None:
+            return {}
+        return {state['balance_id']: sign * Decimal(str(state['amount']))}
+
+    @property
+    def detail_url(self):
+        return reverse('income_outcome_transaction-detail', args=[self.id])
 
 
 class TransferTransaction(BaseTransaction):
@@ -79,6 +153,24 @@ class TransferTransaction(BaseTransaction):
     balance_from = models.ForeignKey('balances.Balance', on_delete=models.CASCADE, related_name="transfers_sent")
     balance_to = models.ForeignKey('balances.Balance', on_delete=models.CASCADE, related_name="transfers_received")
 
+    history = BufferedHistoricalRecords()
+
+    balance_fields = ('balance_from_id', 'balance_to_id')
+    ledger_fields = ('amount', 'balance_from_id', 'balance_to_id')
+
+    def ledger_entries(self, state):
+        if not state:
+            return {}
+        amount = Decimal(str(state['amount']))
+        entries = defaultdict(Decimal)
+        entries[state['balance_from_id']] -= amount
+        entries[state['balance_to_id']] += amount
+        return entries
+
+    @property
+    def detail_url(self):
+        return reverse('transfer_transaction-detail', args=[self.id])
+
     def clean(self):
         if self.balance_from == self.balance_to:
             raise ValidationError("Source and destination balances cannot be the same for a transfer.")
@@ -2,14 +2,16 @@
 
 from rest_framework import serializers
 
+from utils.sparse_fields import SparseFieldsetSerializerMixin
+
 from transactions.models import BaseTransaction
 
 
-class BaseTransactionSerializer(serializers.ModelSerializer):
+class BaseTransactionSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Unified serializer for listing all transactions."""
     category = serializers.StringRelatedField()
 
     class Meta:
         model = BaseTransaction
-        fields = ['id', 'category', 'amount', 'date', 'note', 'currency', 'detail_url']
-        read_only_fields = ['user', 'created_at']
+        fields = ['id', 'category', 'amount', 'date', 'note', 'currency', 'version', 'detail_url']
+        read_only_fields = ['user', 'created_at', 'version']
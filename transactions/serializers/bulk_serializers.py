@@ -0,0 +1,57 @@
+from rest_framework import serializers
+
+from balances.models import Balance
+from categories.models import Category
+from transactions.bulk import select_transactions
+from utils.fields import OwnedPrimaryKeyRelatedField
+
+
+class BulkFilterSerializer(serializers.Serializer):
+    category = OwnedPrimaryKeyRelatedField(queryset=Category.objects.all(), required=False)
+    balance = OwnedPrimaryKeyRelatedField(queryset=Balance.objects.all(), required=False)
+    date_after = serializers.DateField(required=False)
+    date_before = serializers.DateField(required=False)
+    transaction_type = serializers.ChoiceField(choices=['income', 'outcome', 'transfer'], required=False)
+
+    def validate(self, data):
+        if not data:
+            raise serializers.ValidationError("Give at least one criterion.")
+        if 'date_after' in data and 'date_before' in data and data['date_after'] > data['date_before']:
+            raise serializers.ValidationError("date_after must not be later than date_before.")
+        return data
+
+
+class BulkSelectionSerializer(serializers.Serializer):
+    """Selects the transactions of a bulk operation, either by `ids` or by `filter`."""
+    ids = serializers.ListField(child=serializers.UUIDField(), required=False, allow_empty=False)
+    filter = BulkFilterSerializer(required=False)
+
+    def validate(self, data):
+        if ('ids' in data) == ('filter' in data):
+            raise serializers.ValidationError('Give either "ids" or "filter".')
+        return data
+
+    def selected_pks(self):
+        criteria = self.validated_data.get('filter', {'ids': self.validated_data.get('ids')})
+        return select_transactions(self.context['request'].user, **criteria)
+
+
+class BulkRecategorizeSerializer(BulkSelectionSerializer):
+    category = OwnedPrimaryKeyRelatedField(queryset=Category.objects.all())
+
+
+class BulkMoveSerializer(BulkSelectionSerializer):
+    source = OwnedPrimaryKeyRelatedField(queryset=Balance.objects.all())
+    target = OwnedPrimaryKeyRelatedField(queryset=Balance.objects.all())
+
+    def validate(self, data):
+        data = super().validate(data)
+        if data['source'] == data['target']:
+            raise serializers.ValidationError("Source and target balances must differ.")
+        return data
+
+
+class BulkResultSerializer(serializers.Serializer):
+    transactions = serializers.IntegerField(help_text="Number of transactions updated or deleted.")
+    skipped = serializers.IntegerField(required=False, help_text="Transfers left alone by a move.")
+    balances = serializers.IntegerField(required=False, help_text="Number of balances recomputed.")
@@ -0,0 +1,45 @@
+from rest_framework import serializers
+
+from transactions.bulk import select_transactions
+from transactions.duplicates import DEFAULT_SIMILARITY, DEFAULT_WINDOW_DAYS
+from .base_transaction_serializers import BaseTransactionSerializer
+
+
+class DuplicateQuerySerializer(serializers.Serializer):
+    window = serializers.IntegerField(
+        min_value=0, max_value=31, default=DEFAULT_WINDOW_DAYS,
+        help_text="Maximum number of days between two copies of a transaction."
+    )
+    similarity = serializers.FloatField(
+        min_value=0, max_value=1, default=DEFAULT_SIMILARITY,
+        help_text="Minimum similarity of the notes, 1 meaning identical."
+    )
+
+
+class DuplicateClusterSerializer(serializers.Serializer):
+    similarity = serializers.FloatField(help_text="Note similarity of the least similar pair in the cluster.")
+    transactions = BaseTransactionSerializer(many=True, help_text="The copies, oldest (the likely original) first.")
+
+
+class DuplicateResolutionSerializer(serializers.Serializer):
+    keep = serializers.UUIDField()
+    discard = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
+
+    def validate(self, data):
+        if data['keep'] in data['discard']:
+            raise serializers.ValidationError("The transaction to keep cannot be discarded.")
+        return data
+
+
+class DuplicateResolveSerializer(serializers.Serializer):
+    resolutions = DuplicateResolutionSerializer(many=True, allow_empty=False)
+
+    def validate_resolutions(self, resolutions):
+        ids = {pk for resolution in resolutions for pk in [resolution['keep'], *resolution['discard']]}
+        kept = {resolution['keep'] for resolution in resolutions}
+        if kept & {pk for resolution in resolutions for pk in resolution['discard']}:
+            raise serializers.ValidationError("A kept transaction is discarded by another resolution.")
+        found = set(select_transactions(self.context['request'].user, ids=ids))
+        if missing := ids - found:
+            raise serializers.ValidationError(f"Unknown transactions: {', '.join(sorted(map(str, missing)))}.")
+        return resolutions
@@ -1,12 +1,16 @@
+from django.conf import settings
 from rest_framework import serializers
 
+from balances.models import Balance
 from categories.models import Category
 from transactions.models import IncomeOutcomeTransaction
 from transactions.serializers.base_transaction_serializers import BaseTransactionSerializer
+from utils.fields import OwnedPrimaryKeyRelatedField
 
 
 class CreateIncomeOutcomeTransactionSerializer(BaseTransactionSerializer):
-    category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all())
+    category = OwnedPrimaryKeyRelatedField(queryset=Category.objects.all())
+    balance = OwnedPrimaryKeyRelatedField(queryset=Balance.objects.all(), required=False, allow_null=True)
 
     class Meta:
         model = IncomeOutcomeTransaction
@@ -20,11 +24,51 @@ class CreateIncomeOutcomeTransactionSerializer(BaseTransactionSerializer):
 
 
 class IncomeOutcomeTransactionSerializer(BaseTransactionSerializer):
+    balance = OwnedPrimaryKeyRelatedField(queryset=Balance.objects.all(), required=False, allow_null=True)
+
     class Meta:
         model = IncomeOutcomeTransaction
         fields = BaseTransactionSerializer.Meta.fields + [
             'transaction_type',
             'balance',
             'created_at',
+            'anomaly_score',
         ]
-        read_only_fields = BaseTransactionSerializer.Meta.read_only_fields + ['user', 'created_at']
+        read_only_fields = BaseTransactionSerializer.Meta.read_only_fields + ['user', 'created_at', 'anomaly_score']
+
+
+class AnomalyQuerySerializer(serializers.Serializer):
+    threshold = serializers.FloatField(min_value=0, default=settings.ANOMALY_THRESHOLD)
+
+
+class DistributionQuerySerializer(serializers.Serializer):
+    category = OwnedPrimaryKeyRelatedField(queryset=Category.objects.all(), required=False)
+    transaction_type = serializers.ChoiceField(
+        choices=IncomeOutcomeTransaction.TransactionType.choices,
+        default=IncomeOutcomeTransaction.TransactionType.OUTCOME
+    )
+    date_after = serializers.DateField(required=False)
+    date_before = serializers.DateField(required=False)
+    bins = serializers.IntegerField(min_value=1, max_value=100, default=10, help_text="Number of histogram buckets.")
+
+    def validate(self, data):
+        if 'date_after' in data and 'date_before' in data and data['date_after'] > data['date_before']:
+            raise serializers.ValidationError("date_after must not be later than date_before.")
+        return data
+
+
+class HistogramBucketSerializer(serializers.Serializer):
+    lower = serializers.FloatField()
+    upper = serializers.FloatField()
+    count = serializers.IntegerField()
+
+
+class DistributionSerializer(serializers.Serializer):
+    category = serializers.IntegerField()
+    category_name = serializers.CharField()
+    count = serializers.IntegerField()
+    min = serializers.DecimalField(max_digits=15, decimal_places=2)
+    max = serializers.DecimalField(max_digits=15, decimal_places=2)
+    mean = serializers.FloatField()
+    percentiles = serializers.DictField(child=serializers.FloatField(), help_text="p25, p50, p75, p90, p95 and p99.")
+    histogram = HistogramBucketSerializer(many=True, help_text="Equal-width buckets from min to max.")
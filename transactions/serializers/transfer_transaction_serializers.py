@@ -4,12 +4,13 @@ from balances.models import Balance
 from categories.models import Category
 from transactions.models import TransferTransaction
 from transactions.serializers.base_transaction_serializers import BaseTransactionSerializer
+from utils.fields import OwnedPrimaryKeyRelatedField
 
 
 class CreateTransferTransactionSerializer(BaseTransactionSerializer):
-    balance_from = serializers.PrimaryKeyRelatedField(queryset=Balance.objects.all())
-    balance_to = serializers.PrimaryKeyRelatedField(queryset=Balance.objects.all())
-    category = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all())
+    balance_from = OwnedPrimaryKeyRelatedField(queryset=Balance.objects.all())
+    balance_to = OwnedPrimaryKeyRelatedField(queryset=Balance.objects.all())
+    category = OwnedPrimaryKeyRelatedField(queryset=Category.objects.all())
 
     class Meta:
         model = TransferTransaction
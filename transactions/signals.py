@@ -1,20 +1,73 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 from django.db.models.signals import post_save, post_delete
-from django.dispatch import receiver
+from django.dispatch import Signal, receiver
 
+from balances.ledger import apply_deltas, invalidate_checkpoints, recompute_balances
+from balances.models import Balance
 from .models import IncomeOutcomeTransaction, TransferTransaction
 
+# Sent by bulk operations, which write with `QuerySet.update()` and bypass `post_save`.
+# Arguments: sender (the model), user_id, object_ids.
+bulk_updated = Signal()
+
+_deferred_positions = ContextVar('deferred_ledger_positions', default=None)
+
+
+@contextmanager
+def deferred_balance_updates():
+    """
+    Collect the ledger positions touched inside the block instead of updating
+    balances per row, and recompute each affected balance once on exit.
+    Yields the set of positions, so writes that send no signals can add theirs.
+    """
+    positions = set()
+    token = _deferred_positions.set(positions)
+    try:
+        yield positions
+    finally:
+        _deferred_positions.reset(token)
+        recompute_balances(positions)
+
+
+def _update_balances(instance, deleted):
+    deferred = _deferred_positions.get()
+    if deferred is not None:
+        deferred.update(instance.ledger_positions())
+        return
+
+    deltas = instance.ledger_deltas(deleted)
+    if deltas is not None:
+        apply_deltas(deltas)
+        return
+    # Partially loaded instance: recompute every balance it touches, including the ones it
+    # was moved away from. They are looked up by id because in a cascading delete they may
+    # already be gone.
+    balance_ids = {balance_id for balance_id, _ in instance.ledger_positions()}
+    for balance in Balance.objects.filter(pk__in=balance_ids):
+        balance.update_amount()
+
 
 @receiver(post_save, sender=IncomeOutcomeTransaction)
 @receiver(post_delete, sender=IncomeOutcomeTransaction)
 def update_balance_on_transaction_change(sender, instance, **kwargs):
     """Update balance when an income/outcome transaction is created, updated, or deleted."""
-    if instance.balance:
-        instance.balance.update_amount()
+    _update_balances(instance, deleted=kwargs['signal'] is post_delete)
 
 
 @receiver(post_save, sender=TransferTransaction)
 @receiver(post_delete, sender=TransferTransaction)
 def update_balances_on_transfer_change(sender, instance, **kwargs):
     """Update balances when a transfer transaction is created, updated, or deleted."""
-    instance.balance_from.update_amount()
-    instance.balance_to.update_amount()
+    _update_balances(instance, deleted=kwargs['signal'] is post_delete)
+
+
+@receiver(post_save, sender=IncomeOutcomeTransaction)
+@receiver(post_delete, sender=IncomeOutcomeTransaction)
+@receiver(post_save, sender=TransferTransaction)
+@receiver(post_delete, sender=TransferTransaction)
+def invalidate_checkpoints_on_transaction_change(sender, instance, **kwargs):
+    """Drop balance checkpoints made stale by a (possibly backdated) transaction."""
+    if _deferred_positions.get() is None:
+        invalidate_checkpoints(instance.ledger_positions())
@@ -0,0 +1,84 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from balances.models import Balance
+from categories.models import Category
+from transactions.anomalies import robust_scores
+from transactions.models import IncomeOutcomeTransaction
+
+User = get_user_model()
+
+
+class RobustScoreTests(SimpleTestCase):
+    def test_scores_per_group(self):
+        """Test that each amount is scored against the median and MAD of its own group only."""
+        groups = np.array([1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2])
+        amounts = np.array([10, 11, 12, 9, 10, 200, 1000, 1010, 990, 1005, 995, 1000], dtype=float)
+        scores = robust_scores(groups, amounts)
+
+        # Group 1: median 10.5, MAD 1, so 200 is 0.6745 * 189.5 away
+        self.assertAlmostEqual(scores[5], 0.6745 * 189.5, places=6)
+        self.assertTrue(np.all(np.abs(scores[6:]) < 2))
+
+    def test_small_and_constant_groups(self):
+        """Test that tiny groups are not scored and constant groups fall back to the mean deviation."""
+        groups = np.array([1, 1, 2, 2, 2, 2, 2, 2])
+        amounts = np.array([10, 500, 5, 5, 5, 5, 5, 50], dtype=float)
+        scores = robust_scores(groups, amounts)
+
+        self.assertTrue(np.all(np.isnan(scores[:2])))
+        self.assertEqual(scores[2], 0)
+        self.assertGreater(scores[7], 3.5)
+
+
+class AnomalyTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.balance = Balance.objects.create(user=self.user, name='Checking Account', currency='EUR')
+        self.groceries = Category.objects.create(user=self.user, name='Groceries')
+        for day, amount in enumerate([40, 42, 38, 41, 39, 43, 40], start=1):
+            self.outcome(amount, date(2024, 1, day))
+        self.outlier = self.outcome(450, date(2024, 1, 20))
+
+    def outcome(self, amount, on_date, category=None):
+        return IncomeOutcomeTransaction.objects.create(
+            user=self.user, category=category or self.groceries, amount=Decimal(amount), date=on_date,
+            transaction_type='outcome', balance=self.balance,
+        )
+
+    def test_anomaly_endpoint(self):
+        """Test that the endpoint lists only the outlier, with its live score."""
+        response = self.client.get(reverse('income_outcome_transaction-anomalies'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in response.data], [str(self.outlier.pk)])
+        self.assertGreater(response.data[0]['anomaly_score'], 3.5)
+
+        response = self.client.get(reverse('income_outcome_transaction-anomalies'), {'threshold': 1000})
+        self.assertEqual(response.data, [])
+
+    def test_command_stores_scores(self):
+        """Test that the batch command stores scores and rewrites only the ones that changed."""
+        out = StringIO()
+        call_command('detect_anomalies', workers=1, stdout=out)
+        self.assertIn('8 outcomes of 1 users', out.getvalue())
+        self.assertIn('1 anomalies, 8 scores updated', out.getvalue())
+        self.outlier.refresh_from_db()
+        self.assertGreater(self.outlier.anomaly_score, 3.5)
+
+        out = StringIO()
+        call_command('detect_anomalies', workers=1, stdout=out)
+        self.assertIn('0 scores updated', out.getvalue())
+
+        response = self.client.get(reverse('income_outcome_transaction-detail', args=[self.outlier.pk]))
+        self.assertEqual(response.data['anomaly_score'], self.outlier.anomaly_score)
@@ -0,0 +1,168 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from balances.ledger import net_flows
+from balances.models import Balance
+from categories.models import Category
+from transactions.models import IncomeOutcomeTransaction, TransferTransaction
+
+User = get_user_model()
+
+
+class BalanceDeltaTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(user=self.user, name='Groceries')
+        self.savings = Balance.objects.create(user=self.user, name='Savings Account', currency='EUR')
+        self.checking = Balance.objects.create(user=self.user, name='Checking Account', currency='EUR')
+
+    def assertAmounts(self, savings, checking):
+        self.savings.refresh_from_db()
+        self.checking.refresh_from_db()
+        self.assertEqual(self.savings.amount, Decimal(savings))
+        self.assertEqual(self.checking.amount, Decimal(checking))
+        flows = net_flows([self.savings.pk, self.checking.pk])
+        self.assertEqual(flows[self.savings.pk], self.savings.amount)
+        self.assertEqual(flows[self.checking.pk], self.checking.amount)
+
+    def test_income_outcome_deltas(self):
+        """Test that creating, editing, moving and deleting an income/outcome books only the difference."""
+        income = IncomeOutcomeTransaction.objects.create(
+            user=self.user, category=self.category, amount=Decimal('100.00'), date='2024-01-01',
+            transaction_type='income', balance=self.savings
+        )
+        self.assertAmounts('100.00', '0.00')
+
+        income.amount = Decimal('80.00')
+        income.transaction_type = 'outcome'
+        income.save()
+        self.assertAmounts('-80.00', '0.00')
+
+        income.balance = self.checking
+        income.save()
+        self.assertAmounts('0.00', '-80.00')
+
+        income.delete()
+        self.assertAmounts('0.00', '0.00')
+
+    def test_transfer_deltas(self):
+        """Test that a transfer books against both balances and is reverted on delete."""
+        IncomeOutcomeTransaction.objects.create(
+            user=self.user, category=self.category, amount=Decimal('500.00'), date='2024-01-01',
+            transaction_type='income', balance=self.savings
+        )
+        transfer = TransferTransaction.objects.create(
+            user=self.user, category=self.category, amount=Decimal('120.00'), date='2024-01-02',
+            balance_from=self.savings, balance_to=self.checking
+        )
+        self.assertAmounts('380.00', '120.00')
+
+        transfer = TransferTransaction.objects.get(pk=transfer.pk)
+        transfer.balance_from, transfer.balance_to = self.checking, self.savings
+        transfer.save()
+        self.assertAmounts('620.00', '-120.00')
+
+        transfer.delete()
+        self.assertAmounts('500.00', '0.00')
+
+    def test_partially_loaded_transaction_falls_back_to_recompute(self):
+        """Test that saving a transaction loaded without its amount still leaves the balance right."""
+        outcome = IncomeOutcomeTransaction.objects.create(
+            user=self.user, category=self.category, amount=Decimal('30.00'), date='2024-01-01',
+            transaction_type='outcome', balance=self.savings
+        )
+        outcome = IncomeOutcomeTransaction.objects.only('id', 'date', 'balance').get(pk=outcome.pk)
+        self.assertIsNone(outcome.ledger_deltas())
+
+        outcome.balance = self.checking
+        outcome.save()
+        self.assertAmounts('0.00', '-30.00')
+
+    def test_inactive_balance_stays_zero(self):
+        """Test that transactions on a deactivated balance keep its amount at zero."""
+        self.savings.soft_delete()
+        IncomeOutcomeTransaction.objects.create(
+            user=self.user, category=self.category, amount=Decimal('40.00'), date='2024-01-01',
+            transaction_type='income', balance=self.savings
+        )
+        self.savings.refresh_from_db()
+        self.assertEqual(self.savings.amount, 0)
+
+    def test_create_transfer_via_api(self):
+        """Test that the transfer endpoint applies both deltas."""
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        response = client.post(reverse('transfer_transaction-list'), {
+            'category': self.category.id,
+            'amount': '75.50',
+            'date': '2024-01-03',
+            'balance_from': self.savings.id,
+            'balance_to': self.checking.id,
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertAmounts('-75.50', '75.50')
+
+    def test_create_transfer_with_foreign_balance_or_category(self):
+        """Test that a transfer from, to or categorized with another user's objects is rejected."""
+        other = User.objects.create_user(username='otheruser', password='otherpassword')
+        other_balance = Balance.objects.create(user=other, name='Other Account', currency='EUR')
+        other_category = Category.objects.create(user=other, name='Other Category')
+        IncomeOutcomeTransaction.objects.create(
+            user=other, category=other_category, amount=Decimal('1000.00'), date='2024-01-01',
+            transaction_type='income', balance=other_balance
+        )
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        valid = {
+            'category': self.category.id, 'amount': '900.00', 'date': '2024-01-03',
+            'balance_from': self.savings.id, 'balance_to': self.checking.id,
+        }
+        for field, foreign in (('balance_from', other_balance), ('balance_to', other_balance),
+                               ('category', other_category)):
+            response = client.post(reverse('transfer_transaction-list'), {**valid, field: foreign.id}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(field, response.data)
+
+        other_balance.refresh_from_db()
+        self.assertEqual(other_balance.amount, Decimal('1000.00'))
+        self.assertFalse(TransferTransaction.objects.exists())
+        self.assertAmounts('0.00', '0.00')
+
+    def test_income_outcome_with_foreign_balance_or_category(self):
+        """Test that an income/outcome booked on or moved to another user's balance or category is rejected."""
+        other = User.objects.create_user(username='otheruser', password='otherpassword')
+        other_balance = Balance.objects.create(user=other, name='Other Account', currency='EUR')
+        other_category = Category.objects.create(user=other, name='Other Category')
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        valid = {
+            'category': self.category.id, 'amount': '500.00', 'date': '2024-01-03',
+            'transaction_type': 'outcome', 'balance': self.savings.id,
+        }
+        for field, foreign in (('balance', other_balance), ('category', other_category)):
+            response = client.post(reverse('income_outcome_transaction-list'), {**valid, field: foreign.id},
+                                   format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(field, response.data)
+        self.assertFalse(IncomeOutcomeTransaction.objects.exists())
+
+        outcome = IncomeOutcomeTransaction.objects.create(
+            user=self.user, category=self.category, amount=Decimal('500.00'), date='2024-01-03',
+            transaction_type='outcome', balance=self.savings
+        )
+        response = client.patch(reverse('income_outcome_transaction-detail', args=[outcome.id]),
+                                {'balance': other_balance.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        other_balance.refresh_from_db()
+        self.assertEqual(other_balance.amount, Decimal('0.00'))
+        self.assertAmounts('-500.00', '0.00')
@@ -0,0 +1,140 @@
+from collections import Counter
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from balances.ledger import amount_at, net_flows
+from balances.models import Balance, BalanceCheckpoint
+from categories.models import Category
+from sync.models import Change
+from transactions.models import BaseTransaction, IncomeOutcomeTransaction, TransferTransaction
+
+User = get_user_model()
+
+
+class BulkOperationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.other_user = User.objects.create_user(username='otheruser', password='otherpassword')
+        self.client.force_authenticate(user=self.user)
+
+        self.groceries = Category.objects.create(user=self.user, name='Groceries')
+        self.food = Category.objects.create(user=self.user, name='Food')
+        self.savings = Balance.objects.create(user=self.user, name='Savings Account', currency='EUR')
+        self.checking = Balance.objects.create(user=self.user, name='Checking Account', currency='EUR')
+        self.cash = Balance.objects.create(user=self.user, name='Cash', currency='EUR')
+
+        self.outcomes = [
+            IncomeOutcomeTransaction.objects.create(
+                user=self.user, category=self.groceries, amount=Decimal(10 + day), date=date(2024, 1, day),
+                transaction_type='outcome', balance=self.savings
+            )
+            for day in range(1, 6)
+        ]
+        self.to_checking = TransferTransaction.objects.create(
+            user=self.user, category=self.groceries, amount=Decimal('100.00'), date=date(2024, 1, 6),
+            balance_from=self.savings, balance_to=self.checking
+        )
+        self.to_cash = TransferTransaction.objects.create(
+            user=self.user, category=self.food, amount=Decimal('50.00'), date=date(2024, 1, 7),
+            balance_from=self.savings, balance_to=self.cash
+        )
+
+        other_category = Category.objects.create(user=self.other_user, name='Groceries')
+        other_balance = Balance.objects.create(user=self.other_user, name='Savings Account', currency='EUR')
+        self.foreign = IncomeOutcomeTransaction.objects.create(
+            user=self.other_user, category=other_category, amount=Decimal('99.00'), date=date(2024, 1, 1),
+            transaction_type='outcome', balance=other_balance
+        )
+
+    def assertLedgerConsistent(self):
+        balances = Balance.objects.filter(user=self.user)
+        flows = net_flows([balance.pk for balance in balances])
+        for balance in balances:
+            self.assertEqual(balance.amount, flows[balance.pk], balance.name)
+
+    def test_recategorize_by_filter(self):
+        """Test that recategorizing updates every match, records history and sync changes, and bumps versions."""
+        response = self.client.post(reverse('transaction-bulk-recategorize'), {
+            'filter': {'category': self.groceries.id},
+            'category': self.food.id,
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'transactions': 6})
+        self.assertEqual(BaseTransaction.objects.filter(user=self.user, category=self.food).count(), 7)
+        self.assertEqual(IncomeOutcomeTransaction.history.filter(category=self.food, history_type='~').count(), 5)
+        self.assertEqual(TransferTransaction.history.filter(category=self.food, history_type='~').count(), 1)
+        self.assertEqual(
+            Change.objects.filter(user=self.user, object_id=str(self.to_checking.id)).count(), 2
+        )
+        self.to_checking.refresh_from_db()
+        self.assertEqual(self.to_checking.version, 2)
+
+    def test_move_recomputes_each_balance_once(self):
+        """Test that a move books transactions on the target and recomputes each affected balance once."""
+        amount_at(self.savings, date(2024, 2, 29))
+        self.assertTrue(BalanceCheckpoint.objects.filter(balance=self.savings).exists())
+        original = Balance.update_amount
+        recomputed = Counter()
+
+        def counting_update_amount(balance):
+            recomputed[balance.pk] += 1
+            original(balance)
+
+        with mock.patch('transactions.bulk.BULK_CHUNK_SIZE', 2), \
+                mock.patch.object(Balance, 'update_amount', counting_update_amount):
+            response = self.client.post(reverse('transaction-bulk-move'), {
+                'filter': {'balance': self.savings.id},
+                'source': self.savings.id,
+                'target': self.checking.id,
+            }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'transactions': 6, 'skipped': 1, 'balances': 2})
+        self.assertEqual(recomputed, {self.savings.pk: 1, self.checking.pk: 1})
+        self.assertFalse(BalanceCheckpoint.objects.filter(balance=self.savings).exists())
+
+        self.to_cash.refresh_from_db()
+        self.assertEqual(self.to_cash.balance_from, self.checking)
+        self.assertFalse(IncomeOutcomeTransaction.objects.filter(balance=self.savings).exists())
+        self.assertLedgerConsistent()
+
+    def test_delete_by_ids(self):
+        """Test that deleting by ids ignores other users' transactions and leaves balances consistent."""
+        ids = [str(self.outcomes[0].id), str(self.to_checking.id), str(self.foreign.id)]
+
+        with mock.patch('transactions.bulk.BULK_CHUNK_SIZE', 1):
+            response = self.client.post(reverse('transaction-bulk-delete'), {'ids': ids}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'transactions': 2, 'balances': 2})
+        self.assertTrue(BaseTransaction.objects.filter(pk=self.foreign.pk).exists())
+        self.assertFalse(BaseTransaction.objects.filter(pk__in=ids[:2]).exists())
+        self.assertEqual(Change.objects.filter(action=Change.Action.DELETE).count(), 2)
+        self.assertLedgerConsistent()
+
+    def test_invalid_selection(self):
+        """Test that a selection needs exactly one of ids and filter, and only the user's own objects."""
+        url = reverse('transaction-bulk-delete')
+
+        self.assertEqual(self.client.post(url, {}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self.client.post(url, {'ids': [str(self.to_cash.id)], 'filter': {'transaction_type': 'transfer'}},
+                             format='json').status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(self.client.post(url, {'filter': {}}, format='json').status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self.client.post(url, {'filter': {'category': self.foreign.category_id}}, format='json').status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(BaseTransaction.objects.count(), 8)
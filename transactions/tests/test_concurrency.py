@@ -0,0 +1,70 @@
+import threading
+import unittest
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from balances.ledger import net_flows
+from balances.models import Balance
+from categories.models import Category
+
+User = get_user_model()
+
+THREADS = 16
+TRANSFERS_PER_THREAD = 25
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Row-level locking needs PostgreSQL')
+class ConcurrentTransferTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.category = Category.objects.create(user=self.user, name='Transfers')
+        self.balances = [
+            Balance.objects.create(user=self.user, name=f'Account {index}', currency='EUR') for index in range(3)
+        ]
+
+    def _transfer(self, thread, errors):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        try:
+            for index in range(TRANSFERS_PER_THREAD):
+                # Every thread goes both ways between every pair of balances, so unordered locks would deadlock
+                source = self.balances[(thread + index) % 3]
+                target = self.balances[(thread + index + 1 + index % 2) % 3]
+                response = client.post(reverse('transfer_transaction-list'), {
+                    'category': self.category.id,
+                    # Distinct amounts keep the transaction hashes unique
+                    'amount': str(Decimal(thread * 1000 + index + 1) / 100),
+                    'date': '2024-01-01',
+                    'balance_from': source.id,
+                    'balance_to': target.id,
+                }, format='json')
+                if response.status_code != status.HTTP_201_CREATED:
+                    errors.append(response.content)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    def test_concurrent_transfers_lose_no_updates(self):
+        """Test that concurrent transfers over shared balances keep every amount equal to the ledger."""
+        errors = []
+        threads = [threading.Thread(target=self._transfer, args=(thread, errors)) for thread in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        flows = net_flows([balance.pk for balance in self.balances])
+        amounts = dict(Balance.objects.filter(pk__in=flows).values_list('pk', 'amount'))
+        self.assertEqual(amounts, dict(flows))
+        self.assertEqual(sum(amounts.values()), 0)
+        self.assertEqual(
+            sum(balance.transfers_sent.count() for balance in self.balances), THREADS * TRANSFERS_PER_THREAD
+        )
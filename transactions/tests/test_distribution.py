@@ -0,0 +1,120 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from balances.models import Balance
+from categories.models import Category
+from sync.models import Change
+from transactions import distribution
+from transactions.models import IncomeOutcomeTransaction
+
+User = get_user_model()
+
+
+class SketchTests(SimpleTestCase):
+    def test_sketch_percentiles_are_close(self):
+        """Test that percentiles read off a fine histogram are within a bucket width of the exact ones."""
+        values = np.random.default_rng(0).lognormal(3, 1, 50_000)
+        bucket_edges = distribution.edges(values.min(), values.max(), 10_000)
+        counts = distribution.bucket_counts(values, bucket_edges)
+        approximate = distribution.sketch_percentiles(counts, bucket_edges, distribution.PERCENTILES)
+        width = bucket_edges[1] - bucket_edges[0]
+        np.testing.assert_allclose(approximate, np.percentile(values, distribution.PERCENTILES), atol=width)
+
+    def test_bucket_counts(self):
+        """Test that the maximum lands in the last bucket and equal amounts in the first."""
+        self.assertEqual(distribution.bucket_counts(np.array([0, 5, 9.99, 10]), distribution.edges(0, 10, 2)).tolist(),
+                         [1, 3])
+        self.assertEqual(distribution.bucket_counts(np.array([7, 7]), distribution.edges(7, 7, 3)).tolist(), [2, 0, 0])
+
+
+# The endpoint is served from a replica when DB_REPLICAS configures them; these tests are about the
+# distribution itself, so they read from the primary (routing is covered in utils.tests)
+@override_settings(REPLICA_DATABASES=[])
+class DistributionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.balance = Balance.objects.create(user=self.user, name='Checking Account', currency='EUR')
+        self.groceries = Category.objects.create(user=self.user, name='Groceries')
+        self.rent = Category.objects.create(user=self.user, name='Rent')
+        self.amounts = [Decimal(amount) for amount in range(1, 101)]
+        for day, amount in enumerate(self.amounts):
+            self.create(self.groceries, amount, date(2024, 1, 1) + timedelta(days=day))
+        for month in range(1, 4):
+            self.create(self.rent, Decimal('900.00'), date(2024, month, 1))
+        self.create(self.groceries, Decimal('5000.00'), date(2024, 1, 1), 'income')
+        self.url = reverse('income_outcome_transaction-distribution')
+
+    def create(self, category, amount, on_date, transaction_type='outcome'):
+        return IncomeOutcomeTransaction.objects.create(
+            user=self.user, category=category, amount=amount, date=on_date, transaction_type=transaction_type,
+            balance=self.balance
+        )
+
+    def test_distribution(self):
+        """Test that percentiles and histograms match NumPy's and only outcomes are counted."""
+        response = self.client.get(self.url, {'bins': 4})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        groceries, rent = response.data
+        self.assertEqual((groceries['category_name'], groceries['count'], groceries['mean']), ('Groceries', 100, 50.5))
+        expected = np.percentile(np.array(self.amounts, dtype=float), distribution.PERCENTILES)
+        self.assertEqual(list(groceries['percentiles'].values()), np.round(expected, 2).tolist())
+        self.assertEqual([bucket['count'] for bucket in groceries['histogram']], [25, 25, 25, 25])
+        self.assertEqual((groceries['histogram'][0]['lower'], groceries['histogram'][-1]['upper']), (1.0, 100.0))
+
+        self.assertEqual(rent['percentiles']['p50'], 900.0)
+        self.assertEqual([bucket['count'] for bucket in rent['histogram']], [3, 0, 0, 0])
+
+    def test_filters(self):
+        """Test that the category, type and period filters apply and invalid periods are rejected."""
+        response = self.client.get(self.url, {'category': self.groceries.pk, 'date_before': '2024-01-10'})
+        self.assertEqual([(row['category_name'], row['count']) for row in response.data], [('Groceries', 10)])
+
+        response = self.client.get(self.url, {'transaction_type': 'income'})
+        self.assertEqual([row['max'] for row in response.data], ['5000.00'])
+
+        response = self.client.get(self.url, {'date_after': '2024-02-01', 'date_before': '2024-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sketch_for_large_categories(self):
+        """Test that categories above the exact limit get percentiles interpolated from the sketch."""
+        with mock.patch.object(distribution, 'EXACT_LIMIT', 10):
+            groceries = self.client.get(self.url).data[0]
+        self.assertAlmostEqual(groceries['percentiles']['p50'], 50.5, delta=0.1)
+        self.assertAlmostEqual(groceries['percentiles']['p90'], 90.1, delta=0.1)
+
+    def test_cached_per_data_version(self):
+        """Test that repeated loads only read the data version, and any write invalidates the result."""
+        first = self.client.get(self.url).data
+        with self.assertNumQueries(1):
+            distribution.distribution(self.user)
+
+        self.create(self.groceries, Decimal('250.00'), date(2024, 6, 1))
+        second = self.client.get(self.url).data
+        self.assertEqual(second[0]['count'], first[0]['count'] + 1)
+
+    def test_write_committed_out_of_id_order_invalidates(self):
+        """Test that a write whose change ids are below the latest one still moves the data version."""
+        first = self.client.get(self.url).data
+        latest = Change.objects.filter(user=self.user).order_by('-sequence').values_list('sequence', flat=True)[0]
+
+        self.create(self.groceries, Decimal('250.00'), date(2024, 6, 1))
+        # As if its changes had been given ids before the latest change, and committed after it
+        Change.objects.filter(user=self.user, sequence__gt=latest).update(id=F('id') - 1000)
+
+        second = self.client.get(self.url).data
+        self.assertEqual(second[0]['count'], first[0]['count'] + 1)
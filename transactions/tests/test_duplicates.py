@@ -0,0 +1,115 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from balances.models import Balance
+from categories.models import Category
+from transactions.duplicates import MAX_BLOCK_SIZE, candidate_pairs, normalize_note, note_similarity
+from transactions.models import BaseTransaction, IncomeOutcomeTransaction, TransferTransaction
+
+User = get_user_model()
+
+
+class CandidatePairTests(SimpleTestCase):
+    def rows(self, *specs):
+        return [(index, Decimal(amount), day, ('EUR', 'outcome'), '') for index, (amount, day) in enumerate(specs)]
+
+    def test_blocks_by_amount_and_window(self):
+        """Test that only rows of equal amount within the date window are paired."""
+        rows = self.rows(('10', date(2024, 1, 1)), ('10', date(2024, 1, 3)), ('10', date(2024, 1, 9)),
+                         ('12', date(2024, 1, 9)), ('12', date(2024, 1, 10)))
+        pairs = [(first[0], second[0]) for first, second in candidate_pairs(rows, window=3)]
+        self.assertEqual(pairs, [(0, 1), (3, 4)])
+
+    def test_block_size_is_bounded(self):
+        """Test that a run of identical payments yields a bounded number of pairs per row."""
+        rows = self.rows(*[('5', date(2024, 1, 1) + timedelta(days=day // 50)) for day in range(500)])
+        pairs = list(candidate_pairs(rows, window=3))
+        self.assertLessEqual(len(pairs), MAX_BLOCK_SIZE * len(rows))
+
+    def test_note_similarity(self):
+        """Test that notes differing in case and punctuation are identical after normalization."""
+        self.assertEqual(normalize_note('CARD payment: Lidl, #123'), 'card payment lidl 123')
+        self.assertEqual(note_similarity(normalize_note('Lidl #123'), normalize_note('LIDL 123')), 1.0)
+        self.assertLess(note_similarity('rent march', 'card payment lidl', threshold=0.6), 0.6)
+
+
+class DuplicateTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.other_user = User.objects.create_user(username='otheruser', password='otherpassword')
+        self.client.force_authenticate(user=self.user)
+        self.groceries = Category.objects.create(user=self.user, name='Groceries')
+        self.checking = Balance.objects.create(user=self.user, name='Checking Account', currency='EUR')
+        self.savings = Balance.objects.create(user=self.user, name='Savings Account', currency='EUR')
+
+        self.original = self.outcome('42.50', date(2024, 3, 4), 'CARD PAYMENT Lidl Berlin #8812')
+        self.copy = self.outcome('42.50', date(2024, 3, 5), 'Card payment - LIDL BERLIN 8812')
+        self.later = self.outcome('42.50', date(2024, 3, 20), 'CARD PAYMENT Lidl Berlin #8812')
+        self.unrelated = self.outcome('42.50', date(2024, 3, 6), 'Gym membership')
+        self.refund = self.outcome('42.50', date(2024, 3, 3), 'CARD PAYMENT Lidl Berlin #8812', 'income')
+        self.transfer = TransferTransaction.objects.create(
+            user=self.user, category=self.groceries, amount=Decimal('42.50'), date=date(2024, 3, 7),
+            note='Card payment Lidl Berlin 8812', balance_from=self.checking, balance_to=self.savings
+        )
+
+        other_category = Category.objects.create(user=self.other_user, name='Groceries')
+        other_balance = Balance.objects.create(user=self.other_user, name='Checking Account', currency='EUR')
+        self.foreign = IncomeOutcomeTransaction.objects.create(
+            user=self.other_user, category=other_category, amount=Decimal('42.50'), date=date(2024, 3, 4),
+            note='CARD PAYMENT Lidl Berlin #8812', transaction_type='outcome', balance=other_balance
+        )
+
+    def outcome(self, amount, on_date, note, transaction_type='outcome'):
+        return IncomeOutcomeTransaction.objects.create(
+            user=self.user, category=self.groceries, amount=Decimal(amount), date=on_date, note=note,
+            transaction_type=transaction_type, balance=self.checking
+        )
+
+    def test_list_duplicates(self):
+        """Test that only same-kind copies with similar notes within the window are clustered."""
+        response = self.client.get(reverse('transaction-duplicates'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        cluster = response.data[0]
+        self.assertEqual([row['id'] for row in cluster['transactions']], [str(self.original.pk), str(self.copy.pk)])
+        self.assertGreaterEqual(cluster['similarity'], 0.6)
+
+        response = self.client.get(reverse('transaction-duplicates'), {'window': 20})
+        self.assertEqual([row['id'] for row in response.data[0]['transactions']],
+                         [str(self.original.pk), str(self.copy.pk), str(self.later.pk)])
+
+        response = self.client.get(reverse('transaction-duplicates'), {'similarity': 2})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_resolve_duplicates(self):
+        """Test that resolving deletes the discarded copies and books them off the balance."""
+        self.checking.refresh_from_db()
+        amount = self.checking.amount
+        response = self.client.post(reverse('transaction-resolve-duplicates'), {
+            'resolutions': [{'keep': str(self.original.pk), 'discard': [str(self.copy.pk)]}]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['transactions'], 1)
+
+        self.assertFalse(BaseTransaction.objects.filter(pk=self.copy.pk).exists())
+        self.checking.refresh_from_db()
+        self.assertEqual(self.checking.amount, amount + Decimal('42.50'))
+        self.assertEqual(self.client.get(reverse('transaction-duplicates')).data, [])
+
+    def test_resolve_validation(self):
+        """Test that resolutions discarding the kept copy or other users' transactions are rejected."""
+        for resolution in (
+            {'keep': str(self.original.pk), 'discard': [str(self.original.pk)]},
+            {'keep': str(self.original.pk), 'discard': [str(self.foreign.pk)]},
+        ):
+            response = self.client.post(reverse('transaction-resolve-duplicates'), {'resolutions': [resolution]},
+                                        format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(BaseTransaction.objects.filter(pk=self.foreign.pk).exists())
@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from balances.models import Balance
+from categories.models import Category
+from transactions.models import IncomeOutcomeTransaction, TransferTransaction
+
+User = get_user_model()
+
+
+class TransactionSparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+        self.category = Category.objects.create(user=self.user, name='Groceries')
+        self.balance1 = Balance.objects.create(user=self.user, name='Savings Account', currency='EUR')
+        self.balance2 = Balance.objects.create(user=self.user, name='Checking Account', currency='EUR')
+
+        for day in range(1, 6):
+            IncomeOutcomeTransaction.objects.create(
+                user=self.user,
+                category=self.category,
+                amount=10 * day,
+                date=f'2024-01-0{day}',
+                note='Weekly shopping',
+                transaction_type='outcome',
+                balance=self.balance1
+            )
+        TransferTransaction.objects.create(
+            user=self.user,
+            category=self.category,
+            amount=100,
+            date='2024-01-06',
+            balance_from=self.balance1,
+            balance_to=self.balance2
+        )
+
+    def test_list_all_transactions_with_fields(self):
+        """Test that ?fields= on transactions/ selects only the requested columns, without joins."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('transaction-list'), {'fields': 'id,amount,date'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 6)
+        self.assertTrue(all(set(transaction) == {'id', 'amount', 'date'} for transaction in response.data))
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('JOIN', queries[0]['sql'])
+        self.assertNotIn('note', queries[0]['sql'])
+
+    def test_list_all_transactions_runs_one_query(self):
+        """Test that categories and detail URLs are resolved by joins rather than per row."""
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('transaction-list'))
+        self.assertTrue(all(transaction['detail_url'] for transaction in response.data))
+        self.assertTrue(all(transaction['category'] == 'Groceries' for transaction in response.data))
+
+    def test_list_transfer_transactions_runs_one_query(self):
+        """Test that transfers resolve both balances and the category in the same query."""
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('transfer_transaction-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+
+    def test_fields_are_ignored_on_writes(self):
+        """Test that ?fields= does not trim the fields accepted by a create."""
+        data = {
+            'category': self.category.id,
+            'amount': 5,
+            'date': '2024-02-01',
+            'transaction_type': 'income',
+            'balance': self.balance1.id,
+        }
+        url = reverse('income_outcome_transaction-list') + '?fields=id'
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['amount'], '5.00')
@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from balances.models import Balance
+from categories.models import Category
+from transactions.models import IncomeOutcomeTransaction, TransferTransaction
+from utils.versioning import VersionConflict
+
+User = get_user_model()
+
+
+class TransactionVersioningTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(user=self.user, name='Groceries')
+        self.savings = Balance.objects.create(user=self.user, name='Savings Account', currency='EUR')
+        self.checking = Balance.objects.create(user=self.user, name='Checking Account', currency='EUR')
+        self.outcome = IncomeOutcomeTransaction.objects.create(
+            user=self.user, category=self.category, amount=Decimal('25.00'), date='2024-01-01',
+            transaction_type='outcome', balance=self.savings
+        )
+
+    def test_if_match_on_income_outcome(self):
+        """Test that income/outcome updates honour If-Match and return the new ETag."""
+        url = reverse('income_outcome_transaction-detail', args=[self.outcome.id])
+
+        response = self.client.patch(url, {'note': 'Market'}, format='json', HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['ETag'], '"2"')
+
+        response = self.client.patch(url, {'note': 'Bakery'}, format='json', HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+        response = self.client.delete(url, HTTP_IF_MATCH='"2"')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.savings.refresh_from_db()
+        self.assertEqual(self.savings.amount, Decimal('0.00'))
+
+    def test_created_transfer_has_etag(self):
+        """Test that a created transfer carries its version as ETag."""
+        response = self.client.post(reverse('transfer_transaction-list'), {
+            'category': self.category.id,
+            'amount': '10.00',
+            'date': '2024-01-02',
+            'balance_from': self.savings.id,
+            'balance_to': self.checking.id,
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response['ETag'], '"1"')
+
+    def test_stale_save_does_not_touch_balances(self):
+        """Test that a conflicting save of a subtype raises before any balance is booked."""
+        stale = IncomeOutcomeTransaction.objects.get(pk=self.outcome.pk)
+        self.outcome.note = 'Market'
+        self.outcome.save()
+
+        stale.amount = Decimal('99.00')
+        with self.assertRaisesMessage(VersionConflict, 'IncomeOutcomeTransaction'), transaction.atomic():
+            stale.save()
+
+        self.savings.refresh_from_db()
+        self.assertEqual(self.savings.amount, Decimal('-25.00'))
+        self.assertEqual(TransferTransaction.objects.count(), 0)
@@ -1,29 +1,100 @@
-from django.db import transaction
+from django.db import router, transaction
 from rest_framework import mixins, viewsets, serializers
+from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
+from balances.ledger import lock_balances
 from utils.permissions import IsOwner
+from utils.routing import ReplicaReadMixin
+from utils.sparse_fields import SparseFieldsetViewMixin
+from utils.versioning import VersionedViewMixin
+from . import bulk, duplicates
 from .models import IncomeOutcomeTransaction, TransferTransaction, BaseTransaction
 from .serializers.base_transaction_serializers import BaseTransactionSerializer
+from .serializers.bulk_serializers import BulkSelectionSerializer, BulkRecategorizeSerializer, BulkMoveSerializer, \
+    BulkResultSerializer
+from .serializers.duplicate_serializers import DuplicateQuerySerializer, DuplicateClusterSerializer, \
+    DuplicateResolveSerializer
 from .serializers.income_outcome_transaction_serializers import IncomeOutcomeTransactionSerializer, \
-    CreateIncomeOutcomeTransactionSerializer
-from .serializers.transfer_transaction_serializers import TransferTransactionSerializer
+    CreateIncomeOutcomeTransactionSerializer, AnomalyQuerySerializer, DistributionQuerySerializer, \
+    DistributionSerializer
+from .serializers.transfer_transaction_serializers import TransferTransactionSerializer, \
+    CreateTransferTransactionSerializer
 
 
-class BaseTransactionViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+class BaseTransactionViewSet(ReplicaReadMixin, SparseFieldsetViewMixin, mixins.ListModelMixin,
+                             viewsets.GenericViewSet):
     """Base view set for all transaction types."""
     queryset = BaseTransaction.objects.all()
     serializer_class = BaseTransactionSerializer
     permission_classes = [IsOwner]
+    replica_actions = ('list', 'duplicates')
+    sparse_field_relations = {'detail_url': ('incomeoutcometransaction', 'transfertransaction')}
 
     def get_queryset(self):
         return BaseTransaction.objects.filter(user=self.request.user)
 
+    def _bulk_selection(self, serializer_class):
+        selection = serializer_class(data=self.request.data, context=self.get_serializer_context())
+        selection.is_valid(raise_exception=True)
+        return selection, selection.selected_pks()
 
-class IncomeOutcomeTransactionViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'], url_path='bulk/recategorize', permission_classes=[IsAuthenticated])
+    def bulk_recategorize(self, request):
+        """Assign `category` to every selected transaction."""
+        selection, pks = self._bulk_selection(BulkRecategorizeSerializer)
+        result = bulk.recategorize(request.user, pks, selection.validated_data['category'])
+        return Response(BulkResultSerializer(result).data)
+
+    @action(detail=False, methods=['post'], url_path='bulk/move', permission_classes=[IsAuthenticated])
+    def bulk_move(self, request):
+        """Book every selected transaction that touches `source` against `target` instead."""
+        selection, pks = self._bulk_selection(BulkMoveSerializer)
+        result = bulk.move(request.user, pks, selection.validated_data['source'], selection.validated_data['target'])
+        return Response(BulkResultSerializer(result).data)
+
+    @action(detail=False, methods=['post'], url_path='bulk/delete', permission_classes=[IsAuthenticated])
+    def bulk_delete(self, request):
+        """Delete every selected transaction."""
+        _, pks = self._bulk_selection(BulkSelectionSerializer)
+        return Response(BulkResultSerializer(bulk.delete(request.user, pks)).data)
+
+    @action(detail=False, methods=['get'])
+    def duplicates(self, request):
+        """Clusters of likely duplicate transactions: same amount, close dates, similar notes."""
+        query = DuplicateQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        clusters = duplicates.find_duplicates(
+            request.user, query.validated_data['window'], query.validated_data['similarity']
+        )
+
+        instances = self.get_queryset().filter(pk__in=[pk for pks, _ in clusters for pk in pks]).select_related(
+            'category', 'incomeoutcometransaction', 'transfertransaction'
+        ).in_bulk()
+        data = [
+            {'similarity': round(similarity, 3), 'transactions': [instances[pk] for pk in pks]}
+            for pks, similarity in clusters
+        ]
+        return Response(DuplicateClusterSerializer(data, many=True, context=self.get_serializer_context()).data)
+
+    @action(detail=False, methods=['post'], url_path='duplicates/resolve', permission_classes=[IsAuthenticated])
+    def resolve_duplicates(self, request):
+        """Keep one transaction of each cluster and delete the copies listed in `discard`."""
+        serializer = DuplicateResolveSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        result = duplicates.resolve(request.user, serializer.validated_data['resolutions'])
+        return Response(BulkResultSerializer(result).data)
+
+
+class IncomeOutcomeTransactionViewSet(ReplicaReadMixin, VersionedViewMixin, SparseFieldsetViewMixin,
+                                      viewsets.ModelViewSet):
     """View set for income and outcome transactions."""
     queryset = IncomeOutcomeTransaction.objects.all()
     permission_classes = [IsOwner]
+    replica_actions = ('list', 'anomalies', 'distribution')
+    sparse_field_relations = {'detail_url': ()}
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -36,29 +107,59 @@ class IncomeOutcomeTransactionViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(detail=False, methods=['get'])
+    def anomalies(self, request):
+        """Outcomes unusually large for their category, scored now, most unusual first."""
+        # NumPy is only loaded by the workers that score anomalies
+        from .anomalies import find_anomalies
+
+        query = AnomalyQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        scores = dict(find_anomalies(request.user, query.validated_data['threshold']))
+        instances = {instance.pk: instance for instance in self.get_queryset().filter(pk__in=scores)}
+        for pk, score in scores.items():
+            instances[pk].anomaly_score = round(score, 3)
+        serializer = self.get_serializer([instances[pk] for pk in scores], many=True)
+        return Response(serializer.data)
 
-class TransferTransactionViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def distribution(self, request):
+        """Percentiles and histogram of the amounts of each category."""
+        # NumPy is only loaded by the workers that compute distributions
+        from .distribution import distribution
+
+        query = DistributionQuerySerializer(data=request.query_params, context=self.get_serializer_context())
+        query.is_valid(raise_exception=True)
+        return Response(DistributionSerializer(distribution(request.user, **query.validated_data), many=True).data)
+
+
+class TransferTransactionViewSet(ReplicaReadMixin, VersionedViewMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """View set for transfer transactions."""
     queryset = TransferTransaction.objects.all()
     serializer_class = TransferTransactionSerializer
     permission_classes = [IsOwner]
+    sparse_field_relations = {'detail_url': ()}
+
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return CreateTransferTransactionSerializer
+        return TransferTransactionSerializer
 
     def get_queryset(self):
         return TransferTransaction.objects.filter(user=self.request.user)
 
-    @transaction.atomic
     def perform_create(self, serializer):
         """
-        Perform a transfer transaction with complete atomic transaction
-        """
-        try:
-            transfer = serializer.save(user=self.request.user)
+        Perform a transfer transaction with complete atomic transaction.
 
-            # Update source balance
-            transfer.balance_from.update_amount()
-
-            # Update destination balance
-            transfer.balance_to.update_amount()
-        except ValidationError as e:
-            # Handle specific validation errors
-            raise serializers.ValidationError(str(e))
+        Both balances are locked, in primary key order, before the transfer is inserted;
+        the save signal then books the amount against them as two deltas.
+        """
+        with transaction.atomic(using=router.db_for_write(TransferTransaction)):
+            lock_balances([serializer.validated_data['balance_from'].pk, serializer.validated_data['balance_to'].pk])
+            try:
+                serializer.save(user=self.request.user)
+            except ValidationError as e:
+                # Handle specific validation errors
+                raise serializers.ValidationError(str(e))
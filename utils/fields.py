@@ -0,0 +1,8 @@
+from rest_framework import serializers
+
+
+class OwnedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key of an object owned by the requesting user."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(user=self.context['request'].user)
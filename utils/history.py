@@ -0,0 +1,142 @@
+"""
+Buffered audit history on top of django-simple-history.
+
+`BufferedHistoricalRecords` behaves like `HistoricalRecords`, except that inside
+a `buffered_history()` block (every request, via `HistoryBufferMiddleware`) the
+historical rows are not inserted one by one. A row joins the buffer once the
+transaction that produced it commits, and the whole buffer is written with one
+`bulk_create` per historical model when the block exits. Rows produced by a
+rolled-back transaction are dropped with it.
+
+Bulk writes that bypass model signals should go through `bulk_create_with_history`,
+`bulk_update_with_history` or `update_with_history`, or call `record_update_history`
+afterwards, which record history in batches as well.
+"""
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import router, transaction
+from django.db.models import F
+from django.utils import timezone
+from simple_history.models import HistoricalRecords
+from simple_history.utils import (
+    bulk_create_with_history,
+    bulk_update_with_history,
+    get_history_manager_for_model,
+)
+
+logger = logging.getLogger(__name__)
+
+HISTORY_BATCH_SIZE = 500
+
+_buffer = ContextVar('history_buffer', default=None)
+
+__all__ = [
+    'BufferedHistoricalRecords',
+    'HistoryBufferMiddleware',
+    'buffered_history',
+    'bulk_create_with_history',
+    'bulk_update_with_history',
+    'record_update_history',
+    'update_with_history',
+]
+
+
+class BufferedHistoricalRecords(HistoricalRecords):
+    def create_historical_record(self, instance, history_type, using=None):
+        buffer = _buffer.get()
+        if buffer is None:
+            return super().create_historical_record(instance, history_type, using=using)
+
+        manager = getattr(instance, self.manager_name)
+        history_instance = manager.model(
+            history_date=getattr(instance, '_history_date', timezone.now()),
+            history_type=history_type,
+            history_user=self.get_history_user(instance),
+            history_change_reason=self.get_change_reason_for_object(instance, history_type, using),
+            **{field.attname: getattr(instance, field.attname) for field in self.fields_included(instance)},
+        )
+        # History goes to the database of the audited row, which may be a shard (see `sharding`)
+        using = using or instance._state.db
+        rows = buffer.setdefault((manager.model, using), [])
+        transaction.on_commit(lambda: rows.append(history_instance), using=using)
+
+
+def flush(buffer):
+    """Insert the buffered historical rows, one bulk insert per historical model and database."""
+    try:
+        for (history_model, using), rows in buffer.items():
+            if rows:
+                history_model.objects.using(using).bulk_create(rows, batch_size=HISTORY_BATCH_SIZE)
+    except Exception:
+        # The audited writes are already committed; losing their history must not fail the request
+        logger.exception("Error writing buffered history")
+    buffer.clear()
+
+
+@contextmanager
+def buffered_history():
+    """Buffer the historical rows created inside the block and bulk insert them on exit."""
+    if _buffer.get() is not None:
+        yield
+        return
+
+    buffer = {}
+    token = _buffer.set(buffer)
+    try:
+        yield
+    finally:
+        _buffer.reset(token)
+        # Rows join the buffer on commit, so an enclosing transaction must commit first.
+        # Blocks that recorded nothing skip this, so read-only requests never touch the database.
+        if buffer:
+            transaction.on_commit(lambda: flush(buffer))
+
+
+class HistoryBufferMiddleware:
+    """Write the audit history of a request in bulk once the request is done."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with buffered_history():
+            return self.get_response(request)
+
+
+def _current_user():
+    request = getattr(HistoricalRecords.context, 'request', None)
+    user = getattr(request, 'user', None)
+    return user if user is not None and user.is_authenticated else None
+
+
+def record_update_history(model, pks, batch_size=HISTORY_BATCH_SIZE):
+    """Record an update historical row for each object in `pks`, as currently stored."""
+    history_manager = get_history_manager_for_model(model)
+    for start in range(0, len(pks), batch_size):
+        batch = model._default_manager.filter(pk__in=pks[start:start + batch_size])
+        history_manager.bulk_history_create(batch, update=True, default_user=_current_user())
+
+
+def update_with_history(queryset, batch_size=HISTORY_BATCH_SIZE, **values):
+    """
+    Run `queryset.update(**values)` and record a historical row for every updated object.
+
+    The affected rows are re-read in batches after the update, so the history holds
+    the stored values, including those computed by expressions such as `F()`.
+    """
+    model = queryset.model
+    history_manager = get_history_manager_for_model(model)
+    if any(field.name == 'version' for field in model._meta.concrete_fields):
+        # Keep optimistic concurrency control (`utils.versioning`) aware of the write
+        values.setdefault('version', F('version') + 1)
+
+    with transaction.atomic(using=router.db_for_write(model)):
+        pks = list(queryset.values_list('pk', flat=True))
+        updated = 0
+        for start in range(0, len(pks), batch_size):
+            batch = model._default_manager.filter(pk__in=pks[start:start + batch_size])
+            updated += batch.update(**values)
+            history_manager.bulk_history_create(batch, update=True, default_user=_current_user())
+    return updated
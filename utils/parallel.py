@@ -0,0 +1,42 @@
+"""Process-pool helpers for batch jobs that shard users across workers."""
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+
+import django
+from django.db import connections
+
+
+def chunked(items, size):
+    """Split a sequence into consecutive lists of at most `size` items."""
+    items = list(items)
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def _init_worker():
+    # Spawned workers start from a blank interpreter; forked ones are already set up
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    django.setup()
+
+
+def map_chunks(func, items, workers=1, chunk_size=500, **kwargs):
+    """
+    Yield `func(chunk, **kwargs)` for every chunk of `items`, in completion order.
+
+    With more than one worker the chunks run in a process pool. Each process opens its
+    own database connections, so the parent closes its connections before forking.
+    `func` must be a module-level function so it can be pickled.
+    """
+    chunks = chunked(items, chunk_size)
+    task = partial(func, **kwargs)
+
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield task(chunk)
+        return
+
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(task, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            yield future.result()
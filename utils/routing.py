@@ -0,0 +1,120 @@
+"""
+Read replica routing with read-your-writes.
+
+Everything runs on the primary (`default`) unless a view opts in: views using
+`ReplicaReadMixin` serve their `replica_actions` (lists, reports, exports) from
+one of `REPLICA_DATABASES`. Two things keep a user from reading stale data:
+
+* a request only switches to a replica after authentication, and only if it
+  is a safe request, so a write and the reads it makes stay on the primary;
+* after a user's write, `ReplicaRoutingMiddleware` pins that user to the
+  primary for `READ_YOUR_WRITES_SECONDS`, longer than the replicas may lag.
+
+The pin travels with the client rather than living on a server, so it holds
+whichever web server takes the next request: it is a signed, timestamped token
+of the user id, set as the `PIN_COOKIE` cookie and also returned in the
+`PIN_HEADER` header for clients that do not keep cookies to send back.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core import signing
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+PIN_COOKIE = 'primary_pin'
+PIN_HEADER = 'X-Primary-Pin'
+_PIN_SALT = 'utils.routing.primary-pin'
+
+_routing = ContextVar('replica_routing', default=None)
+
+
+def pin_to_primary(response, user_id):
+    """Have the client's reads served from the primary for the next `READ_YOUR_WRITES_SECONDS`."""
+    pin = signing.TimestampSigner(salt=_PIN_SALT).sign(str(user_id))
+    response[PIN_HEADER] = pin
+    response.set_cookie(
+        PIN_COOKIE, pin, max_age=settings.READ_YOUR_WRITES_SECONDS, httponly=True,
+        secure=settings.AUTH_COOKIE_SECURE, samesite=settings.AUTH_COOKIE_SAMESITE,
+    )
+
+
+def is_pinned(request, user_id):
+    """Whether `request` carries a current pin of the user, in the header or the cookie."""
+    pin = request.headers.get(PIN_HEADER) or request.COOKIES.get(PIN_COOKIE)
+    if not pin:
+        return False
+    try:
+        pinned = signing.TimestampSigner(salt=_PIN_SALT).unsign(pin, max_age=settings.READ_YOUR_WRITES_SECONDS)
+    except signing.BadSignature:
+        return False
+    return pinned == str(user_id)
+
+
+def route_reads_to_replica(request):
+    """Send the rest of the current request's reads to a replica, unless its user wrote recently."""
+    state = _routing.get()
+    if state is None or not settings.REPLICA_DATABASES:
+        return
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated and is_pinned(request, user.pk):
+        return
+    state['replica'] = random.choice(settings.REPLICA_DATABASES)
+
+
+def reading_from_replica():
+    """Whether the current request's reads are served by a replica."""
+    state = _routing.get()
+    return bool(state and state.get('replica'))
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        return state.get('replica') if state else None
+
+    def db_for_write(self, model, **hints):
+        # Explicit, so objects read from a replica are still saved to the primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Scope replica routing to one request and pin users to the primary after their writes."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _routing.set({})
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+
+        user = getattr(request, 'user', None)
+        if request.method not in SAFE_METHODS and user is not None and user.is_authenticated:
+            pin_to_primary(response, user.pk)
+        return response
+
+
+class ReplicaReadMixin:
+    """Serve `replica_actions` of a DRF view from a read replica; for plain views the action is the method."""
+    replica_actions = ('list',)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        action = getattr(self, 'action', None) or request.method.lower()
+        if request.method in SAFE_METHODS and action in self.replica_actions:
+            route_reads_to_replica(request)
@@ -0,0 +1,110 @@
+"""
+Cached OpenAPI schema and lazily imported schema tooling.
+
+The schema is built once per process, or read from `SPECTACULAR_SCHEMA_FILE` when
+it was generated at deploy time with:
+
+    python manage.py spectacular --file schema.yml
+
+and is then served from memory with an ETag. drf_spectacular (and the YAML and
+introspection machinery behind it) is only imported when the schema or the docs
+UIs are first requested, so it stays off the import path of API workers.
+"""
+import hashlib
+import sys
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_safe
+from rest_framework.schemas.inspectors import ViewInspector
+
+CONTENT_TYPES = {
+    'yaml': 'application/vnd.oai.openapi; charset=utf-8',
+    'json': 'application/vnd.oai.openapi+json; charset=utf-8',
+}
+FILE_FORMATS = {'.yml': 'yaml', '.yaml': 'yaml', '.json': 'json'}
+
+_cache = {}
+_lock = threading.Lock()
+
+
+class LazyAutoSchema(ViewInspector):
+    """
+    DEFAULT_SCHEMA_CLASS that does not import drf_spectacular.
+
+    DRF instantiates the schema class whenever a view's `schema` attribute is read,
+    which routers do for every viewset while building the URLconf. Until schema
+    generation has imported drf_spectacular this yields an inert placeholder;
+    from then on it yields drf_spectacular's AutoSchema.
+    """
+
+    def __new__(cls, *args, **kwargs):
+        openapi = sys.modules.get('drf_spectacular.openapi')
+        if openapi is not None:
+            return openapi.AutoSchema(*args, **kwargs)
+        return super().__new__(cls)
+
+
+def _read_schema_file(fmt):
+    path = getattr(settings, 'SPECTACULAR_SCHEMA_FILE', None)
+    if path and Path(path).is_file() and FILE_FORMATS.get(Path(path).suffix) == fmt:
+        return Path(path).read_bytes()
+    return None
+
+
+def _generate(fmt):
+    from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+    from drf_spectacular.settings import spectacular_settings
+
+    if 'schema' not in _cache:
+        generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+        _cache['schema'] = generator.get_schema(request=None, public=spectacular_settings.SERVE_PUBLIC)
+    renderer = OpenApiJsonRenderer() if fmt == 'json' else OpenApiYamlRenderer()
+    return renderer.render(_cache['schema'], renderer_context={})
+
+
+def get_schema(fmt='yaml'):
+    """Return (body, etag) of the schema in `fmt`, building it on first use."""
+    if fmt not in _cache:
+        with _lock:
+            if fmt not in _cache:
+                body = _read_schema_file(fmt) or _generate(fmt)
+                _cache[fmt] = body, hashlib.sha256(body).hexdigest()
+    return _cache[fmt]
+
+
+def clear_schema_cache():
+    _cache.clear()
+
+
+def _format(request):
+    return 'json' if request.GET.get('format') == 'json' else 'yaml'
+
+
+@require_safe
+@condition(etag_func=lambda request: get_schema(_format(request))[1])
+def schema_view(request):
+    """OpenAPI schema for this API, YAML by default or JSON with `?format=json`."""
+    fmt = _format(request)
+    body, _ = get_schema(fmt)
+    response = HttpResponse(body, content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'inline; filename="schema.{fmt}"'
+    return response
+
+
+def lazy_view(import_path, **initkwargs):
+    """Return a view that imports and builds the class-based view at `import_path` on first use."""
+    view = None
+
+    @csrf_exempt
+    def wrapper(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            view = import_string(import_path).as_view(**initkwargs)
+        return view(request, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,89 @@
+"""
+Sparse fieldsets: `?fields=id,amount,date` on read endpoints.
+
+`SparseFieldsetSerializerMixin` drops the serializer fields a GET request did not
+ask for. `SparseFieldsetViewMixin` then derives the SQL from the fields that are
+left: plain columns go into `only()`, relations rendered as objects are joined
+with `select_related()`, and anything not requested is neither selected nor
+joined. Without `?fields=` the same pruning still joins the relations the full
+representation needs, instead of resolving them with one query per row.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+FIELDS_PARAM = 'fields'
+
+
+def requested_fields(request):
+    """Return the set of field names asked for by a GET request, or None for all fields."""
+    if request is None or request.method != 'GET':
+        return None
+    # Serializers may be handed a plain Django request instead of a DRF one
+    value = getattr(request, 'query_params', request.GET).get(FIELDS_PARAM)
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsetSerializerMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = requested_fields(self.context.get('request'))
+        if requested is None:
+            return
+
+        unknown = requested - set(self.fields)
+        if unknown:
+            raise serializers.ValidationError({FIELDS_PARAM: [f"Unknown field: {name}" for name in sorted(unknown)]})
+        for name in set(self.fields) - requested:
+            self.fields.pop(name)
+
+
+def _resolve(model, path):
+    """Return the model field at the end of a `__` separated path, or None for non-fields."""
+    field = None
+    for part in path.split('__'):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+        model = field.related_model
+    return field
+
+
+class SparseFieldsetViewMixin:
+    # Serializer field name -> relations it reads that are not its own source (e.g. for properties)
+    sparse_field_relations = {}
+    # Model fields loaded whatever fields were requested, e.g. for response headers
+    sparse_required_fields = ()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method != 'GET':
+            return queryset
+
+        only, related, prunable = set(self.sparse_required_fields), set(), True
+        for name, field in self.get_serializer().fields.items():
+            if name in self.sparse_field_relations:
+                related.update(self.sparse_field_relations[name])
+                only.update(self.sparse_field_relations[name])
+                continue
+
+            path = field.source.replace('.', '__')
+            model_field = _resolve(queryset.model, path) if field.source != '*' else None
+            if model_field is None:
+                # Computed attribute: we cannot tell which columns it reads
+                prunable = False
+            elif model_field.is_relation and not isinstance(field, serializers.PrimaryKeyRelatedField):
+                related.add(path)
+                only.add(path)
+            else:
+                only.add(path)
+                if '__' in path:
+                    related.add(path.rsplit('__', 1)[0])
+
+        if related:
+            queryset = queryset.select_related(*sorted(related))
+        if prunable:
+            queryset = queryset.only(*sorted(only))
+        return queryset
@@ -0,0 +1,177 @@
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from balances.models import Balance, BalanceCheckpoint
+from categories.models import Category
+from transactions.models import IncomeOutcomeTransaction
+from utils import routing, schema
+
+
+class SchemaViewTests(TestCase):
+    def setUp(self):
+        schema.clear_schema_cache()
+        self.addCleanup(schema.clear_schema_cache)
+
+    def test_schema_is_generated_once_and_served_with_etag(self):
+        """Test that the schema is built on first use, cached, and revalidated by ETag."""
+        with mock.patch.object(schema, '_generate', wraps=schema._generate) as generate:
+            response = self.client.get(reverse('schema'))
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.content.startswith(b'openapi: 3.0.3'))
+            etag = response['ETag']
+
+            response = self.client.get(reverse('schema'), HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(generate.call_count, 1)
+
+    def test_json_format(self):
+        """Test that ?format=json serves the same schema as JSON."""
+        response = self.client.get(reverse('schema'), {'format': 'json'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.oai.openapi+json; charset=utf-8')
+        self.assertEqual(response.json()['info']['title'], 'Money Manager API')
+
+    def test_pregenerated_schema_file(self):
+        """Test that a schema file generated at deploy time is served as is."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'schema.yml'
+            path.write_bytes(b'openapi: 3.0.3\ninfo:\n  title: Deployed\n')
+            with override_settings(SPECTACULAR_SCHEMA_FILE=path), \
+                    mock.patch.object(schema, '_generate') as generate:
+                response = self.client.get(reverse('schema'))
+
+        self.assertEqual(response.content, b'openapi: 3.0.3\ninfo:\n  title: Deployed\n')
+        generate.assert_not_called()
+
+    def test_docs_ui(self):
+        """Test that the lazily imported Swagger UI and Redoc views still render."""
+        self.assertEqual(self.client.get(reverse('swagger-ui')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('redoc')).status_code, 200)
+
+    def test_api_workers_do_not_import_drf_spectacular(self):
+        """Test that loading the URLconf and resolving API routes leaves drf_spectacular unimported."""
+        code = (
+            "import django, sys; django.setup(); "
+            "from django.urls import resolve; resolve('/balances/'); "
+            "print(sorted(m for m in sys.modules if m.startswith('drf_spectacular.')))"
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=settings.BASE_DIR,
+            env={'DJANGO_SETTINGS_MODULE': 'core.settings', 'PATH': ''},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(result.stdout.strip(), "['drf_spectacular.apps', 'drf_spectacular.checks']")
+
+
+@override_settings(REPLICA_DATABASES=['replica1'])
+class ReplicaRouterTests(SimpleTestCase):
+    def test_reads_use_primary_outside_a_request(self):
+        """Test that reads outside a routed request go to the primary."""
+        self.assertEqual(Balance.objects.all().db, 'default')
+
+    def test_routed_reads_and_writes(self):
+        """Test that a routed request reads from the replica and still writes to the primary."""
+        token = routing._routing.set({})
+        self.addCleanup(routing._routing.reset, token)
+        routing.route_reads_to_replica(None)
+
+        self.assertEqual(Balance.objects.all().db, 'replica1')
+        self.assertEqual(Balance.objects.db_manager().db, 'replica1')
+        router = routing.ReplicaRouter()
+        self.assertEqual(router.db_for_write(Balance), 'default')
+        self.assertFalse(router.allow_migrate('replica1', 'balances'))
+        self.assertIsNone(router.allow_migrate('default', 'balances'))
+
+
+# The replica is `default` itself, so the views run normally and only the routing decision is observed
+@override_settings(REPLICA_DATABASES=['default'])
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(username='reader', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        choice = mock.patch('utils.routing.random.choice', side_effect=lambda aliases: aliases[0])
+        self.choice = choice.start()
+        self.addCleanup(choice.stop)
+
+    def test_list_is_read_from_a_replica(self):
+        """Test that list endpoints and the dashboard are served from a replica."""
+        self.assertEqual(self.client.get(reverse('balance-list')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+        self.assertEqual(self.choice.call_count, 2)
+
+    def test_writes_and_detail_reads_stay_on_primary(self):
+        """Test that writes and actions outside `replica_actions` are not routed."""
+        response = self.client.post(reverse('balance-list'), {'name': 'Cash', 'amount': '10.00', 'currency': 'USD'})
+        self.assertEqual(response.status_code, 201)
+        self.client.cookies.clear()
+        self.client.get(reverse('balance-detail', args=[response.data['id']]))
+        self.choice.assert_not_called()
+
+    def test_replica_lookups_store_no_checkpoints(self):
+        """Test that historical amounts served from a replica write no checkpoints but still chart every month end."""
+        balance = Balance.objects.create(user=self.user, name='Cash', currency='EUR')
+        category = Category.objects.create(user=self.user, name='Salary')
+        IncomeOutcomeTransaction.objects.create(
+            user=self.user, category=category, amount='100.00', date='2024-01-15',
+            transaction_type='income', balance=balance
+        )
+
+        response = self.client.get(reverse('balance-amount-at', args=[balance.id]), {'date': '2024-03-31'})
+        self.assertEqual(response.data['amount'], '100.00')
+        response = self.client.get(reverse('balance-timeline', args=[balance.id]),
+                                   {'start': '2024-01-01', 'end': '2024-03-31'})
+        self.assertEqual(
+            [(point['date'], point['amount']) for point in response.data],
+            [('2024-01-31', '100.00'), ('2024-02-29', '100.00'), ('2024-03-31', '100.00')]
+        )
+        self.assertEqual(self.choice.call_count, 2)
+        self.assertFalse(BalanceCheckpoint.objects.exists())
+
+    def test_user_is_pinned_to_primary_after_a_write(self):
+        """Test that a user reads their own writes from the primary, while other users still use replicas."""
+        self.client.post(reverse('balance-list'), {'name': 'Cash', 'amount': '10.00', 'currency': 'USD'})
+        response = self.client.get(reverse('balance-list'))
+        self.assertEqual(len(response.data), 1)
+        self.choice.assert_not_called()
+
+        other = APIClient()
+        other.force_authenticate(user=get_user_model().objects.create_user(username='other', password='x'))
+        other.get(reverse('balance-list'))
+        self.assertEqual(self.choice.call_count, 1)
+
+        with override_settings(READ_YOUR_WRITES_SECONDS=0):
+            self.client.get(reverse('balance-list'))
+        self.assertEqual(self.choice.call_count, 2)
+
+    def test_pin_is_carried_by_the_client(self):
+        """Test that the pin holds on any server through its header, and only for the user it was issued to."""
+        response = self.client.post(reverse('balance-list'), {'name': 'Cash', 'amount': '10.00', 'currency': 'USD'})
+        pin = response[routing.PIN_HEADER]
+        self.assertEqual(response.cookies[routing.PIN_COOKIE].value, pin)
+
+        # Without the cookie, as from a client that only echoes the header
+        self.client.cookies.clear()
+        self.client.get(reverse('balance-list'), HTTP_X_PRIMARY_PIN=pin)
+        self.choice.assert_not_called()
+
+        other = APIClient()
+        other.force_authenticate(user=get_user_model().objects.create_user(username='other', password='x'))
+        other.get(reverse('balance-list'), HTTP_X_PRIMARY_PIN=pin)
+        self.client.get(reverse('balance-list'), HTTP_X_PRIMARY_PIN=f'{self.user.pk}:forged:pin')
+        self.assertEqual(self.choice.call_count, 2)
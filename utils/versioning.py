@@ -0,0 +1,121 @@
+"""
+Optimistic concurrency control.
+
+`VersionedModel` adds a `version` column that every save bumps. The UPDATE is
+conditioned on the version the instance was read at, so a save on top of a
+row that changed in the meantime raises `VersionConflict` instead of silently
+overwriting the other write.
+
+`VersionedViewMixin` exposes the version over HTTP: detail responses carry it
+as the `ETag`, writes sent with `If-Match` are rejected with 412 when the ETag
+is stale, and writes without it get 409 when they lose a race.
+"""
+from django.db import models, router, transaction
+from django.utils.http import parse_etags, quote_etag
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions, status
+from rest_framework.permissions import SAFE_METHODS
+
+ETAG_ACTIONS = ('retrieve', 'create', 'update', 'partial_update')
+
+
+class VersionConflict(Exception):
+    """The row was changed by someone else since the instance was read."""
+
+
+class PreconditionFailed(exceptions.APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = _('The resource has been modified since the version given in If-Match.')
+    default_code = 'precondition_failed'
+
+
+class EditConflict(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = _('The resource was modified by a concurrent request, reload it and try again.')
+    default_code = 'conflict'
+
+
+class VersionedModel(models.Model):
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if update_fields is not None and 'version' not in update_fields:
+            update_fields = [*update_fields, 'version']
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        version_field = self._meta.get_field('version')
+        if not any(field is version_field for field, _, _ in values):
+            # A table of a multi-table inheritance chain that does not hold the version
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
+        expected = self.version
+        values = [
+            (field, model, expected + 1 if field is version_field else value) for field, model, value in values
+        ]
+        if super()._do_update(base_qs.filter(version=expected), using, pk_val, values, update_fields, forced_update):
+            self.version = expected + 1
+            return True
+        if base_qs.filter(pk=pk_val).exists():
+            raise VersionConflict(f'{self._meta.label} {pk_val} is no longer at version {expected}.')
+        return False
+
+
+def check_if_match(request, instance):
+    """Raise `PreconditionFailed` unless the request's If-Match header (if any) matches `instance`."""
+    header = request.headers.get('If-Match')
+    if header is None:
+        return
+    etags = parse_etags(header)
+    if '*' not in etags and quote_etag(str(instance.version)) not in etags:
+        raise PreconditionFailed()
+
+
+class VersionedViewMixin:
+    """ETag / If-Match handling for a `ModelViewSet` over a `VersionedModel`."""
+    # The ETag needs the version even when `?fields=` leaves it out
+    sparse_required_fields = ('version',)
+
+    def get_object(self):
+        instance = super().get_object()
+        if self.request.method not in SAFE_METHODS:
+            check_if_match(self.request, instance)
+        self.versioned_object = instance
+        return instance
+
+    def _conflict(self):
+        return PreconditionFailed() if 'If-Match' in self.request.headers else EditConflict()
+
+    def perform_update(self, serializer):
+        instance = serializer.instance
+        try:
+            with transaction.atomic(using=router.db_for_write(type(instance), instance=instance)):
+                super().perform_update(serializer)
+        except VersionConflict:
+            raise self._conflict()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic(using=router.db_for_write(type(instance), instance=instance)):
+            current = type(instance)._base_manager.select_for_update().filter(pk=instance.pk, version=instance.version)
+            if not current.exists():
+                raise self._conflict()
+            super().perform_destroy(instance)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'action', None) in ETAG_ACTIONS and status.is_success(response.status_code):
+            version = self._response_version(response)
+            if version is not None:
+                response['ETag'] = quote_etag(str(version))
+        return response
+
+    def _response_version(self, response):
+        instance = getattr(self, 'versioned_object', None)
+        if instance is not None:
+            return instance.version
+        if isinstance(response.data, dict):
+            return response.data.get('version')
+        return None